@@ -1,15 +1,20 @@
+import importlib
 import tkinter as tk
 from tkinter import messagebox, simpledialog
-from manage_tests_form import ManageTestsForm
-from manage_users_form import ManageUsersForm
-from statistics_form import StatisticsForm
 from database import Database
 
 class AdminForm(tk.Tk):
+    # Формы панели загружаются при первом открытии: имя -> (модуль, класс)
+    FORMS = {
+        "tests": ("manage_tests_form", "ManageTestsForm"),
+        "users": ("manage_users_form", "ManageUsersForm"),
+        "statistics": ("statistics_form", "StatisticsForm"),
+    }
+
     # === Инициализация и конфигурация окна ===
     def __init__(self, admin_id):
         super().__init__()
-        self.db = Database()
+        self.db = Database.shared()
         self.admin_id = admin_id
         self.title("Панель администратора")
         self.geometry("400x300")
@@ -29,9 +34,9 @@ class AdminForm(tk.Tk):
         # Создание виджетов и кнопок панели администратора
         tk.Label(self, text="Панель администратора", font=("Arial", 16)).pack(pady=10)
         buttons = [
-            ("Управление тестами", self.open_form, ManageTestsForm),
-            ("Управление пользователями", self.open_form, ManageUsersForm),
-            ("Просмотр статистики", self.open_form, StatisticsForm),
+            ("Управление тестами", self.open_form, "tests"),
+            ("Управление пользователями", self.open_form, "users"),
+            ("Просмотр статистики", self.open_form, "statistics"),
             ("Изменить пароль", self.change_password, None),
             ("Назад", self.go_back, None),
             ("Выход", self.exit_app, None)
@@ -40,17 +45,15 @@ class AdminForm(tk.Tk):
             tk.Button(self, text=text, command=(lambda c=cmd, a=arg: c(a) if a else c())).pack(pady=5)
 
     # === Методы управления формами ===
-    def open_form(self, form_class):
-        # Открытие выбранной формы и скрытие текущей
+    def open_form(self, form_name):
+        # Открытие выбранной формы (модуль импортируется при первом открытии) и скрытие текущей
+        module_name, class_name = self.FORMS[form_name]
+        form_class = getattr(importlib.import_module(module_name), class_name)
         self.withdraw()
-        if form_class == ManageTestsForm:
-            form_class(self, self.admin_id).mainloop()
-        elif form_class.__name__ == "StatisticsForm":
+        if form_name == "statistics":
             form_class(self, self.admin_id)
-        elif form_class == ManageUsersForm:
-            form_class(self, self.admin_id).mainloop()
         else:
-            form_class(self).mainloop()
+            form_class(self, self.admin_id).mainloop()
 
     # === Методы управления пользователем ===
     def change_password(self, _=None):
@@ -1,11 +1,73 @@
-import tkinter as tk
+import time
+_started = time.perf_counter()
+
+import os
+import sys
 from login_form import LoginForm
 from database import Database
+from connection_manager import ConnectionManager
+
+# Бюджет запуска (мс) для проверки python app.py --startup-check; переопределяется STARTUP_BUDGET_MS
+STARTUP_BUDGET_MS = 1000
+
+
+def report_startup(window, imported, exit_after=False):
+    # Время импорта модулей и до показа первого окна; при превышении бюджета — код выхода 1
+    shown = time.perf_counter()
+    budget = int(os.environ.get("STARTUP_BUDGET_MS", STARTUP_BUDGET_MS))
+    total_ms = (shown - _started) * 1000
+    print(f"Импорт модулей: {(imported - _started) * 1000:.0f} мс, первое окно: {total_ms:.0f} мс "
+          f"(бюджет {budget} мс)")
+    if total_ms > budget:
+        print("Превышен бюджет времени запуска.", file=sys.stderr)
+    if exit_after:
+        window.exit_code = 1 if total_ms > budget else 0
+        window.destroy()
+
 
 if __name__ == "__main__":
-    # Инициализация базы данных
-    db = Database()
+    imported = time.perf_counter()
+    # Инициализация общей базы данных (формы используют то же соединение).
+    # Режим журнала: DB_JOURNAL_MODE (по умолчанию WAL, для файла на сетевом диске — DELETE);
+    # ожидание блокировки другим процессом: DB_BUSY_TIMEOUT_MS
+    busy_timeout = os.environ.get("DB_BUSY_TIMEOUT_MS")
+    try:
+        db = Database.shared(journal_mode=os.environ.get("DB_JOURNAL_MODE") or None,
+                             busy_timeout_ms=int(busy_timeout) if busy_timeout else None)
+    except RuntimeError as e:
+        # Несовместимая версия SQLite: сообщить до показа окон и завершить работу
+        print(e, file=sys.stderr)
+        try:
+            from tkinter import messagebox
+            messagebox.showerror("Ошибка запуска", str(e))
+        except Exception:
+            pass
+        sys.exit(1)
+
+    # Пересчёт агрегатной статистики результатов: python app.py --rebuild-stats
+    if "--rebuild-stats" in sys.argv[1:]:
+        db.rebuild_summary_stats()
+        ConnectionManager.close_all()
+        print("Статистика пересчитана.")
+        sys.exit(0)
+
+    # Профилирование запросов: DB_PROFILE=1 (порог медленного запроса — DB_SLOW_MS)
+    if os.environ.get("DB_PROFILE"):
+        from query_stats import QueryStats
+        QueryStats(slow_threshold_ms=int(os.environ.get("DB_SLOW_MS", "200")),
+                   explain_slow=True).install(db, dump_on_exit=True)
 
     # Запуск приложения
-    app = LoginForm()
-    app.mainloop()
\ No newline at end of file
+    exit_code = 0
+    try:
+        app = LoginForm()
+        # Замер запуска: python app.py --startup-check (окно закрывается сразу после показа)
+        # или STARTUP_PROFILE=1 (только вывод времени)
+        startup_check = "--startup-check" in sys.argv[1:]
+        if startup_check or os.environ.get("STARTUP_PROFILE"):
+            app.after_idle(report_startup, app, imported, startup_check)
+        app.mainloop()
+        exit_code = getattr(app, "exit_code", 0)
+    finally:
+        ConnectionManager.close_all()
+    sys.exit(exit_code)
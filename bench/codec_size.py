@@ -0,0 +1,76 @@
+"""
+Размер и скорость кодека ответов (response_codec) в сравнении с JSON.
+
+    python bench/codec_size.py [--attempts 10000] [--questions 30]
+
+Попытки моделируются в двух вариантах: вопросы темы по порядку и случайная
+выборка из банка (id вразнобой). Около трети вопросов — с множественным выбором,
+часть ответов пропущена. Код выхода 1, если запись не восстанавливается
+или кодек занимает больше половины JSON.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_codec import encode_responses, decode_responses
+
+RATIO_BUDGET = 0.5
+
+
+def attempts(rng, count, questions, drawn):
+    # Генератор попыток: (id вопросов, ответы)
+    for _ in range(count):
+        first = rng.randint(1, 50000)
+        ids = rng.sample(range(first, first + questions * 20), questions) if drawn else list(range(first, first + questions))
+        answers = []
+        for _ in ids:
+            if rng.random() < 0.05:
+                answers.append(-1)
+            elif rng.random() < 0.3:
+                answers.append(sorted(rng.sample(range(6), rng.randint(1, 3))))
+            else:
+                answers.append(rng.randrange(6))
+        yield ids, answers
+
+
+def measure(label, data):
+    # Сравнить кодек с JSON на наборе попыток; вернуть (отношение размеров, число ошибок восстановления)
+    started = time.perf_counter()
+    encoded = [encode_responses(ids, answers) for ids, answers in data]
+    encode_s = time.perf_counter() - started
+    started = time.perf_counter()
+    decoded = [decode_responses(blob) for blob in encoded]
+    decode_s = time.perf_counter() - started
+    errors = sum(pairs != list(zip(ids, answers)) for pairs, (ids, answers) in zip(decoded, data))
+    codec = sum(map(len, encoded)) / len(data)
+    as_json = sum(len(json.dumps({"question_ids": ids, "answers": answers}, separators=(",", ":")).encode())
+                  for ids, answers in data) / len(data)
+    print(f"{label}: кодек {codec:.1f} байт, JSON {as_json:.1f} байт ({codec / as_json:.0%}); "
+          f"кодирование {encode_s / len(data) * 1e6:.1f} мкс, разбор {decode_s / len(data) * 1e6:.1f} мкс на попытку")
+    return codec / as_json, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attempts", type=int, default=10000)
+    parser.add_argument("--questions", type=int, default=30)
+    args = parser.parse_args()
+
+    rng = random.Random(16)
+    results = [
+        measure("Вопросы по порядку", list(attempts(rng, args.attempts, args.questions, drawn=False))),
+        measure("Выборка из банка", list(attempts(rng, args.attempts, args.questions, drawn=True))),
+    ]
+    errors = sum(e for _, e in results)
+    if errors:
+        print(f"Не восстановлено попыток: {errors}", file=sys.stderr)
+    return 1 if errors or max(r for r, _ in results) > RATIO_BUDGET else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Замер каскадных удалений: большой тест (вопросы, варианты, назначения, результаты),
+группа со студентами и студент с большим числом попыток.
+
+    python bench/large_deletes.py [--questions 2000] [--students 1000] [--attempts 10]
+
+Каждое удаление — один DELETE, зависимые строки удаляет SQLite (ON DELETE CASCADE / SET NULL).
+Код выхода 1, если после удалений остались строки-сироты или удаление превысило бюджет.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+DELETE_BUDGET_S = 5.0
+
+# Строки, ссылающиеся на удалённые записи (должно быть 0 в каждом запросе)
+ORPHAN_QUERIES = {
+    "ANSWER без вопроса": "SELECT COUNT(*) FROM ANSWER a LEFT JOIN QUESTION q ON q.id = a.question_id WHERE q.id IS NULL",
+    "QUESTION без темы": "SELECT COUNT(*) FROM QUESTION q LEFT JOIN THEME t ON t.id = q.theme_id WHERE t.id IS NULL",
+    "THEME_GROUP без темы или группы": "SELECT COUNT(*) FROM THEME_GROUP tg LEFT JOIN THEME t ON t.id = tg.theme_id "
+                                       "LEFT JOIN GROUPS g ON g.id = tg.group_id WHERE t.id IS NULL OR g.id IS NULL",
+    "TEST_SUMMARY без темы или студента": "SELECT COUNT(*) FROM TEST_SUMMARY ts LEFT JOIN THEME t ON t.id = ts.theme_id "
+                                          "LEFT JOIN USERS u ON u.id = ts.user_id WHERE t.id IS NULL OR u.id IS NULL",
+    "USERS в удалённой группе": "SELECT COUNT(*) FROM USERS u LEFT JOIN GROUPS g ON g.id = u.group_id "
+                                "WHERE u.group_id IS NOT NULL AND g.id IS NULL",
+}
+
+
+def prepare(db, questions, students, attempts):
+    # Две группы студентов, большой тест для обеих и результаты попыток; вернуть (тест, группа, студент)
+    rng = random.Random(7)
+    with db.transaction():
+        for name in ("Удаляемая", "Остающаяся"):
+            db.add_group(name, "0")
+        groups = [r["id"] for r in db.fetch_all("SELECT id FROM GROUPS ORDER BY id")]
+        for group_id in groups:
+            db.import_students(((f"Имя{i}", f"Фамилия{i}") for i in range(students // 2)), group_id)
+        big_test = db.add_test_with_groups("Большой тест", 1, groups)
+        other_test = db.add_test_with_groups("Другой тест", 1, groups)
+        for i in range(questions):
+            db.add_question(big_test, f"Вопрос {i}", ["a", "b", "c", "d"], [i % 4])
+        for i in range(20):
+            db.add_question(other_test, f"Вопрос {i}", ["a", "b", "c", "d"], [i % 4])
+        users = [r["id"] for r in db.fetch_all("SELECT id FROM USERS WHERE role='student'")]
+        db._execute(
+            "INSERT INTO TEST_SUMMARY (user_id, theme_id, score, date, answers) VALUES (?, ?, ?, '2024-01-01', '')",
+            [(u, t, rng.randint(0, 100)) for u in users for t in (big_test, other_test) for _ in range(attempts)],
+            many=True
+        )
+    return big_test, groups[0], users[-1]
+
+
+def timed(label, func, *args):
+    # Выполнить удаление и вывести время; вернуть время в секундах
+    started = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - started
+    print(f"{label}: {elapsed * 1000:.0f} мс")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--attempts", type=int, default=10)
+    args = parser.parse_args()
+
+    db = Database(os.path.join(tempfile.mkdtemp(), "deletes.db"))
+    big_test, group_id, student_id = prepare(db, args.questions, args.students, args.attempts)
+    counts = {t: db.fetch_one(f"SELECT COUNT(*) FROM {t}")[0] for t in ("QUESTION", "ANSWER", "TEST_SUMMARY", "USERS")}
+    print("Исходно: " + ", ".join(f"{t} {n}" for t, n in counts.items()))
+
+    times = [
+        timed(f"delete_test ({args.questions} вопросов)", db.delete_test, big_test),
+        timed(f"delete_group ({args.students // 2} студентов)", db.delete_group, group_id),
+        timed(f"delete_user ({args.attempts * 2} попыток)", db.delete_user, student_id),
+    ]
+    orphans = {label: db.fetch_one(query)[0] for label, query in ORPHAN_QUERIES.items()}
+    orphans["foreign_key_check"] = len(db.fetch_all("PRAGMA foreign_key_check"))
+    bad = {label: n for label, n in orphans.items() if n}
+    print("Строк-сирот нет." if not bad else f"Строки-сироты: {bad}")
+    db.close()
+    return 1 if bad or max(times) > DELETE_BUDGET_S else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
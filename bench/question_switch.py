@@ -0,0 +1,135 @@
+"""
+Замер переключения вопросов в TestForm (пул строк вариантов) на вопросах с 50 вариантами.
+
+    python bench/question_switch.py [--questions 40] [--options 50]
+
+Окно теста создаётся скрытым и ни разу не показывается: замеряется только
+перенастройка строк вариантов и пересчёт геометрии. Tk всё же требует
+X-сервер, поэтому на сервере и в CI скрипт запускается через виртуальный дисплей:
+
+    xvfb-run -a python bench/question_switch.py
+
+Для сравнения замеряется и прежний способ: все строки вариантов создаются
+заново и уничтожаются на каждом вопросе. Код выхода 1, если среднее
+переключение превышает бюджет. Без дисплея замер пропускается с кодом выхода 0.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tkinter as tk
+from database import Database
+from connection_manager import ConnectionManager
+
+SWITCH_BUDGET_MS = 50.0
+
+
+def prepare(db, questions, options):
+    # Студент и тест: вопросы с одиночным и множественным выбором поочерёдно; вернуть (студент, тест)
+    with db.transaction():
+        db.add_group("Замер", "0")
+        group_id = db.fetch_one("SELECT id FROM GROUPS WHERE name='Замер'")["id"]
+        db.add_student("Иван", "Иванов", group_id)
+        student_id = db.fetch_one("SELECT id FROM USERS WHERE role='student'")["id"]
+        theme_id = db.add_test_with_groups("Замер переключения", 1, [group_id])
+        for i in range(questions):
+            db.add_question(theme_id, f"Вопрос {i}: " + "длинный текст вопроса " * 5,
+                            [f"Вариант {k} " + "с пояснением " * (k % 4) for k in range(options)],
+                            [0, 1] if i % 2 else [0])
+    return student_id, theme_id
+
+
+def stats(label, timings):
+    # Вывести среднее и 95-й перцентиль; вернуть среднее в мс
+    timings = sorted(t * 1000 for t in timings)
+    mean = sum(timings) / len(timings)
+    print(f"{label}: среднее {mean:.1f} мс, p95 {timings[int(len(timings) * 0.95) - 1]:.1f} мс "
+          f"({len(timings)} переключений)")
+    return mean
+
+
+def pooled_switches(form):
+    # Ответить на вопрос и показать следующий через пул строк; вернуть времена переключений
+    timings = []
+    session = form.session
+    while not session.is_last:
+        session.answer([0] if session.is_multiple(session.current_question) else 0)
+        started = time.perf_counter()
+        form.load_question()
+        form.update_idletasks()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def rebuilt_switches(root, questions):
+    # Прежний способ: на каждый вопрос строки вариантов создаются заново
+    frame = tk.Frame(root)
+    frame.pack()
+    selected = tk.IntVar(value=-1)
+    timings = []
+    for q in questions[1:]:
+        started = time.perf_counter()
+        for child in frame.winfo_children():
+            child.destroy()
+        tk.Label(frame, text=q["text"], font=("Arial", 14), wraplength=420).pack(anchor="w")
+        answers = tk.Frame(frame)
+        answers.pack(fill="x")
+        for idx, option in enumerate(q["options"]):
+            row = tk.Frame(answers)
+            row.pack(fill="x", anchor="w")
+            if len(q["correct_options"]) > 1:
+                tk.Checkbutton(row, variable=tk.IntVar(value=0)).pack(side="left")
+            else:
+                tk.Radiobutton(row, variable=selected, value=idx).pack(side="left")
+            tk.Label(row, text=option, font=("Arial", 12), wraplength=360, justify="left").pack(side="left")
+        root.update_idletasks()
+        timings.append(time.perf_counter() - started)
+    frame.destroy()
+    return timings
+
+
+def hidden_test_form():
+    # TestForm, скрытое до первой раскладки (вместо центрирования окна на экране)
+    from test_form import TestForm
+
+    class HiddenTestForm(TestForm):
+        def center_window(self):
+            self.withdraw()
+
+    return HiddenTestForm
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--options", type=int, default=50)
+    args = parser.parse_args()
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"Замер пропущен: нет дисплея ({e}).")
+        return 0
+    root.withdraw()
+
+    # TestForm открывает общую базу database.db в текущем каталоге
+    os.chdir(tempfile.mkdtemp())
+    db = Database.shared()
+    student_id, theme_id = prepare(db, args.questions, args.options)
+    try:
+        form = hidden_test_form()(root, student_id, theme_id, student_form=None)
+        pooled = stats("Пул строк", pooled_switches(form))
+        form.destroy()
+        stats("Пересоздание строк", rebuilt_switches(root, db.get_questions(theme_id)))
+    finally:
+        root.destroy()
+        ConnectionManager.close_all()
+    return 1 if pooled > SWITCH_BUDGET_MS else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Замер перепроверки сохранённых ответов (regrade.regrade_test) после исправления ключа.
+
+    python bench/regrade.py [--attempts 100000] [--questions 20]
+
+Тест с attempts попытками; после изменения ключа у одного вопроса с одиночным
+и одного с множественным выбором замеряются пробный прогон и запись новых баллов.
+Баллы сверяются с независимым подсчётом по правилам TestForm; после записи
+агрегаты статистики сверяются с полным пересчётом. Движок (NumPy или Python)
+выбирается как в приложении. Код выхода 1 при расхождении или превышении бюджета.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from response_codec import encode_responses, decode_responses
+import regrade
+
+DRY_RUN_BUDGET_S = 5.0
+APPLY_BUDGET_S = 15.0
+
+
+def score(answers, questions):
+    # Процент по правилам TestForm.calculate_score
+    correct = 0
+    for answer, q in zip(answers, questions):
+        if isinstance(answer, list):
+            correct += set(answer) == set(q["correct_options"])
+        else:
+            correct += answer in q["correct_options"]
+    return int(correct / len(questions) * 100)
+
+
+def prepare(db, attempts, questions):
+    # Группа из 1000 студентов, тест и попытки со случайными ответами; вернуть id теста
+    rng = random.Random(17)
+    with db.transaction():
+        db.add_group("Перепроверка", "0")
+        group_id = db.fetch_one("SELECT id FROM GROUPS WHERE name='Перепроверка'")["id"]
+        db.import_students(((f"Имя{i}", f"Фамилия{i}") for i in range(1000)), group_id)
+        users = [r["id"] for r in db.fetch_all("SELECT id FROM USERS WHERE group_id=?", (group_id,))]
+        theme_id = db.add_test_with_groups("Перепроверка", 1, [group_id])
+        for i in range(questions):
+            correct = sorted(rng.sample(range(4), 2)) if i % 3 == 0 else [rng.randrange(4)]
+            db.add_question(theme_id, f"Вопрос {i}", ["a", "b", "c", "d"], correct)
+        qs = db.get_questions(theme_id)
+        ids = [q["id"] for q in qs]
+        rows = []
+        for _ in range(attempts):
+            answers = [sorted(rng.sample(range(4), rng.randint(0, 3))) if len(q["correct_options"]) > 1
+                       else rng.randint(-1, 3) for q in qs]
+            rows.append((rng.choice(users), theme_id, score(answers, qs), encode_responses(ids, answers)))
+        db._execute("INSERT INTO TEST_SUMMARY (user_id, theme_id, score, date, answers) "
+                    "VALUES (?, ?, ?, '2024-01-01', ?)", rows, many=True)
+    return theme_id
+
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attempts", type=int, default=100000)
+    parser.add_argument("--questions", type=int, default=20)
+    args = parser.parse_args()
+
+    db = Database(os.path.join(tempfile.mkdtemp(), "regrade.db"))
+    theme_id = prepare(db, args.attempts, args.questions)
+    unchanged, dry_same = timed(regrade.regrade_test, db, theme_id, dry_run=True)
+    print(f"Пробный прогон без изменений ключа: {dry_same:.2f} с, {unchanged['checked']} попыток, "
+          f"движок {unchanged['engine']}, изменений {len(unchanged['changes'])}")
+
+    # Исправление ключа: одиночный выбор и множественный
+    questions = db.get_questions(theme_id)
+    single = next(q for q in questions if len(q["correct_options"]) == 1)
+    multiple = next(q for q in questions if len(q["correct_options"]) > 1)
+    db.update_question(single["id"], single["text"], single["options"], [(single["correct_options"][0] + 1) % 4])
+    db.update_question(multiple["id"], multiple["text"], multiple["options"], [0, 1, 2])
+    questions = db.get_questions(theme_id)
+
+    dry, dry_s = timed(regrade.regrade_test, db, theme_id, dry_run=True)
+    expected = {}
+    for row in db.fetch_all("SELECT id, score, answers FROM TEST_SUMMARY WHERE theme_id=?", (theme_id,)):
+        new_score = score([a for _, a in decode_responses(row["answers"])], questions)
+        if new_score != row["score"]:
+            expected[row["id"]] = new_score
+    mismatch = {c["id"]: c["new_score"] for c in dry["changes"]} != expected
+    print(f"Пробный прогон после исправления ключа: {dry_s:.2f} с, изменится баллов: {len(dry['changes'])}"
+          + (" — РАСХОЖДЕНИЕ с независимым подсчётом" if mismatch else ""))
+
+    applied, apply_s = timed(regrade.regrade_test, db, theme_id)
+    stats = [tuple(r) for r in db.fetch_all("SELECT * FROM STATS_THEME_GROUP_VIEW ORDER BY theme_id, group_id")]
+    db.rebuild_summary_stats()
+    stats_ok = stats == [tuple(r) for r in db.fetch_all("SELECT * FROM STATS_THEME_GROUP_VIEW ORDER BY theme_id, group_id")]
+    print(f"Запись {len(applied['changes'])} баллов: {apply_s:.2f} с"
+          + ("" if stats_ok else " — агрегаты статистики не совпадают с пересчётом"))
+    db.close()
+    ok = not mismatch and stats_ok and dry_s <= DRY_RUN_BUDGET_S and apply_s <= APPLY_BUDGET_S
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Пропускная способность TestSession без интерфейса: подсчёт результата и сохранение попыток.
+
+    python bench/session_throughput.py [--sessions 5000] [--questions 30] [--students 200]
+
+Сессии моделируются с подменённым временем: часть завершается по таймеру
+(оставшиеся вопросы считаются пропущенными), остальные — ответом на все вопросы.
+Код выхода 1, если сохранено не столько попыток, сколько завершено,
+или пропускная способность ниже бюджета.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from test_session import TestSession
+
+MIN_SCORED_PER_S = 1000
+MIN_SAVED_PER_S = 200
+
+
+def prepare(db, questions, students):
+    # Группа студентов и тест с таймером; вернуть (id студентов, id теста)
+    with db.transaction():
+        db.add_group("Сессии", "0")
+        group_id = db.fetch_one("SELECT id FROM GROUPS WHERE name='Сессии'")["id"]
+        db.import_students(((f"Имя{i}", f"Фамилия{i}") for i in range(students)), group_id)
+        theme_id = db.add_test_with_groups("Нагрузочный тест", 1, [group_id])
+        db.update_test(theme_id, "Нагрузочный тест", 600)
+        for i in range(questions):
+            db.add_question(theme_id, f"Вопрос {i}", [f"Вариант {k}" for k in range(4)], [0, 2] if i % 3 == 0 else [i % 4])
+    users = [r["id"] for r in db.fetch_all("SELECT id FROM USERS WHERE group_id=?", (group_id,))]
+    return users, theme_id
+
+
+def run(db, users, theme_id, questions, count, save):
+    # Провести count сессий; вернуть (сессий в секунду, средний процент)
+    rng = random.Random(23)
+    now = [0.0]
+    clock = lambda: now[0]
+    total = 0.0
+    started = time.perf_counter()
+    for n in range(count):
+        session = TestSession(db, users[n % len(users)], theme_id, questions=questions, timer_seconds=600, clock=clock)
+        timed_out = n % 10 == 0
+        answered = rng.randrange(len(questions)) if timed_out else len(questions)
+        for _ in range(answered):
+            q = session.current_question
+            session.answer(rng.sample(range(4), 2) if session.is_multiple(q) else rng.randrange(4))
+            now[0] += rng.uniform(5, 20)
+        total += session.finish(timed_out=timed_out)["percent"]
+        if save:
+            session.save()
+    return count / (time.perf_counter() - started), total / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--questions", type=int, default=30)
+    parser.add_argument("--students", type=int, default=200)
+    args = parser.parse_args()
+
+    db = Database(os.path.join(tempfile.mkdtemp(), "sessions.db"))
+    users, theme_id = prepare(db, args.questions, args.students)
+    questions = db.get_questions(theme_id)
+    scored, mean = run(db, users, theme_id, questions, args.sessions, save=False)
+    print(f"Подсчёт результата: {scored:.0f} сессий/с (средний результат {mean:.1f}%)")
+    saved, _ = run(db, users, theme_id, questions, args.sessions, save=True)
+    print(f"Подсчёт и сохранение: {saved:.0f} сессий/с")
+    stored = db.fetch_one("SELECT COUNT(*) AS c FROM TEST_SUMMARY WHERE theme_id=?", (theme_id,))["c"]
+    print(f"Сохранено попыток: {stored} из {args.sessions}")
+    db.close()
+    return 1 if stored != args.sessions or scored < MIN_SCORED_PER_S or saved < MIN_SAVED_PER_S else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Замер запуска: открытие базы с актуальной схемой и импорт окна входа.
+
+    python bench/startup.py [--repeat 200]
+
+Для базы с актуальной схемой конструктор Database должен выполнять одно
+чтение PRAGMA user_version и не выполнять DDL. Код выхода 1, если запросов
+больше или среднее время открытия превышает бюджет.
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from database import Database
+from connection_manager import configure_connection
+
+OPEN_BUDGET_MS = 5.0
+
+
+def traced_open(path):
+    # Открыть базу и вернуть (время инициализации в мс, выполненные при этом запросы)
+    conn = configure_connection(sqlite3.connect(path))
+    statements = []
+    conn.set_trace_callback(statements.append)
+    started = time.perf_counter()
+    db = Database(path, conn=conn)
+    elapsed = (time.perf_counter() - started) * 1000
+    conn.set_trace_callback(None)
+    db.close()
+    conn.close()
+    return elapsed, statements
+
+
+def import_time_ms():
+    # Время импорта окна входа в отдельном процессе (как при запуске app.py)
+    code = ("import time; t = time.perf_counter(); import login_form; "
+            "print((time.perf_counter() - t) * 1000)")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    return float(out.stdout.strip()) if out.returncode == 0 else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "startup.db")
+    first_ms, first_statements = traced_open(path)
+    timings = []
+    for _ in range(args.repeat):
+        elapsed, statements = traced_open(path)
+        timings.append(elapsed)
+    timings.sort()
+    mean = sum(timings) / len(timings)
+    print(f"Первый запуск (все миграции): {first_ms:.1f} мс, запросов: {len(first_statements)}")
+    print(f"Повторное открытие: среднее {mean:.3f} мс, медиана {timings[len(timings) // 2]:.3f} мс, "
+          f"запросов: {len(statements)} {statements}")
+    imported = import_time_ms()
+    if imported is not None:
+        print(f"Импорт login_form: {imported:.0f} мс")
+
+    ok = len(statements) == 1 and mean <= OPEN_BUDGET_MS
+    if not ok:
+        print(f"Ожидался один запрос и не больше {OPEN_BUDGET_MS} мс на открытие.", file=sys.stderr)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
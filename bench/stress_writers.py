@@ -0,0 +1,116 @@
+"""
+Нагрузочный прогон одновременной сдачи теста классом: N процессов-студентов
+одновременно завершают попытки и сохраняют результаты в один файл базы.
+
+    python bench/stress_writers.py [--processes 30] [--attempts 5] [--journal-mode WAL]
+                                   [--busy-timeout 5000] [--db путь]
+
+Выводит время, пропускную способность, перцентили времени сохранения попытки
+(p50/p95/p99 и максимум; в него входит ожидание блокировки записи) и число
+потерянных результатов; код выхода 1, если хотя бы один результат не сохранился.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from test_session import TestSession
+
+QUESTIONS = 20
+
+
+def prepare(path, processes, journal_mode, busy_timeout):
+    # Группа со студентами и тест с вопросами; вернуть (id студентов, id теста)
+    db = Database(path, journal_mode=journal_mode, busy_timeout_ms=busy_timeout)
+    with db.transaction():
+        db.add_group("Нагрузка", "0")
+        group_id = db.fetch_one("SELECT id FROM GROUPS WHERE name='Нагрузка'")["id"]
+        for i in range(processes):
+            db.add_student(f"Студент{i}", "Нагрузочный", group_id)
+        theme_id = db.add_test("Нагрузочный тест", 1)
+        for i in range(QUESTIONS):
+            db.add_question(theme_id, f"Вопрос {i}", ["a", "b", "c", "d"], [i % 4])
+    students = [r["id"] for r in db.fetch_all("SELECT id FROM USERS WHERE group_id=?", (group_id,))]
+    db.close()
+    return students, theme_id
+
+
+def student(path, user_id, theme_id, attempts, journal_mode, busy_timeout, start, results):
+    # Процесс студента: дождаться общего старта и сохранить attempts попыток подряд
+    db = Database(path, journal_mode=journal_mode, busy_timeout_ms=busy_timeout)
+    questions = db.get_questions(theme_id)
+    start.wait()
+    saved = failed = 0
+    waits = []   # время каждого сохранения, с
+    for _ in range(attempts):
+        session = TestSession(db, user_id, theme_id, questions=questions)
+        for q in questions:
+            session.answer(q["correct_options"][0])
+        session.finish()
+        started = time.perf_counter()
+        try:
+            session.save()
+            saved += 1
+        except Exception as e:
+            failed += 1
+            print(f"Студент {user_id}: {e}", file=sys.stderr)
+        waits.append(time.perf_counter() - started)
+    results.put((saved, failed, waits))
+    db.close()
+
+
+def percentile(values, p):
+    # Перцентиль по отсортированному списку (ближайший ранг)
+    return values[min(len(values) - 1, max(0, int(len(values) * p / 100 + 0.5) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=30)
+    parser.add_argument("--attempts", type=int, default=5)
+    parser.add_argument("--journal-mode", default=None)
+    parser.add_argument("--busy-timeout", type=int, default=None)
+    parser.add_argument("--db", default=None)
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "stress.db")
+    students, theme_id = prepare(path, args.processes, args.journal_mode, args.busy_timeout)
+    start = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=student, args=(path, user_id, theme_id, args.attempts,
+                                                      args.journal_mode, args.busy_timeout, start, results))
+        for user_id in students
+    ]
+    for w in workers:
+        w.start()
+    time.sleep(0.5)   # дать процессам открыть соединения
+    started = time.perf_counter()
+    start.set()
+    totals = [results.get() for _ in workers]
+    elapsed = time.perf_counter() - started
+    for w in workers:
+        w.join()
+
+    db = Database(path, journal_mode=args.journal_mode)
+    stored = db.fetch_one("SELECT COUNT(*) AS c FROM TEST_SUMMARY WHERE theme_id=?", (theme_id,))["c"]
+    mode = db.fetch_one("PRAGMA journal_mode")[0]
+    db.close()
+    expected = len(students) * args.attempts
+    failed = sum(f for _, f, _ in totals)
+    waits = sorted(w * 1000 for _, _, process_waits in totals for w in process_waits)
+    print(f"Журнал: {mode}, процессов: {len(students)}, попыток: {expected}")
+    print(f"Время: {elapsed:.2f} с, {expected / elapsed:.0f} сохранений/с")
+    print("Сохранение попытки, мс: " + ", ".join(f"p{p} {percentile(waits, p):.1f}" for p in (50, 95, 99))
+          + f", максимум {waits[-1]:.1f}")
+    print(f"Сохранено: {stored}, ошибок: {failed}, потеряно: {expected - stored}")
+    return 1 if stored != expected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
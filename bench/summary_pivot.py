@@ -0,0 +1,77 @@
+"""
+Замер сводной таблицы «По всем тестам» (Database.get_group_summary).
+
+    python bench/summary_pivot.py [--students 500] [--tests 100] [--page 50]
+
+Строит группу из students студентов с результатами по tests тестам (по одной попытке,
+у части студентов — повторные), замеряет полную сводку и одну страницу и сверяет
+ячейки с прямым запросом последнего результата. Код выхода 1 при расхождении
+или превышении бюджета.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+FULL_BUDGET_S = 2.0
+
+
+def prepare(db, students, tests):
+    # Группа, тесты преподавателя (id 1) и результаты; вернуть id группы
+    rng = random.Random(5)
+    with db.transaction():
+        db.add_group("Сводная", "0")
+        group_id = db.fetch_one("SELECT id FROM GROUPS WHERE name='Сводная'")["id"]
+        db.import_students(((f"Имя{i}", f"Фамилия{i:04d}") for i in range(students)), group_id)
+        theme_ids = [db.add_test_with_groups(f"Тест {t}", 1, [group_id]) for t in range(tests)]
+        users = [r["id"] for r in db.fetch_all("SELECT id FROM USERS WHERE group_id=?", (group_id,))]
+        rows = [(u, t, rng.randint(0, 100)) for u in users for t in theme_ids if rng.random() < 0.9]
+        rows += [(u, t, rng.randint(0, 100)) for u, t, _ in rng.sample(rows, len(rows) // 10)]
+        db._execute("INSERT INTO TEST_SUMMARY (user_id, theme_id, score, date, answers) "
+                    "VALUES (?, ?, ?, '2024-01-01', '')", rows, many=True)
+    return group_id
+
+
+def timed(func, *args, **kwargs):
+    # Результат вызова и время в секундах
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--tests", type=int, default=100)
+    parser.add_argument("--page", type=int, default=50)
+    args = parser.parse_args()
+
+    db = Database(os.path.join(tempfile.mkdtemp(), "summary.db"))
+    group_id = prepare(db, args.students, args.tests)
+    summary, full = timed(db.get_group_summary, group_id, 1)
+    _, page = timed(db.get_group_summary, group_id, 1, offset=args.students // 2, limit=args.page)
+    print(f"Сводка {len(summary['rows'])} x {len(summary['tests'])}: {full * 1000:.0f} мс, "
+          f"страница из {args.page} студентов: {page * 1000:.0f} мс")
+
+    # Сверка случайных ячеек с последним результатом студента по тесту
+    rng = random.Random(1)
+    mismatches = 0
+    for _ in range(200):
+        row = rng.choice(summary["rows"])
+        col = rng.randrange(len(summary["tests"]))
+        latest = db.fetch_one("SELECT score FROM TEST_SUMMARY WHERE user_id=? AND theme_id=? ORDER BY id DESC LIMIT 1",
+                              (row["id"], summary["tests"][col]["id"]))
+        mismatches += (latest["score"] if latest else None) != row["scores"][col]
+    print("Ячейки совпадают с прямым запросом." if not mismatches else f"Расхождений: {mismatches}")
+    db.close()
+    return 1 if mismatches or full > FULL_BUDGET_S else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import os
+import sys
+import sqlite3
+import threading
+import atexit
+from contextlib import contextmanager
+
+# Режим журнала и время ожидания блокировки по умолчанию.
+# WAL позволяет читателям не мешать писателю, но требует общей памяти между процессами
+# и не работает на сетевом диске — там по умолчанию используется журнал отката (DELETE).
+JOURNAL_MODE = "WAL"
+NETWORK_JOURNAL_MODE = "DELETE"
+BUSY_TIMEOUT_MS = 5000
+JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+
+# Типы файловых систем Linux, считающиеся сетевыми (по /proc/mounts)
+_NETWORK_FS_TYPES = {"nfs", "nfs4", "cifs", "smbfs", "smb3", "9p", "afs", "ncpfs", "davfs", "fuse.sshfs"}
+_DRIVE_REMOTE = 4  # GetDriveTypeW: сетевой диск Windows
+
+
+def is_network_path(db_path):
+    # Файл базы на сетевом диске: UNC-путь, подключённый сетевой диск Windows или сетевая ФС Linux
+    if db_path == ":memory:" or db_path.startswith("file:"):
+        return False
+    if db_path.startswith(("\\\\", "//")):
+        return True
+    path = os.path.abspath(db_path)
+    if sys.platform == "win32":
+        import ctypes
+        drive = os.path.splitdrive(path)[0]
+        return bool(drive) and ctypes.windll.kernel32.GetDriveTypeW(drive + "\\") == _DRIVE_REMOTE
+    try:
+        with open("/proc/mounts", encoding="utf-8") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return False
+    # Файловая система самой длинной точки монтирования, содержащей путь
+    best, fs_type = "", None
+    for mount_point, mount_fs in mounts:
+        mount_point = mount_point.replace("\\040", " ")
+        prefix = mount_point.rstrip("/") + "/"
+        if (path == mount_point or path.startswith(prefix)) and len(mount_point) > len(best):
+            best, fs_type = mount_point, mount_fs
+    return fs_type in _NETWORK_FS_TYPES
+
+
+def default_journal_mode(db_path):
+    # Режим журнала для файла: WAL на локальном диске, DELETE на сетевом
+    return NETWORK_JOURNAL_MODE if is_network_path(db_path) else JOURNAL_MODE
+
+
+def configure_connection(conn, journal_mode=JOURNAL_MODE, busy_timeout_ms=BUSY_TIMEOUT_MS):
+    # Настроить соединение: доступ по имени столбца, внешние ключи, режим журнала, ожидание блокировки
+    if journal_mode and journal_mode.upper() not in JOURNAL_MODES:
+        raise ValueError(f"Неизвестный режим журнала: {journal_mode}")
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+    conn.execute("PRAGMA foreign_keys = ON")
+    if journal_mode:
+        conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+        if journal_mode.upper() == "WAL":
+            # В режиме WAL достаточно синхронизации при контрольной точке
+            conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+class ConnectionManager:
+    """Общий для процесса менеджер соединений с файлом базы данных"""
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, db_path="database.db", pool_size=2, journal_mode=None, busy_timeout_ms=None):
+        # journal_mode / busy_timeout_ms — None: по умолчанию (режим журнала — по расположению файла)
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.journal_mode = journal_mode or default_journal_mode(db_path)
+        self.busy_timeout_ms = BUSY_TIMEOUT_MS if busy_timeout_ms is None else busy_timeout_ms
+        self._main = None
+        self._idle = []
+        self._busy = set()
+        self._cond = threading.Condition()
+        self._closed = False
+        # Счётчики за время работы сессии
+        self.stats = {"opened": 0, "closed": 0, "borrowed": 0, "reused": 0, "waits": 0}
+
+    # --- Получение общего менеджера ---
+    @classmethod
+    def get(cls, db_path="database.db", journal_mode=None, busy_timeout_ms=None):
+        # Вернуть менеджер для файла БД (создаётся один раз на процесс);
+        # настройки соединений применяются при создании менеджера
+        with cls._instances_lock:
+            manager = cls._instances.get(db_path)
+            if manager is None or manager.closed:
+                manager = cls(db_path, journal_mode=journal_mode, busy_timeout_ms=busy_timeout_ms)
+                cls._instances[db_path] = manager
+            return manager
+
+    @classmethod
+    def close_all(cls):
+        # Закрыть все менеджеры процесса (вызывается при выходе)
+        with cls._instances_lock:
+            managers = list(cls._instances.values())
+            cls._instances.clear()
+        for manager in managers:
+            manager.close()
+
+    # --- Работа с соединениями ---
+    def _connect(self, check_same_thread=True):
+        # Открыть новое соединение и учесть его в счётчиках
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000,
+                               check_same_thread=check_same_thread)
+        configure_connection(conn, self.journal_mode, self.busy_timeout_ms)
+        self.stats["opened"] += 1
+        return conn
+
+    @property
+    def closed(self):
+        return self._closed
+
+    @property
+    def connection(self):
+        # Основное соединение для потока интерфейса
+        if self._closed:
+            raise RuntimeError("Менеджер соединений уже закрыт.")
+        if self._main is None:
+            self._main = self._connect()
+        return self._main
+
+    def acquire(self, timeout=None):
+        # Взять соединение из пула для фонового потока
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Менеджер соединений уже закрыт.")
+                if self._idle:
+                    conn = self._idle.pop()
+                    self.stats["reused"] += 1
+                    break
+                if len(self._busy) < self.pool_size:
+                    conn = self._connect(check_same_thread=False)
+                    break
+                self.stats["waits"] += 1
+                if not self._cond.wait(timeout):
+                    raise TimeoutError("Нет свободных соединений с базой данных.")
+            self._busy.add(conn)
+            self.stats["borrowed"] += 1
+            return conn
+
+    def release(self, conn):
+        # Вернуть соединение в пул
+        with self._cond:
+            self._busy.discard(conn)
+            if self._closed:
+                conn.close()
+                self.stats["closed"] += 1
+            else:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def borrow(self, timeout=None):
+        # Контекстный менеджер: with manager.borrow() as conn: ...
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        # Закрыть основное и все свободные соединения пула
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            for conn in self._idle:
+                conn.close()
+                self.stats["closed"] += 1
+            self._idle.clear()
+            if self._main is not None:
+                self._main.close()
+                self._main = None
+                self.stats["closed"] += 1
+            self._cond.notify_all()
+
+    def summary(self):
+        # Краткая сводка по соединениям за сессию
+        s = self.stats
+        return (f"{self.db_path}: открыто {s['opened']}, закрыто {s['closed']}, "
+                f"выдано из пула {s['borrowed']} (повторно {s['reused']}), ожиданий {s['waits']}")
+
+
+atexit.register(ConnectionManager.close_all)
@@ -1,31 +1,193 @@
 import sqlite3
 import hashlib
+import json
 import datetime
+import threading
+import time
+import random
+import os
+import sys
+from contextlib import contextmanager
+from connection_manager import ConnectionManager, configure_connection, default_journal_mode, BUSY_TIMEOUT_MS
+from question_cache import QuestionCache
+from response_codec import encode_responses, decode_responses
+import migrations
+
+_CONTEXTLIB_FILE = contextmanager.__code__.co_filename
 
 class Database:
-    def __init__(self, db_path: str = "database.db"):
-        # Инициализация соединения с базой данных
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    # Повтор операций записи при блокировке базы другим процессом
+    RETRY_ATTEMPTS = 5
+    RETRY_BASE_DELAY = 0.05
+    RETRY_MAX_DELAY = 1.0
+
+    # Шаг позиций вопросов: промежутки позволяют вставлять вопрос между соседними без перенумерации
+    POSITION_STEP = 1024
+
+    def __init__(self, db_path: str = "database.db", conn=None, journal_mode=None, busy_timeout_ms=None):
+        # Инициализация соединения с базой данных; journal_mode / busy_timeout_ms —
+        # настройки собственного соединения (None — как у менеджера соединений)
         self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
+        self._owns_conn = conn is None
+        if conn is None:
+            busy_timeout_ms = BUSY_TIMEOUT_MS if busy_timeout_ms is None else busy_timeout_ms
+            conn = configure_connection(
+                sqlite3.connect(self.db_path, timeout=busy_timeout_ms / 1000),
+                journal_mode or default_journal_mode(db_path), busy_timeout_ms
+            )
+        self.conn = conn
         self.conn.row_factory = sqlite3.Row  # Позволяет обращаться к столбцам по имени
+        self._tx_depth = 0  # Глубина вложенности транзакций (0 — вне транзакции)
+        self._query_listeners = []  # Обработчики событий запросов (см. query_stats.py)
+        self.question_cache = QuestionCache()
+        self._data_version = None  # PRAGMA data_version на момент заполнения кэша
         self.initialize()
 
+    @classmethod
+    def shared(cls, db_path: str = "database.db", journal_mode=None, busy_timeout_ms=None):
+        # Общий для всех форм экземпляр на основном соединении менеджера
+        # (режим журнала и ожидание блокировки учитываются при первом вызове)
+        with cls._shared_lock:
+            db = cls._shared.get(db_path)
+            manager = ConnectionManager.get(db_path, journal_mode, busy_timeout_ms)
+            if db is None or db.conn is not manager.connection:
+                db = cls(db_path, conn=manager.connection)
+                cls._shared[db_path] = db
+            return db
+
+    def close(self):
+        # Закрыть собственное соединение (общее закрывает менеджер)
+        if self._owns_conn:
+            self.conn.close()
+
     # --- Вспомогательные методы работы с БД ---
+    @contextmanager
+    def transaction(self):
+        """
+        Единица работы: все запросы внутри блока фиксируются одним COMMIT.
+        Вложенный вызов открывает точку сохранения (SAVEPOINT), которая
+        откатывается отдельно при исключении внутри вложенного блока.
+        """
+        if self._tx_depth == 0:
+            if self.conn.in_transaction:
+                # Неявная транзакция, оставшаяся от запроса вне transaction(): её нельзя ни молча
+                # откатить (пропадут чужие изменения), ни зафиксировать вместе с этим блоком
+                raise RuntimeError(
+                    "На соединении осталась незафиксированная транзакция: "
+                    "запросы вне transaction() нужно зафиксировать или откатить"
+                )
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._tx_depth = 1
+            try:
+                yield self
+            except BaseException:
+                self._tx_depth = 0
+                self.conn.rollback()
+                raise
+            self._tx_depth = 0
+            self.conn.commit()
+        else:
+            name = f"sp_{self._tx_depth}"
+            self.conn.execute(f"SAVEPOINT {name}")
+            self._tx_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._tx_depth -= 1
+                self.conn.execute(f"ROLLBACK TO {name}")
+                self.conn.execute(f"RELEASE {name}")
+                raise
+            self._tx_depth -= 1
+            self.conn.execute(f"RELEASE {name}")
+
     def _execute(self, query, params=(), fetch=False, many=False):
         """
         Универсальный метод для выполнения SQL-запросов.
         fetch=True — вернуть результат запроса (fetchall)
         many=True — использовать executemany для пакетных операций
+        Внутри transaction() фиксация откладывается до конца блока.
+        Если база занята другим процессом, одиночный запрос повторяется
+        с экспоненциальной задержкой (не более RETRY_ATTEMPTS раз).
         """
-        cur = self.conn.cursor()
-        if many:
-            cur.executemany(query, params)
-        else:
-            cur.execute(query, params)
-        if fetch:
-            return cur.fetchall()
-        self.conn.commit()
-        return cur
+        own_transaction = self._tx_depth == 0 and not self.conn.in_transaction
+        started = time.perf_counter() if self._query_listeners else None
+        attempt = 0
+        while True:
+            try:
+                cur = self.conn.cursor()
+                if many:
+                    cur.executemany(query, params)
+                else:
+                    cur.execute(query, params)
+                if fetch:
+                    rows = cur.fetchall()
+                    if started is not None:
+                        self._notify_query(query, params, many, started, len(rows))
+                    return rows
+                if self._tx_depth == 0:
+                    self.conn.commit()
+                if started is not None:
+                    self._notify_query(query, params, many, started, cur.rowcount)
+                return cur
+            except Exception as e:
+                # Неудачный одиночный запрос не должен оставлять открытую транзакцию
+                # (и удерживать блокировку записи), например после IntegrityError
+                if own_transaction and self.conn.in_transaction:
+                    self.conn.rollback()
+                attempt += 1
+                if (not own_transaction or not isinstance(e, sqlite3.OperationalError)
+                        or not self._is_locked_error(e) or attempt >= self.RETRY_ATTEMPTS):
+                    raise
+                time.sleep(self._retry_delay(attempt))
+
+    # --- Инструментирование запросов ---
+    def add_query_listener(self, listener):
+        # Подписать обработчик на события запросов: listener(event: dict)
+        if listener not in self._query_listeners:
+            self._query_listeners.append(listener)
+
+    def remove_query_listener(self, listener):
+        # Отписать обработчик событий запросов
+        if listener in self._query_listeners:
+            self._query_listeners.remove(listener)
+
+    def _notify_query(self, query, params, many, started, rows):
+        # Передать обработчикам время выполнения, число строк и место вызова
+        event = {
+            "query": query,
+            "params": params,
+            "many": many,
+            "duration": time.perf_counter() - started,
+            "rows": rows,
+            "call_site": self._call_site(),
+            "conn": self.conn,
+        }
+        for listener in list(self._query_listeners):
+            listener(event)
+
+    @staticmethod
+    def _call_site():
+        # Первый кадр стека за пределами database.py: «файл:строка функция»
+        frame = sys._getframe(2)
+        while frame and frame.f_code.co_filename in (__file__, _CONTEXTLIB_FILE):
+            frame = frame.f_back
+        if not frame:
+            return "?"
+        return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+
+    @staticmethod
+    def _is_locked_error(error):
+        # Ошибка блокировки базы («database is locked» / «database is busy»)
+        message = str(error).lower()
+        return "locked" in message or "busy" in message
+
+    def _retry_delay(self, attempt):
+        # Экспоненциальная задержка со случайным разбросом
+        delay = min(self.RETRY_BASE_DELAY * (2 ** (attempt - 1)), self.RETRY_MAX_DELAY)
+        return delay * (0.5 + random.random() / 2)
 
     def fetch_one(self, query, params=()):
         # Получить одну строку результата запроса
@@ -36,102 +198,36 @@ class Database:
         # Получить все строки результата запроса
         return self._execute(query, params, fetch=True)
 
-    def _column_exists(self, table, column):
-        # Проверить, существует ли столбец в таблице
-        return any(r["name"] == column for r in self._execute(f"PRAGMA table_info({table})", fetch=True))
+    def iter_rows(self, query, params=(), chunk_size=500):
+        # Построчно вернуть результат запроса, читая курсор порциями (память не зависит от размера выборки)
+        started = time.perf_counter() if self._query_listeners else None
+        cur = self.conn.cursor()
+        count = 0
+        try:
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                count += len(rows)
+                yield from rows
+        finally:
+            cur.close()
+            if started is not None:
+                self._notify_query(query, params, False, started, count)
 
     @staticmethod
     def hash_password(password):
         # Хеширование пароля с помощью SHA-256
         return hashlib.sha256(password.encode()).hexdigest() if password else None
 
-    # --- Инициализация базы данных и создание таблиц ---
+    # --- Инициализация базы данных и миграции схемы ---
     def initialize(self):
-        # Создание таблиц и добавление администратора по умолчанию
-        self._create_tables()
-        if not self.fetch_one("SELECT 1 FROM USERS WHERE username='admin'"):
-            self.add_admin("admin", "Admin", "User", "admin123")
-        # Добавление новых столбцов при необходимости (миграция)
-        if not self._column_exists("THEME", "timer_seconds"):
-            self._execute("ALTER TABLE THEME ADD COLUMN timer_seconds INTEGER")
-        if not self._column_exists("TEST_SUMMARY", "answers"):
-            self._execute("ALTER TABLE TEST_SUMMARY ADD COLUMN answers TEXT")
-
-    def _create_tables(self):
-        # Создание всех необходимых таблиц, если их нет
-        tables = [
-            # Таблица групп
-            """CREATE TABLE IF NOT EXISTS GROUPS (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                access_code TEXT NOT NULL
-            )""",
-            # Таблица пользователей
-            """CREATE TABLE IF NOT EXISTS USERS (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE,
-                password TEXT,
-                role TEXT NOT NULL,
-                first_name TEXT,
-                last_name TEXT,
-                middle_name TEXT,
-                group_id INTEGER,
-                FOREIGN KEY (group_id) REFERENCES GROUPS(id)
-            )""",
-            # Таблица связей преподавателей и групп
-            """CREATE TABLE IF NOT EXISTS ADMIN_GROUP (
-                admin_id INTEGER,
-                group_id INTEGER,
-                FOREIGN KEY(admin_id) REFERENCES USERS(id),
-                FOREIGN KEY(group_id) REFERENCES GROUPS(id),
-                PRIMARY KEY(admin_id, group_id)
-            )""",
-            # Таблица тестов (тем)
-            """CREATE TABLE IF NOT EXISTS THEME (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                timer_seconds INTEGER,
-                author_id INTEGER,
-                FOREIGN KEY (author_id) REFERENCES USERS(id)
-            )""",
-            # Таблица связей тестов и групп
-            """CREATE TABLE IF NOT EXISTS THEME_GROUP (
-                theme_id INTEGER,
-                group_id INTEGER,
-                FOREIGN KEY(theme_id) REFERENCES THEME(id),
-                FOREIGN KEY(group_id) REFERENCES GROUPS(id)
-            )""",
-            # Таблица вопросов
-            """CREATE TABLE IF NOT EXISTS QUESTION (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                theme_id INTEGER,
-                text TEXT NOT NULL,
-                correct_options TEXT NOT NULL,
-                theme_local_number INTEGER,
-                FOREIGN KEY (theme_id) REFERENCES THEME(id)
-            )""",
-            # Таблица вариантов ответов
-            """CREATE TABLE IF NOT EXISTS ANSWER (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                question_id INTEGER,
-                text TEXT NOT NULL,
-                FOREIGN KEY (question_id) REFERENCES QUESTION(id)
-            )""",
-            # Таблица результатов тестирования
-            """CREATE TABLE IF NOT EXISTS TEST_SUMMARY (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                theme_id INTEGER,
-                score INTEGER,
-                date TEXT,
-                answers TEXT,
-                elapsed_seconds INTEGER,
-                FOREIGN KEY (user_id) REFERENCES USERS(id),
-                FOREIGN KEY (theme_id) REFERENCES THEME(id)
-            )"""
-        ]
-        for table in tables:
-            self._execute(table)
+        # Привести схему к актуальной версии; если она уже актуальна — одно чтение PRAGMA
+        migrations.check_sqlite_version()
+        if migrations.get_version(self.conn) >= migrations.latest_version():
+            return
+        migrations.migrate(self, self.conn)
 
     # --- Методы управления пользователями ---
     def add_student(self, first_name, last_name, group_id):
@@ -141,6 +237,49 @@ class Database:
             (None, None, "student", group_id, first_name, last_name)
         )
 
+    def import_students(self, rows, group_id, chunk_size=500, progress=None):
+        """
+        Пакетный импорт студентов в группу одной транзакцией.
+        rows — итерируемый поток пар (имя, фамилия); пустые значения и дубликаты
+        (уже существующие в группе или повторяющиеся в файле) пропускаются.
+        progress(обработано) вызывается после каждой пачки.
+        Возвращает словарь со счётчиками added / duplicates / invalid.
+        """
+        existing = {
+            (r["first_name"], r["last_name"])
+            for r in self.fetch_all(
+                "SELECT first_name, last_name FROM USERS WHERE group_id = ? AND role = 'student'", (group_id,)
+            )
+        }
+        result = {"added": 0, "duplicates": 0, "invalid": 0}
+        processed = 0
+        chunk = []
+        query = "INSERT INTO USERS (username, password, role, group_id, first_name, last_name) VALUES (NULL, NULL, 'student', ?, ?, ?)"
+        with self.transaction():
+            for first_name, last_name in rows:
+                processed += 1
+                first_name = (first_name or "").strip()
+                last_name = (last_name or "").strip()
+                if not first_name or not last_name:
+                    result["invalid"] += 1
+                elif (first_name, last_name) in existing:
+                    result["duplicates"] += 1
+                else:
+                    existing.add((first_name, last_name))
+                    chunk.append((group_id, first_name, last_name))
+                if len(chunk) >= chunk_size:
+                    self._execute(query, chunk, many=True)
+                    result["added"] += len(chunk)
+                    chunk = []
+                    if progress:
+                        progress(processed)
+            if chunk:
+                self._execute(query, chunk, many=True)
+                result["added"] += len(chunk)
+        if progress:
+            progress(processed)
+        return result
+
     def add_admin(self, username, first_name, last_name, password):
         # Добавить нового преподавателя (администратора)
         if not username or not password:
@@ -191,9 +330,8 @@ class Database:
             raise ValueError("Пользователь с таким именем уже существует")
 
     def delete_user(self, user_id):
-        # Удалить пользователя и его связи с группами (если админ)
+        # Удалить пользователя; связи с группами и результаты удаляются каскадно
         self._execute("DELETE FROM USERS WHERE id=?", (user_id,))
-        self._execute("DELETE FROM ADMIN_GROUP WHERE admin_id=?", (user_id,))
 
     def get_user_by_id(self, user_id):
         # Получить пользователя по id
@@ -291,7 +429,7 @@ class Database:
         self._execute("UPDATE GROUPS SET name=?, access_code=? WHERE id=?", (name, access_code, group_id))
 
     def delete_group(self, group_id):
-        # Удалить группу
+        # Удалить группу; назначения тестов и преподавателей удаляются каскадно
         self._execute("DELETE FROM GROUPS WHERE id=?", (group_id,))
 
     # --- Методы управления тестами (темами) ---
@@ -302,16 +440,23 @@ class Database:
 
     def get_theme(self, theme_id):
         # Получить тему (тест) по id
-        row = self.fetch_one("SELECT id, name, timer_seconds FROM THEME WHERE id=?", (theme_id,))
+        row = self.fetch_one(
+            "SELECT id, name, timer_seconds, draw_count, shuffle_options, stratify FROM THEME WHERE id=?", (theme_id,)
+        )
         if row:
-            return {"id": row["id"], "name": row["name"], "timer_seconds": row["timer_seconds"]}
+            return {
+                "id": row["id"], "name": row["name"], "timer_seconds": row["timer_seconds"],
+                "draw_count": row["draw_count"], "shuffle_options": bool(row["shuffle_options"]),
+                "stratify": bool(row["stratify"])
+            }
         return None
 
     def add_test(self, test_name, author_id, timer_seconds=None):
         # Добавить новый тест (тему)
         try:
-            self._execute("INSERT INTO THEME (name, author_id, timer_seconds) VALUES (?, ?, ?)", (test_name, author_id, timer_seconds))
-            return self.fetch_one("SELECT id FROM THEME WHERE name = ?", (test_name,))["id"]
+            return self._execute(
+                "INSERT INTO THEME (name, author_id, timer_seconds) VALUES (?, ?, ?)", (test_name, author_id, timer_seconds)
+            ).lastrowid
         except sqlite3.IntegrityError:
             raise ValueError("Тест с таким названием уже существует.")
 
@@ -319,8 +464,17 @@ class Database:
         # Обновить название и время теста
         self._execute("UPDATE THEME SET name=?, timer_seconds=? WHERE id=?", (test_name, timer_seconds, test_id))
 
+    def update_test_pool(self, test_id, draw_count=None, shuffle_options=False, stratify=False):
+        # Параметры выборки вопросов: сколько вытягивать в попытку (None — все), перемешивание вариантов, выборка по тегам
+        if draw_count is not None and draw_count <= 0:
+            raise ValueError("Количество вопросов в попытке должно быть больше нуля.")
+        self._execute(
+            "UPDATE THEME SET draw_count=?, shuffle_options=?, stratify=? WHERE id=?",
+            (draw_count, int(shuffle_options), int(stratify), test_id)
+        )
+
     def delete_test(self, test_id, user_id=None):
-        # Удалить тест (тему) и все связанные вопросы и ответы
+        # Удалить тест (тему); вопросы, ответы, назначения и результаты удаляются каскадно
         test = self.fetch_one("SELECT author_id FROM THEME WHERE id=?", (test_id,))
         if not test:
             raise ValueError("Тест не найден.")
@@ -330,77 +484,212 @@ class Database:
                 raise ValueError("Пользователь не найден.")
             if user["id"] != test["author_id"] and not (user["role"] == "admin" and user["username"] == "admin"):
                 raise PermissionError("Вы не можете удалить этот тест.")
-        question_ids = self._execute("SELECT id FROM QUESTION WHERE theme_id = ?", (test_id,), fetch=True)
-        if question_ids:
-            self._execute("DELETE FROM ANSWER WHERE question_id = ?", [(qid["id"],) for qid in question_ids], many=True)
-        self._execute("DELETE FROM QUESTION WHERE theme_id = ?", (test_id,))
         self._execute("DELETE FROM THEME WHERE id = ?", (test_id,))
+        self.question_cache.invalidate_theme(test_id)
 
     # --- Методы управления вопросами и вариантами ответов ---
     def get_questions(self, theme_id):
-        # Получить список вопросов и вариантов ответов для теста
+        # Получить список вопросов и вариантов ответов для теста (с кэшем по теме)
+        self._check_external_changes()
+        questions = self.question_cache.get(theme_id)
+        if questions is None:
+            questions = self._load_questions(theme_id)
+            self.question_cache.put(theme_id, questions)
+        return questions
+
+    def _check_external_changes(self):
+        # Сбросить кэш вопросов, если базу изменило другое соединение или процесс
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self.question_cache.clear()
+            self._data_version = version
+
+    def _load_questions(self, theme_id):
+        # Загрузить вопросы темы одним упорядоченным запросом; номер вопроса — его место по позиции
         query = """
-            SELECT q.id, q.theme_local_number, q.text, q.correct_options, GROUP_CONCAT(a.text, '|||') AS options
-            FROM QUESTION q
+            SELECT q.id, q.theme_local_number, q.text, q.tag, a.text AS option_text, a.is_correct
+            FROM (
+                SELECT id, text, tag, position, ROW_NUMBER() OVER (ORDER BY position, id) AS theme_local_number
+                FROM QUESTION WHERE theme_id = ?
+            ) q
             LEFT JOIN ANSWER a ON q.id = a.question_id
-            WHERE q.theme_id = ?
-            GROUP BY q.id
+            ORDER BY q.position, q.id, a.ordinal
         """
-        rows = self._execute(query, (theme_id,), fetch=True)
-        return [
-            {
-                "id": row["id"],
-                "theme_local_number": row["theme_local_number"],
-                "text": row["text"],
-                "correct_options": list(map(int, row["correct_options"].split(","))) if row["correct_options"] else [],
-                "options": row["options"].split("|||") if row["options"] else []
-            }
-            for row in rows
-        ]
+        return self._group_question_rows(self._execute(query, (theme_id,), fetch=True))
 
-    def add_question(self, theme_id, text, options, correct_options):
-        # Добавить новый вопрос с вариантами ответов
-        if not options:
-            raise ValueError("Нельзя добавить вопрос без вариантов ответа.")
-        theme_local_number = self.fetch_one(
-            "SELECT COALESCE(MAX(theme_local_number), 0) + 1 AS next_num FROM QUESTION WHERE theme_id = ?",
-            (theme_id,)
-        )["next_num"]
-        cur = self.conn.cursor()
-        cur.execute(
-            "INSERT INTO QUESTION (theme_id, text, correct_options, theme_local_number) VALUES (?, ?, ?, ?)",
-            (theme_id, text, ",".join(map(str, correct_options)), theme_local_number)
+    def get_questions_by_ids(self, question_ids):
+        # Загрузить только указанные вопросы в заданном порядке (вытянутые в попытку из банка темы);
+        # номер вопроса в теме считается по индексу позиций, без загрузки остальных вопросов
+        query = """
+            SELECT q.id, q.text, q.tag, a.text AS option_text, a.is_correct,
+                   (SELECT COUNT(*) FROM QUESTION p
+                    WHERE p.theme_id = q.theme_id AND (p.position, p.id) <= (q.position, q.id)) AS theme_local_number
+            FROM json_each(?) j
+            JOIN QUESTION q ON q.id = j.value
+            LEFT JOIN ANSWER a ON q.id = a.question_id
+            ORDER BY j.key, a.ordinal
+        """
+        return self._group_question_rows(self._execute(query, (json.dumps(list(question_ids)),), fetch=True))
+
+    def draw_question_ids(self, theme_id, count, stratify=False):
+        """
+        Случайно выбрать count вопросов темы средствами SQLite (банк вопросов в Python не загружается).
+        При stratify вопросы выбираются из каждого тега пропорционально его доле в банке.
+        Возвращает список id в случайном порядке.
+        """
+        if not stratify:
+            rows = self._execute(
+                "SELECT id FROM QUESTION WHERE theme_id = ? ORDER BY random() LIMIT ?", (theme_id, count), fetch=True
+            )
+            return [r["id"] for r in rows]
+        strata = self._execute(
+            "SELECT tag, COUNT(*) AS cnt FROM QUESTION WHERE theme_id = ? GROUP BY tag", (theme_id,), fetch=True
         )
-        question_id = cur.lastrowid
-        cur.executemany(
-            "INSERT INTO ANSWER (question_id, text) VALUES (?, ?)",
-            [(question_id, option) for option in options]
+        total = sum(r["cnt"] for r in strata)
+        count = min(count, total)
+        # Квоты методом наибольших остатков: целые части долей, остаток — тегам с большей дробной частью
+        quotas = {r["tag"]: r["cnt"] * count // total for r in strata}
+        by_remainder = sorted(strata, key=lambda r: (-(r["cnt"] * count % total), random.random()))
+        for r in by_remainder[:count - sum(quotas.values())]:
+            quotas[r["tag"]] += 1
+        ids = []
+        for tag, quota in quotas.items():
+            if quota:
+                rows = self._execute(
+                    "SELECT id FROM QUESTION WHERE theme_id = ? AND tag IS ? ORDER BY random() LIMIT ?",
+                    (theme_id, tag, quota), fetch=True
+                )
+                ids.extend(r["id"] for r in rows)
+        random.shuffle(ids)
+        return ids
+
+    def set_question_tag(self, question_id, tag):
+        # Задать тег вопроса (тема, раздел или уровень сложности) для выборки по тегам
+        self._execute("UPDATE QUESTION SET tag = ? WHERE id = ?", ((tag or "").strip() or None, question_id))
+        self.question_cache.invalidate_question(question_id)
+
+    @staticmethod
+    def _group_question_rows(rows):
+        # Собрать строки «вопрос × вариант» в список вопросов с вариантами и индексами правильных
+        questions = []
+        current = None
+        for row in rows:
+            if current is None or current["id"] != row["id"]:
+                current = {
+                    "id": row["id"],
+                    "theme_local_number": row["theme_local_number"],
+                    "text": row["text"],
+                    "tag": row["tag"],
+                    "correct_options": [],
+                    "options": []
+                }
+                questions.append(current)
+            if row["option_text"] is None:
+                continue
+            if row["is_correct"]:
+                current["correct_options"].append(len(current["options"]))
+            current["options"].append(row["option_text"])
+        return questions
+
+    def _insert_answers(self, question_id, options, correct_options):
+        # Вставить варианты ответа с порядковым номером и признаком правильности
+        correct = set(correct_options)
+        self._execute(
+            "INSERT INTO ANSWER (question_id, ordinal, text, is_correct) VALUES (?, ?, ?, ?)",
+            [(question_id, idx, option, int(idx in correct)) for idx, option in enumerate(options)],
+            many=True
         )
-        self.conn.commit()
+
+    def add_question(self, theme_id, text, options, correct_options, before_question_id=None):
+        # Добавить новый вопрос с вариантами ответов (в конец теста или перед указанным вопросом)
+        if not options:
+            raise ValueError("Нельзя добавить вопрос без вариантов ответа.")
+        with self.transaction():
+            row = self.fetch_one(
+                "SELECT COALESCE(MAX(theme_local_number), 0) + 1 AS next_num, COALESCE(MAX(position), 0) AS last_pos "
+                "FROM QUESTION WHERE theme_id = ?",
+                (theme_id,)
+            )
+            if before_question_id is None:
+                position = row["last_pos"] + self.POSITION_STEP
+            else:
+                position = self._position_before(theme_id, before_question_id)
+            # correct_options и theme_local_number в QUESTION сохраняются для совместимости со старыми версиями
+            # приложения; номер вопроса для показа считается при чтении по позиции
+            question_id = self._execute(
+                "INSERT INTO QUESTION (theme_id, text, correct_options, theme_local_number, position) VALUES (?, ?, ?, ?, ?)",
+                (theme_id, text, ",".join(map(str, sorted(correct_options))), row["next_num"], position)
+            ).lastrowid
+            self._insert_answers(question_id, options, correct_options)
+        self.question_cache.invalidate_theme(theme_id)
+        return question_id
 
     def update_question(self, question_id, text, options, correct_options):
         # Обновить текст вопроса и варианты ответов
         if not options:
             raise ValueError("Нельзя обновить вопрос без вариантов ответа.")
-        self._execute(
-            "UPDATE QUESTION SET text = ?, correct_options = ? WHERE id = ?",
-            (text, ",".join(map(str, correct_options)), question_id)
-        )
-        self._execute("DELETE FROM ANSWER WHERE question_id = ?", (question_id,))
-        self._execute(
-            "INSERT INTO ANSWER (question_id, text) VALUES (?, ?)",
-            [(question_id, option) for option in options],
-            many=True
-        )
+        with self.transaction():
+            self._execute(
+                "UPDATE QUESTION SET text = ?, correct_options = ? WHERE id = ?",
+                (text, ",".join(map(str, sorted(correct_options))), question_id)
+            )
+            self._execute("DELETE FROM ANSWER WHERE question_id = ?", (question_id,))
+            self._insert_answers(question_id, options, correct_options)
+        self.question_cache.invalidate_question(question_id)
 
     def delete_question(self, question_id):
-        # Удалить вопрос и все его варианты ответов
-        self._execute("DELETE FROM ANSWER WHERE question_id = ?", (question_id,))
+        # Удалить вопрос; варианты ответов удаляются каскадно
         self._execute("DELETE FROM QUESTION WHERE id = ?", (question_id,))
+        self.question_cache.invalidate_question(question_id)
 
     def update_theme_local_number(self, question_id, new_number):
         # Обновить локальный номер вопроса в теме
         self._execute("UPDATE QUESTION SET theme_local_number = ? WHERE id = ?", (new_number, question_id))
+        self.question_cache.invalidate_question(question_id)
+
+    def move_question(self, question_id, before_question_id=None):
+        # Переместить вопрос перед другим вопросом той же темы (None — в конец); меняется одна позиция
+        row = self.fetch_one("SELECT theme_id FROM QUESTION WHERE id = ?", (question_id,))
+        if not row:
+            raise ValueError("Вопрос не найден.")
+        theme_id = row["theme_id"]
+        with self.transaction():
+            if before_question_id is None:
+                position = self.fetch_one(
+                    "SELECT COALESCE(MAX(position), 0) AS p FROM QUESTION WHERE theme_id = ?", (theme_id,)
+                )["p"] + self.POSITION_STEP
+            else:
+                position = self._position_before(theme_id, before_question_id)
+            self._execute("UPDATE QUESTION SET position = ? WHERE id = ?", (position, question_id))
+        self.question_cache.invalidate_theme(theme_id)
+
+    def _position_before(self, theme_id, before_question_id):
+        # Свободная позиция между вопросом before_question_id и предыдущим; при отсутствии промежутка
+        # позиции темы раздвигаются заново (редкий случай)
+        for _ in range(2):
+            target = self.fetch_one(
+                "SELECT position FROM QUESTION WHERE id = ? AND theme_id = ?", (before_question_id, theme_id)
+            )
+            if not target:
+                raise ValueError("Вопрос не найден.")
+            prev = self.fetch_one(
+                "SELECT COALESCE(MAX(position), 0) AS p FROM QUESTION WHERE theme_id = ? AND position < ?",
+                (theme_id, target["position"])
+            )["p"]
+            if target["position"] - prev >= 2:
+                return (prev + target["position"]) // 2
+            self._respace_positions(theme_id)
+        raise RuntimeError("Не удалось найти позицию для вопроса.")
+
+    def _respace_positions(self, theme_id):
+        # Заново раздать позиции вопросов темы с шагом POSITION_STEP, сохранив порядок
+        self._execute("""
+            UPDATE QUESTION SET position = ordered.rn * ?
+            FROM (
+                SELECT id, ROW_NUMBER() OVER (ORDER BY position, id) AS rn FROM QUESTION WHERE theme_id = ?
+            ) AS ordered
+            WHERE QUESTION.id = ordered.id
+        """, (self.POSITION_STEP, theme_id))
 
     # --- Методы получения тестов и результатов для пользователей и групп ---
     def get_unpassed_tests_for_user(self, user_id, group_id):
@@ -450,26 +739,57 @@ class Database:
     # --- Методы управления назначением тестов группам ---
     def add_test_with_groups(self, test_name, author_id, group_ids, timer_seconds=None):
         # Добавить тест и назначить его нескольким группам
-        available_ids = set(g['id'] for g in self.get_available_groups_for_admin(author_id))
-        for gid in group_ids:
-            if gid not in available_ids:
-                raise ValueError("Вы не можете создать тест для группы, в которую не назначены.")
-        self._execute("INSERT INTO THEME (name, author_id, timer_seconds) VALUES (?, ?, ?)",
-                      (test_name, author_id, timer_seconds))
-        test_id = self.fetch_one("SELECT id FROM THEME WHERE name = ? AND author_id = ?", (test_name, author_id))["id"]
-        for gid in group_ids:
-            self._execute("INSERT INTO THEME_GROUP (theme_id, group_id) VALUES (?, ?)", (test_id, gid))
+        self._check_groups_available(author_id, group_ids, "Вы не можете создать тест для группы, в которую не назначены.")
+        with self.transaction():
+            test_id = self._execute("INSERT INTO THEME (name, author_id, timer_seconds) VALUES (?, ?, ?)",
+                                    (test_name, author_id, timer_seconds)).lastrowid
+            self._sync_group_links("THEME_GROUP", "theme_id", test_id, group_ids)
         return test_id
 
     def update_test_groups(self, test_id, new_group_ids, author_id):
-        # Обновить список групп, которым назначен тест
-        available_ids = set(g['id'] for g in self.get_available_groups_for_admin(author_id))
-        for gid in new_group_ids:
-            if gid not in available_ids:
-                raise ValueError("Вы не можете назначить тест в группу, в которую не назначены.")
-        self._execute("DELETE FROM THEME_GROUP WHERE theme_id=?", (test_id,))
-        for gid in new_group_ids:
-            self._execute("INSERT INTO THEME_GROUP (theme_id, group_id) VALUES (?, ?)", (test_id, gid))
+        # Обновить список групп, которым назначен тест; вернуть {"added": [...], "removed": [...]}
+        self._check_groups_available(author_id, new_group_ids, "Вы не можете назначить тест в группу, в которую не назначены.")
+        return self._sync_group_links("THEME_GROUP", "theme_id", test_id, new_group_ids)
+
+    def set_admin_groups(self, admin_id, group_ids):
+        # Назначить преподавателю ровно указанные группы; вернуть {"added": [...], "removed": [...]}
+        return self._sync_group_links("ADMIN_GROUP", "admin_id", admin_id, group_ids)
+
+    def _sync_group_links(self, table, owner_column, owner_id, group_ids):
+        # Привести связи владельца с группами к заданному набору: вставляются и удаляются только отличия
+        wanted = set(group_ids)
+        with self.transaction():
+            current = {
+                r["group_id"] for r in self.fetch_all(
+                    f"SELECT group_id FROM {table} WHERE {owner_column} = ?", (owner_id,)
+                )
+            }
+            added = sorted(wanted - current)
+            removed = sorted(current - wanted)
+            if removed:
+                self._execute(f"DELETE FROM {table} WHERE {owner_column} = ? AND group_id = ?",
+                              [(owner_id, gid) for gid in removed], many=True)
+            if added:
+                self._execute(f"INSERT OR IGNORE INTO {table} ({owner_column}, group_id) VALUES (?, ?)",
+                              [(owner_id, gid) for gid in added], many=True)
+        return {"added": added, "removed": removed}
+
+    def _check_groups_available(self, admin_id, group_ids, message):
+        # Проверить одним запросом, что все группы доступны преподавателю (главному администратору — все)
+        group_ids = set(group_ids)
+        if not group_ids:
+            return
+        placeholders = ",".join("?" * len(group_ids))
+        row = self.fetch_one(
+            f"""SELECT COUNT(*) AS cnt FROM GROUPS g
+                WHERE g.id IN ({placeholders}) AND (
+                    EXISTS (SELECT 1 FROM USERS u WHERE u.id = ? AND u.role = 'admin' AND u.username = 'admin')
+                    OR EXISTS (SELECT 1 FROM ADMIN_GROUP ag WHERE ag.admin_id = ? AND ag.group_id = g.id)
+                )""",
+            (*group_ids, admin_id, admin_id)
+        )
+        if row["cnt"] != len(group_ids):
+            raise ValueError(message)
 
     def remove_test_from_group(self, test_id, group_id, user_id=None):
         # Удалить тест из группы (и сам тест, если он больше ни к одной группе не привязан)
@@ -482,10 +802,11 @@ class Database:
                 raise ValueError("Пользователь не найден.")
             if user["id"] != test["author_id"] and not (user["role"] == "admin" and user["username"] == "admin"):
                 raise PermissionError("Вы не можете удалить этот тест.")
-        self._execute("DELETE FROM THEME_GROUP WHERE theme_id=? AND group_id=?", (test_id, group_id))
-        count = self.fetch_one("SELECT COUNT(*) as cnt FROM THEME_GROUP WHERE theme_id=?", (test_id,))["cnt"]
-        if count == 0:
-            self.delete_test(test_id, user_id)
+        with self.transaction():
+            self._execute("DELETE FROM THEME_GROUP WHERE theme_id=? AND group_id=?", (test_id, group_id))
+            count = self.fetch_one("SELECT COUNT(*) as cnt FROM THEME_GROUP WHERE theme_id=?", (test_id,))["cnt"]
+            if count == 0:
+                self.delete_test(test_id, user_id)
 
     # --- Методы для преподавателей (получение групп и тестов) ---
     def get_teacher_groups(self, admin_id):
@@ -502,9 +823,121 @@ class Database:
         )
         return [{"id": r["id"], "name": r["name"], "timer_seconds": r["timer_seconds"]} for r in rows]
 
+    def get_group_summary(self, group_id, admin_id, offset=0, limit=None):
+        """
+        Сводная таблица группы по всем тестам преподавателя, собранная в SQLite.
+        Для каждого студента страницы (offset/limit) возвращается последний результат
+        по каждому тесту (в порядке tests), средний процент и средняя оценка.
+        Сводка по тестам строится в запросе через json_group_object.
+        Результат: {"tests": [...], "rows": [...], "total": число студентов группы,
+        "stats": агрегаты группы по всем тестам (только для первой страницы)}.
+        """
+        tests = self.get_teacher_tests_for_group(admin_id, group_id)
+        total = self.fetch_one(
+            "SELECT COUNT(*) AS cnt FROM USERS WHERE group_id = ? AND role = 'student'", (group_id,)
+        )["cnt"]
+        test_ids = [t["id"] for t in tests]
+        in_tests = ",".join("?" * len(test_ids)) or "NULL"
+        query = f"""
+            WITH page AS (
+                SELECT id, first_name, last_name FROM USERS
+                WHERE group_id = ? AND role = 'student'
+                ORDER BY last_name, first_name, id
+                LIMIT ? OFFSET ?
+            ),
+            latest AS (
+                -- CROSS JOIN закрепляет порядок: результаты ищутся по индексу для студентов страницы,
+                -- а не просмотром всей TEST_SUMMARY в порядке разбиения оконной функции
+                SELECT ts.user_id, ts.theme_id, ts.score,
+                       ROW_NUMBER() OVER (PARTITION BY ts.user_id, ts.theme_id ORDER BY ts.id DESC) AS rn
+                FROM page p
+                CROSS JOIN TEST_SUMMARY ts ON ts.user_id = p.id
+                WHERE ts.theme_id IN ({in_tests})
+            ),
+            pivot AS (
+                SELECT s.user_id, json_group_object(s.theme_id, s.score) AS scores,
+                       ROUND(AVG(s.score), 1) AS avg_percent,
+                       ROUND(AVG({migrations.MARK_SQL.format("s.score")}), 1) AS avg_mark
+                FROM latest s
+                WHERE s.rn = 1
+                GROUP BY s.user_id
+            )
+            SELECT p.id, p.first_name, p.last_name, v.scores, v.avg_percent, v.avg_mark
+            FROM page p
+            LEFT JOIN pivot v ON v.user_id = p.id
+            ORDER BY p.last_name, p.first_name, p.id
+        """
+        params = (group_id, -1 if limit is None else limit, offset, *test_ids)
+        keys = [str(test_id) for test_id in test_ids]
+        rows = []
+        for r in self._execute(query, params, fetch=True):
+            scores = json.loads(r["scores"]) if r["scores"] else {}
+            rows.append({
+                "id": r["id"], "first_name": r["first_name"], "last_name": r["last_name"],
+                "scores": [scores.get(k) for k in keys],
+                "avg_percent": r["avg_percent"], "avg_mark": r["avg_mark"]
+            })
+        stats = self.get_group_stats(group_id, test_ids) if offset == 0 else None
+        return {"tests": tests, "rows": rows, "total": total, "stats": stats}
+
+    # --- Агрегатная статистика результатов (таблицы STATS_*, поддерживаются триггерами) ---
+    def get_test_group_stats(self, theme_id, group_id):
+        # Статистика по тесту в группе: count, mean, stddev, min, max, avg_mark (None, если результатов нет)
+        return self._stats_dict(self.fetch_one(
+            "SELECT * FROM STATS_THEME_GROUP_VIEW WHERE theme_id = ? AND group_id = ?", (theme_id, group_id)
+        ))
+
+    def get_group_stats(self, group_id, theme_ids):
+        # Статистика группы по набору тестов (суммируются строки агрегатов, по одной на тест)
+        if not theme_ids:
+            return None
+        placeholders = ",".join("?" * len(theme_ids))
+        return self._stats_dict(self.fetch_one(
+            f"""SELECT SUM(cnt) AS cnt, SUM(score_sum) AS score_sum, MIN(score_min) AS score_min,
+                       MAX(score_max) AS score_max, SUM(score_sq_sum) AS score_sq_sum, SUM(mark_sum) AS mark_sum
+                FROM STATS_THEME_GROUP_VIEW WHERE group_id = ? AND theme_id IN ({placeholders})""",
+            (group_id, *theme_ids)
+        ))
+
+    def get_user_stats(self, user_id):
+        # Статистика студента по всем пройденным тестам
+        return self._stats_dict(self.fetch_one("SELECT * FROM STATS_USER WHERE user_id = ?", (user_id,)))
+
+    def rebuild_summary_stats(self):
+        # Пересчитать агрегатные таблицы по всем результатам (для существующих или восстановленных данных)
+        with self.transaction():
+            migrations.rebuild_summary_stats(self.conn)
+
+    def refresh_summary_stats(self):
+        # Досчитать минимумы и максимумы групп, ставшие неизвестными после удалений и изменений баллов
+        with self.transaction():
+            migrations.refresh_stats_extremes(self.conn)
+
+    @staticmethod
+    def _stats_dict(row):
+        # Среднее и стандартное отклонение из количества, суммы и суммы квадратов
+        if row is None or not row["cnt"]:
+            return None
+        count = row["cnt"]
+        mean = row["score_sum"] / count
+        variance = max(row["score_sq_sum"] / count - mean * mean, 0.0)
+        return {
+            "count": count, "mean": mean, "stddev": variance ** 0.5,
+            "min": row["score_min"], "max": row["score_max"], "avg_mark": row["mark_sum"] / count
+        }
+
     # --- Методы получения результатов тестирования ---
     def get_test_results_for_group(self, group_id, test_id, search_student=None):
         # Получить результаты тестирования студентов группы по конкретному тесту
+        return self._execute(*self._test_results_query(group_id, test_id, search_student), fetch=True)
+
+    def iter_test_results_for_group(self, group_id, test_id, search_student=None, failed_only=False):
+        # То же построчно из курсора (для экспорта); failed_only — только результаты ниже 50% и непройденные
+        return self.iter_rows(*self._test_results_query(group_id, test_id, search_student, failed_only))
+
+    @staticmethod
+    def _test_results_query(group_id, test_id, search_student=None, failed_only=False):
+        # Запрос результатов студентов группы по тесту и его параметры
         query = """
             SELECT u.id as user_id, u.last_name, u.first_name, ts.date, ts.score, ts.elapsed_seconds
             FROM USERS u
@@ -515,5 +948,70 @@ class Database:
         if search_student:
             query += " AND (u.last_name LIKE ? OR u.first_name LIKE ?)"
             params += [f"%{search_student}%", f"%{search_student}%"]
+        if failed_only:
+            query += " AND COALESCE(ts.score, 0) < 50"
         query += " ORDER BY u.last_name, u.first_name"
-        return self._execute(query, tuple(params), fetch=True)
\ No newline at end of file
+        return query, tuple(params)
+
+    # --- Сохранение результатов прохождения теста ---
+    def save_test_result(self, user_id, theme_id, score, question_ids, answers, elapsed_seconds=None, option_seed=None):
+        # Сохранить результат вместе с ответами на вопросы (одной строкой — в одной транзакции); вернуть id.
+        # option_seed — зерно перестановки вариантов попытки (None — варианты не перемешивались)
+        date_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return self._execute(
+            "INSERT INTO TEST_SUMMARY (user_id, theme_id, score, date, answers, elapsed_seconds, option_seed) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (user_id, theme_id, score, date_str, encode_responses(question_ids, answers), elapsed_seconds, option_seed)
+        ).lastrowid
+
+    # --- Журнал незавершённых попыток ---
+    def save_attempt_progress(self, user_id, theme_id, question_ids, answers, option_seed, elapsed_seconds):
+        """
+        Записать состояние незавершённой попытки (одна строка на студента и тест).
+        question_ids — все вопросы попытки в порядке показа, answers — ответы на первые из них.
+        """
+        padded = list(answers) + [-1] * (len(question_ids) - len(answers))
+        date_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._execute(
+            "INSERT INTO ATTEMPT_PROGRESS (user_id, theme_id, answers, answered, option_seed, elapsed_seconds, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (user_id, theme_id) DO UPDATE SET answers = excluded.answers, answered = excluded.answered, "
+            "option_seed = excluded.option_seed, elapsed_seconds = excluded.elapsed_seconds, updated = excluded.updated",
+            (user_id, theme_id, encode_responses(question_ids, padded), len(answers), option_seed, elapsed_seconds, date_str)
+        )
+
+    def get_attempt_progress(self, user_id, theme_id):
+        # Сохранённое состояние незавершённой попытки или None
+        row = self.fetch_one(
+            "SELECT answers, answered, option_seed, elapsed_seconds FROM ATTEMPT_PROGRESS WHERE user_id = ? AND theme_id = ?",
+            (user_id, theme_id)
+        )
+        if not row:
+            return None
+        pairs = decode_responses(row["answers"])
+        return {
+            "question_ids": [question_id for question_id, _ in pairs],
+            "answers": [answer for _, answer in pairs[:row["answered"]]],
+            "option_seed": row["option_seed"],
+            "elapsed_seconds": row["elapsed_seconds"],
+        }
+
+    def get_attempts_in_progress(self, user_id):
+        # Незавершённые попытки студента: список {"theme_id", "name", "updated"}
+        rows = self._execute(
+            "SELECT p.theme_id, t.name, p.updated FROM ATTEMPT_PROGRESS p JOIN THEME t ON t.id = p.theme_id "
+            "WHERE p.user_id = ? ORDER BY p.updated DESC",
+            (user_id,), fetch=True
+        )
+        return [{"theme_id": r["theme_id"], "name": r["name"], "updated": r["updated"]} for r in rows]
+
+    def delete_attempt_progress(self, user_id, theme_id):
+        # Удалить журнал попытки (после сохранения результата или если попытку нельзя восстановить)
+        self._execute("DELETE FROM ATTEMPT_PROGRESS WHERE user_id = ? AND theme_id = ?", (user_id, theme_id))
+
+    def get_attempt_responses(self, summary_id):
+        # Ответы попытки: список пар (question_id, ответ); пустой список для старых записей
+        row = self.fetch_one("SELECT answers FROM TEST_SUMMARY WHERE id = ?", (summary_id,))
+        if not row:
+            raise ValueError("Результат не найден.")
+        return decode_responses(row["answers"])
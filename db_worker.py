@@ -0,0 +1,182 @@
+import queue
+import threading
+import tkinter as tk
+from database import Database
+from connection_manager import ConnectionManager
+
+_DONE = object()    # метка в очереди результатов: запрос завершён (иначе — промежуточный прогресс)
+
+
+class DbFuture:
+    """Запрос к фоновому потоку базы данных и его результат"""
+
+    def __init__(self, worker, widget, func, args, callback, errback, key, progress=None):
+        self.worker = worker
+        self.widget = widget
+        self.func = func
+        self.args = args
+        self.callback = callback
+        self.errback = errback
+        self.key = key
+        self.progress = progress
+        self.cancelled = False
+        self.done = False
+        self.result = None
+        self.error = None
+
+    def cancel(self):
+        # Отменить запрос: результат не будет доставлен, выполняющийся запрос прерывается
+        self.worker.cancel(self)
+
+    def report(self, value):
+        # Передать промежуточный прогресс из фонового потока в progress(value) в потоке Tk
+        if not self.cancelled:
+            self.worker._results.put((self, value))
+
+
+class DbWorker:
+    """
+    Фоновый поток с собственным соединением для запросов к базе данных.
+    func(db, *args) выполняется в потоке, а callback(result) или errback(error) —
+    в потоке Tk через after(), поэтому интерфейс не блокируется на SQLite.
+    """
+    POLL_MS = 30
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, db_path="database.db"):
+        # Общий для процесса поток для файла базы данных
+        with cls._instances_lock:
+            worker = cls._instances.get(db_path)
+            if worker is None or not worker._thread.is_alive():
+                worker = cls(db_path)
+                cls._instances[db_path] = worker
+            return worker
+
+    def __init__(self, db_path="database.db"):
+        self.db_path = db_path
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._latest = {}       # ключ -> последний запрос с этим ключом
+        self._pending = 0       # запросы, результат которых ещё не обработан в потоке Tk
+        self._polling = set()   # виджеты, на которых запущен опрос результатов
+        self._state_lock = threading.Lock()
+        self._running = None
+        self._conn = None
+        self._thread = threading.Thread(target=self._run, name="db-worker", daemon=True)
+        self._thread.start()
+
+    # --- API для потока интерфейса ---
+    def submit(self, widget, func, *args, callback=None, errback=None, key=None, progress=None):
+        """
+        Поставить запрос в очередь. widget — окно, через after() которого
+        доставляется результат. Новый запрос с тем же key отменяет предыдущий
+        (например, при смене фильтра до завершения прошлого запроса).
+        Если задан progress, func получает аргумент progress=report: значения,
+        переданные в report(value), доставляются в progress(value) по порядку.
+        """
+        future = DbFuture(self, widget, func, args, callback, errback, key, progress)
+        if key is not None:
+            previous = self._latest.get(key)
+            if previous is not None:
+                self.cancel(previous)
+            self._latest[key] = future
+        self._pending += 1
+        self._requests.put(future)
+        self._ensure_polling(widget)
+        return future
+
+    def cancel(self, future):
+        # Отметить запрос отменённым; выполняющийся SQL-запрос прерывается
+        with self._state_lock:
+            future.cancelled = True
+            if self._running is future and self._conn is not None:
+                self._conn.interrupt()
+
+    def cancel_key(self, key):
+        # Отменить последний запрос с указанным ключом, если он ещё не доставлен
+        future = self._latest.pop(key, None)
+        if future is not None:
+            self.cancel(future)
+
+    def stop(self):
+        # Завершить поток после обработки уже поставленных запросов
+        self._requests.put(None)
+
+    # --- Фоновый поток ---
+    def _run(self):
+        with ConnectionManager.get(self.db_path).borrow() as conn:
+            self._conn = conn
+            db = Database(self.db_path, conn=conn)
+            while True:
+                future = self._requests.get()
+                if future is None:
+                    break
+                with self._state_lock:
+                    if future.cancelled:
+                        self._results.put((future, _DONE))
+                        continue
+                    self._running = future
+                try:
+                    kwargs = {"progress": future.report} if future.progress is not None else {}
+                    future.result = future.func(db, *future.args, **kwargs)
+                except Exception as e:
+                    future.error = e
+                finally:
+                    with self._state_lock:
+                        self._running = None
+                    if conn.in_transaction:
+                        conn.rollback()
+                future.done = True
+                self._results.put((future, _DONE))
+            self._conn = None
+
+    # --- Доставка результатов в потоке Tk ---
+    def _ensure_polling(self, widget):
+        if widget in self._polling:
+            return
+        self._polling.add(widget)
+        widget.after(self.POLL_MS, self._poll, widget)
+
+    def _poll(self, widget):
+        self._deliver()
+        if self._pending and self._widget_alive(widget):
+            widget.after(self.POLL_MS, self._poll, widget)
+        else:
+            self._polling.discard(widget)
+
+    def _deliver(self):
+        while True:
+            try:
+                future, value = self._results.get_nowait()
+            except queue.Empty:
+                return
+            if value is not _DONE:
+                if not future.cancelled and self._widget_alive(future.widget):
+                    try:
+                        future.progress(value)
+                    except Exception as e:
+                        future.widget.report_callback_exception(type(e), e, e.__traceback__)
+                continue
+            self._pending -= 1
+            if future.key is not None and self._latest.get(future.key) is future:
+                del self._latest[future.key]
+            if future.cancelled or not self._widget_alive(future.widget):
+                continue
+            try:
+                if future.error is not None:
+                    if future.errback is None:
+                        raise future.error
+                    future.errback(future.error)
+                elif future.callback is not None:
+                    future.callback(future.result)
+            except Exception as e:
+                future.widget.report_callback_exception(type(e), e, e.__traceback__)
+
+    @staticmethod
+    def _widget_alive(widget):
+        try:
+            return bool(widget.winfo_exists())
+        except tk.TclError:
+            return False
@@ -1,12 +1,16 @@
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 from database import Database
+from db_worker import DbWorker
+from regrade import regrade_test
+from wrap_layout import WrapLayout
 
 class EditTestForm(tk.Toplevel):
     # === Инициализация и создание интерфейса ===
     def __init__(self, parent, test_id, current_user_id):
         super().__init__(parent)
-        self.db = Database()
+        self.db = Database.shared()
+        self.worker = DbWorker.get(self.db.db_path)
         self.test_id = test_id
         self.current_user_id = current_user_id
         self.parent = parent
@@ -41,6 +45,17 @@ class EditTestForm(tk.Toplevel):
         self.timer_remove.pack(side="left")
         tk.Button(timer_frame, text="Сохранить таймер", command=self.save_timer).pack(side="left", padx=5)
 
+        pool_frame = tk.Frame(self)
+        pool_frame.pack(pady=5)
+        tk.Label(pool_frame, text="Вопросов в попытке:").pack(side="left")
+        self.draw_var = tk.StringVar()
+        tk.Entry(pool_frame, textvariable=self.draw_var, width=6).pack(side="left", padx=(0, 10))
+        self.shuffle_var = tk.IntVar(value=0)
+        tk.Checkbutton(pool_frame, text="Перемешивать варианты", variable=self.shuffle_var).pack(side="left")
+        self.stratify_var = tk.IntVar(value=0)
+        tk.Checkbutton(pool_frame, text="Пропорционально тегам", variable=self.stratify_var).pack(side="left")
+        tk.Button(pool_frame, text="Сохранить выборку", command=self.save_pool).pack(side="left", padx=5)
+
         tk.Label(self, text="Назначить тест в группы:").pack(pady=(10, 0))
         self.groups_frame = tk.Frame(self)
         self.groups_frame.pack(padx=10, pady=5, fill=tk.X)
@@ -55,6 +70,7 @@ class EditTestForm(tk.Toplevel):
             ("Добавить вопрос", self.add_question),
             ("Просмотреть вопрос", lambda: self.show_question(view_only=True)),
             ("Редактировать вопрос", lambda: self.show_question(view_only=False)),
+            ("Тег вопроса", self.edit_question_tag),
             ("Удалить вопрос", self.delete_question),
             ("Назад", self.go_back)
         ]
@@ -82,6 +98,9 @@ class EditTestForm(tk.Toplevel):
             else:
                 self.timer_var.set("")
                 self.timer_check.set(1)
+            self.draw_var.set(str(theme["draw_count"]) if theme["draw_count"] else "")
+            self.shuffle_var.set(int(theme["shuffle_options"]))
+            self.stratify_var.set(int(theme["stratify"]))
         else:
             self.name_var.set("")
             self.timer_var.set("")
@@ -113,8 +132,9 @@ class EditTestForm(tk.Toplevel):
             messagebox.showerror("Ошибка", "Выберите хотя бы одну группу.", parent=self)
             return
         try:
-            self.db._execute("UPDATE THEME SET name=? WHERE id=?", (name, self.test_id))
-            self.db.update_test_groups(self.test_id, new_group_ids, self.current_user_id)
+            with self.db.transaction():
+                self.db._execute("UPDATE THEME SET name=? WHERE id=?", (name, self.test_id))
+                self.db.update_test_groups(self.test_id, new_group_ids, self.current_user_id)
             messagebox.showinfo("Успешно", "Параметры теста успешно обновлены.", parent=self)
         except Exception as e:
             messagebox.showerror("Ошибка", str(e), parent=self)
@@ -146,13 +166,47 @@ class EditTestForm(tk.Toplevel):
         except Exception:
             messagebox.showerror("Ошибка", "Введите корректное значение таймера (целое число минут > 0) либо уберите таймер.", parent=self)
 
+    # === Выборка вопросов в попытку ===
+    def save_pool(self):
+        # Сохранение параметров выборки: число вопросов в попытке (пусто — все), перемешивание, теги
+        value = self.draw_var.get().strip()
+        if value and not value.isdigit():
+            messagebox.showerror("Ошибка", "Введите целое число вопросов в попытке либо оставьте поле пустым.", parent=self)
+            return
+        try:
+            self.db.update_test_pool(
+                self.test_id, int(value) if value else None, self.shuffle_var.get(), self.stratify_var.get()
+            )
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e), parent=self)
+            return
+        if value and int(value) > len(self.questions):
+            messagebox.showwarning(
+                "Выборка", f"В тесте только {len(self.questions)} вопросов: в попытку попадут все.", parent=self
+            )
+        messagebox.showinfo("Успешно", "Параметры выборки сохранены.", parent=self)
+
+    def edit_question_tag(self):
+        # Изменение тега выбранного вопроса (используется при выборке пропорционально тегам)
+        idx = self.get_selected_index("изменения тега")
+        if idx is None:
+            return
+        q = self.questions[idx]
+        tag = self.open_input_dialog("Тег вопроса", "Тег (раздел или сложность), пусто — без тега:", q["tag"] or "")
+        if tag is None:
+            return
+        self.db.set_question_tag(q["id"], tag)
+        self.load_questions()
+        self.questions_listbox.selection_set(idx)
+
     # === Работа с вопросами теста ===
     def load_questions(self):
         # Загрузка списка вопросов теста
         self.questions = self.db.get_questions(self.test_id)
         self.questions_listbox.delete(0, tk.END)
         for q in self.questions:
-            self.questions_listbox.insert(tk.END, f"{q['theme_local_number']}: {q['text']}")
+            tag = f"[{q['tag']}] " if q["tag"] else ""
+            self.questions_listbox.insert(tk.END, f"{q['theme_local_number']}: {tag}{q['text']}")
 
     def add_question(self):
         # Добавление нового вопроса в тест
@@ -190,6 +244,36 @@ class EditTestForm(tk.Toplevel):
             self.db.update_question(q["id"], q_text, options, correct)
             self.load_questions()
             messagebox.showinfo("Успешно", "Вопрос успешно обновлён.", parent=self)
+            if set(correct) != set(q.get("correct_options", [])):
+                self.check_regrade()
+
+    def check_regrade(self):
+        # Проверка (без записи), меняются ли баллы сохранённых попыток после правки ключа
+        test_id = self.test_id
+        self.worker.submit(
+            self, lambda db: regrade_test(db, test_id, dry_run=True),
+            callback=self._confirm_regrade, key=("regrade", test_id)
+        )
+
+    def _confirm_regrade(self, report):
+        # Предложить пересчитать баллы, если правка ключа их меняет
+        changes = report["changes"]
+        if not changes:
+            return
+        raised = sum(1 for c in changes if c["new_score"] > c["old_score"])
+        text = (f"Исправление ключа меняет результаты {len(changes)} из {report['checked']} попыток "
+                f"(повысятся: {raised}, понизятся: {len(changes) - raised}).")
+        if report["skipped"]:
+            text += f"\nПопыток без сохранённых ответов (не пересчитываются): {report['skipped']}."
+        if not messagebox.askyesno("Пересчёт результатов", text + "\n\nПересчитать баллы?", parent=self):
+            return
+        test_id = self.test_id
+        self.worker.submit(
+            self, lambda db: regrade_test(db, test_id),
+            callback=lambda r: messagebox.showinfo("Пересчёт результатов", f"Обновлено результатов: {len(r['changes'])}.", parent=self),
+            errback=lambda e: messagebox.showerror("Ошибка", str(e), parent=self),
+            key=("regrade", test_id)
+        )
 
     def delete_question(self):
         # Удаление выбранного вопроса из теста
@@ -199,7 +283,6 @@ class EditTestForm(tk.Toplevel):
         q = self.questions[idx]
         if messagebox.askyesno("Удаление вопроса", f"Вы уверены, что хотите удалить вопрос №{q['theme_local_number']}?", parent=self):
             self.db.delete_question(q["id"])
-            self.renumber_questions()
             self.load_questions()
             next_idx = min(idx, len(self.questions) - 1)
             if next_idx >= 0:
@@ -208,12 +291,6 @@ class EditTestForm(tk.Toplevel):
                 self.questions_listbox.activate(next_idx)
             messagebox.showinfo("Вопрос удалён", "Вопрос успешно удалён.", parent=self)
 
-    def renumber_questions(self):
-        # Перенумерация вопросов после удаления
-        for idx, q in enumerate(self.db.get_questions(self.test_id)):
-            if q['theme_local_number'] != idx+1:
-                self.db.update_theme_local_number(q['id'], idx+1)
-
     def ask_question_data(self, default_text="", default_options=None, default_correct=None):
         # Диалог для ввода/редактирования данных вопроса
         q_text = self.open_input_dialog("Вопрос", "Введите текст вопроса:", default_text)
@@ -262,35 +339,21 @@ class EditTestForm(tk.Toplevel):
         self.center_window(win)
 
         frame, canvas = self.create_scrollable_frame(win)
-        all_dynamic_labels = []
-
-        def update_wraplength_now(event=None):
-            new_width = canvas.winfo_width() - 40
-            for lbl in all_dynamic_labels:
-                lbl.config(wraplength=new_width)
-
-        def update_wraplength_delayed(event):
-            nonlocal resize_after_id
-            if resize_after_id:
-                win.after_cancel(resize_after_id)
-            resize_after_id = win.after(100, update_wraplength_now)
-
-        resize_after_id = None
-        win.bind("<Configure>", update_wraplength_delayed)
+        wrap_layout = WrapLayout(canvas, margin=40)
 
         q_label = tk.Label(
             frame, text=q['text'], font=("Arial", 14),
             background="#f0f0f0", justify="center", anchor="center", wraplength=360
         )
         q_label.grid(row=0, column=0, pady=(10, 5), sticky="n")
-        all_dynamic_labels.append(q_label)
+        wrap_layout.add(q_label)
 
         opt_title = tk.Label(
             frame, text="Варианты ответов:", font=("Arial", 12),
             background="#f0f0f0", justify="center", anchor="center", wraplength=360
         )
         opt_title.grid(row=1, column=0, pady=(5, 5), sticky="n")
-        all_dynamic_labels.append(opt_title)
+        wrap_layout.add(opt_title)
 
         if q['options']:
             for i, opt in enumerate(q['options']):
@@ -299,7 +362,7 @@ class EditTestForm(tk.Toplevel):
                     background="#f0f0f0", justify="left", anchor="w", wraplength=360
                 )
                 lbl.grid(row=2 + i, column=0, sticky="w", padx=20, pady=2)
-                all_dynamic_labels.append(lbl)
+                wrap_layout.add(lbl)
             next_row = 2 + len(q['options'])
         else:
             no_opt = tk.Label(
@@ -307,7 +370,7 @@ class EditTestForm(tk.Toplevel):
                 background="#f0f0f0", fg="red", justify="center", anchor="center", wraplength=360
             )
             no_opt.grid(row=2, column=0, sticky="n", pady=5)
-            all_dynamic_labels.append(no_opt)
+            wrap_layout.add(no_opt)
             next_row = 3
 
         corr_title = tk.Label(
@@ -315,7 +378,7 @@ class EditTestForm(tk.Toplevel):
             background="#f0f0f0", justify="center", anchor="center", wraplength=360
         )
         corr_title.grid(row=next_row, column=0, pady=(10, 5), sticky="n")
-        all_dynamic_labels.append(corr_title)
+        wrap_layout.add(corr_title)
         next_row += 1
 
         corr_indices = q.get('correct_options', [])
@@ -330,7 +393,7 @@ class EditTestForm(tk.Toplevel):
         if corr_lbls:
             for lbl in corr_lbls:
                 lbl.grid(row=next_row, column=0, sticky="w", padx=20, pady=2)
-                all_dynamic_labels.append(lbl)
+                wrap_layout.add(lbl)
                 next_row += 1
         else:
             no_corr = tk.Label(
@@ -338,12 +401,7 @@ class EditTestForm(tk.Toplevel):
                 background="#f0f0f0", fg="red", justify="center", anchor="center", wraplength=360
             )
             no_corr.grid(row=next_row, column=0, sticky="n", pady=5)
-            all_dynamic_labels.append(no_corr)
-
-        def force_initial_wrap():
-            update_wraplength_now()
-
-        win.after(100, force_initial_wrap)
+            wrap_layout.add(no_corr)
 
     def create_scrollable_frame(self, win):
         # Создание прокручиваемого фрейма для окна просмотра вопроса
@@ -0,0 +1,185 @@
+import threading
+from collections import OrderedDict
+from response_codec import options_mask
+from regrade import load_responses, response_entries, correct_codes, MASK_BITS
+
+# Анализ заданий теста по сохранённым ответам:
+#   p — доля верных ответов на вопрос (трудность),
+#   r — точечно-бисериальная корреляция верности ответа с результатом
+#       по остальным вопросам попытки (дискриминация),
+#   доли выбора каждого варианта и доля пропусков.
+# Результат кэшируется до появления (или удаления) попыток и до изменения вопросов:
+# ключа, текста, порядка или состава вариантов.
+
+_CACHE_SIZE = 16
+_cache = OrderedDict()   # (theme_id, group_id) -> (отпечаток данных, результат)
+_cache_lock = threading.Lock()
+
+
+def analyze_test(db, theme_id, group_id=None):
+    """
+    Статистика по каждому вопросу теста (при group_id — только по студентам группы).
+    Возвращает {"attempts", "skipped", "engine", "questions": [{"id", "number", "text", "asked",
+    "p_value", "discrimination", "omitted", "options": [{"text", "correct", "rate"}]}]}.
+    """
+    questions = db.get_questions(theme_id)
+    answer_keys = {q["id"]: options_mask(q["correct_options"]) for q in questions}
+    fingerprint = (_attempts_fingerprint(db, theme_id, group_id), _questions_signature(questions, answer_keys))
+    with _cache_lock:
+        cached = _cache.get((theme_id, group_id))
+        if cached is not None and cached[0] == fingerprint:
+            _cache.move_to_end((theme_id, group_id))
+            return cached[1]
+
+    attempts, skipped = load_responses(db, theme_id, answer_keys.keys(), group_id)
+    option_counts = [len(q["options"]) for q in questions]
+    sums, engine = None, "python"
+    # Выбранные варианты в NumPy — маски int64: вопросы с большим числом вариантов считаются в Python
+    if max(option_counts, default=0) <= MASK_BITS:
+        try:
+            import numpy as np
+            sums, engine = _sums_numpy(np, attempts, answer_keys, option_counts), "numpy"
+        except (ImportError, OverflowError):
+            pass
+    if sums is None:
+        sums = _sums_python(attempts, answer_keys, option_counts)
+    result = {
+        "attempts": len(attempts), "skipped": skipped, "engine": engine,
+        "questions": [_question_stats(q, s) for q, s in zip(questions, sums)]
+    }
+    with _cache_lock:
+        _cache[(theme_id, group_id)] = (fingerprint, result)
+        _cache.move_to_end((theme_id, group_id))
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def _attempts_fingerprint(db, theme_id, group_id):
+    # Число и последний id попыток: меняются при добавлении и удалении результатов
+    if group_id is None:
+        row = db.fetch_one("SELECT COUNT(*) AS cnt, MAX(id) AS last_id FROM TEST_SUMMARY WHERE theme_id = ?", (theme_id,))
+    else:
+        row = db.fetch_one(
+            "SELECT COUNT(*) AS cnt, MAX(ts.id) AS last_id FROM TEST_SUMMARY ts "
+            "JOIN USERS u ON u.id = ts.user_id WHERE ts.theme_id = ? AND u.group_id = ?",
+            (theme_id, group_id)
+        )
+    return row["cnt"], row["last_id"]
+
+
+def _questions_signature(questions, answer_keys):
+    # Содержимое вопросов, попадающее в результат: номер, текст, варианты в их порядке и ключ
+    return tuple(
+        (q["id"], q["theme_local_number"], q["text"], tuple(q["options"]), answer_keys[q["id"]])
+        for q in questions
+    )
+
+
+def _selected_mask(code):
+    # Код ответа -> битовая маска выбранных вариантов
+    if code & 1:
+        return code >> 1
+    return 1 << ((code >> 1) - 1) if code else 0
+
+
+def _correct(code, key):
+    # Верность ответа по правилам TestForm.calculate_score
+    if code & 1:
+        return (code >> 1) == key
+    return bool(code) and (key >> ((code >> 1) - 1)) & 1 == 1
+
+
+def _sums_python(attempts, answer_keys, option_counts):
+    # Накопление сумм по вопросам за один проход по попыткам
+    columns = {qid: col for col, qid in enumerate(answer_keys)}
+    keys = list(answer_keys.values())
+    sums = [_empty_sums(n) for n in option_counts]
+    for _, _, layout, codes in attempts:
+        marks = [_correct(code, keys[columns[qid]]) for qid, code in zip(layout, codes)]
+        total = sum(marks)
+        for qid, code, mark in zip(layout, codes, marks):
+            s = sums[columns[qid]]
+            s["asked"] += 1
+            s["correct"] += mark
+            s["omitted"] += code in (0, 1)
+            selected = _selected_mask(code)
+            for k in range(len(s["chosen"])):
+                s["chosen"][k] += selected >> k & 1
+            if len(codes) > 1:
+                rest = (total - mark) / (len(codes) - 1)
+                s["n"] += 1
+                s["x"] += mark
+                s["y"] += rest
+                s["xx"] += mark
+                s["yy"] += rest * rest
+                s["xy"] += mark * rest
+    return sums
+
+
+def _sums_numpy(np, attempts, answer_keys, option_counts):
+    # Те же суммы по плоским массивам ответов всех попыток (суммирование по столбцам — bincount)
+    columns = {qid: col for col, qid in enumerate(answer_keys)}
+    codes, rows, cols, asked_count = response_entries(np, attempts, columns)
+    keys = np.array(list(answer_keys.values()), dtype=np.int64)
+    x = correct_codes(np, codes, keys[cols]).astype(float)
+    index = (codes >> 1) - 1
+    single = (codes > 0) & (index < MASK_BITS)
+    selected = np.where((codes & 1) == 1, codes >> 1,
+                        np.where(single, np.left_shift(1, np.clip(index, 0, MASK_BITS - 1)), 0))
+    # Результат по остальным вопросам попытки (только для попыток больше чем из одного вопроса)
+    attempt_asked = asked_count[rows]
+    w = (attempt_asked > 1).astype(float)
+    totals_by_attempt = np.bincount(rows, weights=x, minlength=len(attempts))
+    y = w * (totals_by_attempt[rows] - x) / np.maximum(attempt_asked - 1, 1)
+    width = len(columns)
+
+    def by_column(weights=None):
+        return np.bincount(cols, weights=weights, minlength=width)
+
+    totals = {
+        "asked": by_column(), "correct": by_column(x),
+        "omitted": by_column((codes <= 1).astype(float)), "n": by_column(w),
+        "x": by_column(x * w), "y": by_column(y), "xx": by_column(x * x * w),
+        "yy": by_column(y * y), "xy": by_column(x * y),
+    }
+    n_chosen = max(option_counts, default=0)
+    chosen = [by_column(((selected >> k) & 1).astype(float)) for k in range(n_chosen)]
+    sums = []
+    for col, n_options in enumerate(option_counts):
+        s = {name: float(values[col]) for name, values in totals.items()}
+        s["chosen"] = [int(chosen[k][col]) for k in range(n_options)]
+        sums.append(s)
+    return sums
+
+
+def _empty_sums(n_options):
+    # Нулевые суммы для одного вопроса
+    return {"asked": 0, "correct": 0, "omitted": 0, "n": 0, "x": 0.0, "y": 0.0,
+            "xx": 0.0, "yy": 0.0, "xy": 0.0, "chosen": [0] * n_options}
+
+
+def _question_stats(question, s):
+    # Итоговые показатели вопроса из накопленных сумм
+    asked = s["asked"]
+    discrimination = None
+    if s["n"] > 1:
+        n = s["n"]
+        cov = s["xy"] - s["x"] * s["y"] / n
+        var_x = s["xx"] - s["x"] * s["x"] / n
+        var_y = s["yy"] - s["y"] * s["y"] / n
+        if var_x > 1e-12 and var_y > 1e-12:
+            discrimination = cov / (var_x * var_y) ** 0.5
+    return {
+        "id": question["id"],
+        "number": question["theme_local_number"],
+        "text": question["text"],
+        "asked": int(asked),
+        "p_value": s["correct"] / asked if asked else None,
+        "discrimination": discrimination,
+        "omitted": s["omitted"] / asked if asked else None,
+        "options": [
+            {"text": text, "correct": idx in question["correct_options"], "rate": s["chosen"][idx] / asked if asked else None}
+            for idx, text in enumerate(question["options"])
+        ]
+    }
@@ -0,0 +1,98 @@
+import tkinter as tk
+from tkinter import ttk
+from tkinter import messagebox
+from db_worker import DbWorker
+from item_analysis import analyze_test
+
+# === Вспомогательные функции ===
+
+def format_rate(value):
+    # Доля в процентах для отображения ("—", если ответов не было)
+    return "—" if value is None else f"{value * 100:.0f}%"
+
+# === Класс окна анализа вопросов теста ===
+
+class ItemAnalysisWindow(tk.Toplevel):
+    # Слабая дискриминация: вопрос плохо отделяет сильных студентов от слабых
+    LOW_DISCRIMINATION = 0.2
+
+    # --- Инициализация и построение интерфейса ---
+    def __init__(self, master, db, theme_id, group_id=None, test_name=""):
+        super().__init__(master)
+        self.title(f"Анализ вопросов — {test_name}" if test_name else "Анализ вопросов")
+        self.geometry("1000x450")
+
+        columns = ("number", "text", "asked", "p_value", "discrimination", "omitted", "options")
+        self.tree = ttk.Treeview(self, columns=columns, show="headings")
+        self.tree.heading("number", text="№")
+        self.tree.heading("text", text="Вопрос")
+        self.tree.heading("asked", text="Ответов")
+        self.tree.heading("p_value", text="Решаемость (p)")
+        self.tree.heading("discrimination", text="Дискриминация (r)")
+        self.tree.heading("omitted", text="Без ответа")
+        self.tree.heading("options", text="Выбор вариантов (* — верный)")
+
+        self.tree.column("number", anchor="center", width=40)
+        self.tree.column("text", anchor="w", width=260)
+        self.tree.column("asked", anchor="center", width=70)
+        self.tree.column("p_value", anchor="center", width=100)
+        self.tree.column("discrimination", anchor="center", width=120)
+        self.tree.column("omitted", anchor="center", width=80)
+        self.tree.column("options", anchor="w", width=300)
+
+        vsb = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=vsb.set)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        vsb.grid(row=0, column=1, sticky="ns")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        self.tree.tag_configure("weak", background="#ffcccc")
+
+        self.info_label = ttk.Label(self, text="Загрузка...")
+        self.info_label.grid(row=1, column=0, columnspan=2, sticky="ew")
+
+        self.populate(db, theme_id, group_id)
+        self.center_window()
+
+    # --- Центрирование окна на экране ---
+    def center_window(self):
+        self.update_idletasks()
+        width, height = 1000, 450
+        x = (self.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.winfo_screenheight() // 2) - (height // 2)
+        self.geometry(f"{width}x{height}+{x}+{y}")
+
+    # --- Заполнение таблицы показателями вопросов ---
+    def populate(self, db, theme_id, group_id):
+        # Анализ считается в фоновом потоке (результат кэшируется до появления новых попыток)
+        DbWorker.get(db.db_path).submit(
+            self, lambda wdb: analyze_test(wdb, theme_id, group_id),
+            callback=self._fill, errback=lambda e: messagebox.showerror("Ошибка", str(e), parent=self)
+        )
+
+    def _fill(self, report):
+        # Заполнение таблицы; вопросы со слабой дискриминацией выделяются цветом
+        for q in report["questions"]:
+            r = q["discrimination"]
+            options = " | ".join(
+                f"{idx + 1}{'*' if o['correct'] else ''}: {format_rate(o['rate'])}"
+                for idx, o in enumerate(q["options"])
+            )
+            iid = self.tree.insert(
+                "", "end",
+                values=(
+                    q["number"],
+                    q["text"],
+                    q["asked"],
+                    format_rate(q["p_value"]),
+                    "—" if r is None else f"{r:.2f}",
+                    format_rate(q["omitted"]),
+                    options
+                )
+            )
+            if r is not None and r < self.LOW_DISCRIMINATION:
+                self.tree.item(iid, tags=("weak",))
+        text = f"Попыток с сохранёнными ответами: {report['attempts']}"
+        if report["skipped"]:
+            text += f" (без ответов или по удалённым вопросам: {report['skipped']})"
+        self.info_label.config(text=text)
@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
+from db_worker import DbWorker
 
 # === Вспомогательные функции для обработки данных ===
 
@@ -84,9 +85,15 @@ class JournalWindow(tk.Toplevel):
 
     # --- Заполнение таблицы результатами пользователя ---
     def populate(self, db, user_id):
-        results = db.get_journal_for_user(user_id)
-        total = 0
-        count = 0
+        # Журнал загружается в фоновом потоке, таблица заполняется по готовности
+        DbWorker.get(db.db_path).submit(
+            self, lambda wdb: (wdb.get_journal_for_user(user_id), wdb.get_user_stats(user_id)),
+            callback=self._fill, errback=lambda e: messagebox.showerror("Ошибка", str(e), parent=self)
+        )
+
+    def _fill(self, data):
+        # Заполнение таблицы; средний балл берётся из агрегатной статистики студента
+        results, stats = data
         for r in results:
             mark = calc_mark(r["score"])
             timer_display = format_timer(r["timer_seconds"])
@@ -104,7 +111,5 @@ class JournalWindow(tk.Toplevel):
                     answers_time
                 )
             )
-            total += mark
-            count += 1
-        avg = round(total / count, 2) if count else 0
+        avg = round(stats["avg_mark"], 2) if stats else 0
         self.avg_label.config(text=f"Средний балл по всем тестам: {avg}")
\ No newline at end of file
@@ -1,8 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from database import Database
-from admin_form import AdminForm
-from student_form import StudentForm
+from db_worker import DbWorker
 
 class LoginForm(tk.Tk):
     # --- Инициализация и построение интерфейса ---
@@ -11,7 +10,7 @@ class LoginForm(tk.Tk):
         self.title("Вход")
         self.geometry("350x320")
         self.center_window()
-        self.db = Database()
+        self.db = Database.shared()
 
         tab_control = ttk.Notebook(self)
         self.admin_tab = tk.Frame(tab_control)
@@ -57,13 +56,20 @@ class LoginForm(tk.Tk):
     def on_group_selected(self, event):
         # Обработка выбора группы и загрузка студентов этой группы
         group_name = self.group_combobox.get()
-        group = self.db.get_group_by_name(group_name)
-        if group:
-            students = self.db.get_students_by_group(group['id'])
+        self.student_combobox.set('')
+
+        def fetch(db):
+            group = db.get_group_by_name(group_name)
+            return db.get_students_by_group(group['id']) if group else None
+
+        DbWorker.get(self.db.db_path).submit(self, fetch, callback=self._show_students, key=("login_students", id(self)))
+
+    def _show_students(self, students):
+        # Заполнение списка студентов выбранной группы
+        if students is not None:
             self.student_combobox['values'] = [
                 f"{s['first_name']} {s['last_name']}" for s in students
             ]
-            self.student_combobox.set('')
 
     # --- Методы обработки входа пользователей ---
     def login(self):
@@ -1,13 +1,12 @@
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 from database import Database
-from edit_test_form import EditTestForm
 
 class ManageTestsForm(tk.Toplevel):
     # --- Инициализация и конфигурация окна ---
     def __init__(self, parent, current_user_id):
         super().__init__(parent)
-        self.db = Database()
+        self.db = Database.shared()
         self.parent = parent
         self.current_user_id = current_user_id
         self.groups = self.db.get_available_groups_for_admin(self.current_user_id)
@@ -102,6 +101,7 @@ class ManageTestsForm(tk.Toplevel):
             self.load_tests_for_selected_group()
             messagebox.showinfo("Успешно", f"Тест '{test_name}' успешно добавлен для выбранных групп.")
             self.withdraw()
+            from edit_test_form import EditTestForm
             EditTestForm(self, test_id, self.current_user_id).mainloop()
             self.deiconify()
             self.load_tests_for_selected_group()
@@ -115,6 +115,7 @@ class ManageTestsForm(tk.Toplevel):
             messagebox.showerror("Ошибка", "Выберите тест для редактирования.")
             return
         self.withdraw()
+        from edit_test_form import EditTestForm
         EditTestForm(self, test["id"], self.current_user_id).mainloop()
         self.deiconify()
         self.load_tests_for_selected_group()
@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import messagebox, simpledialog, filedialog
 from database import Database
+from student_import import iter_student_rows
+from db_worker import DbWorker
 
 class AddAdminToGroupsDialog(simpledialog.Dialog):
     """Диалог для назначения преподавателя в группы"""
@@ -25,13 +27,7 @@ class AddAdminToGroupsDialog(simpledialog.Dialog):
     def apply(self):
         # Сохраняет изменения в назначении групп преподавателю
         selected = [gid for var, gid in self.varlist if var.get()]
-        current = set(g['id'] for g in self.db.get_groups_for_admin(self.admin_id))
-        for gid in selected:
-            if gid not in current:
-                self.db.add_admin_to_group(self.admin_id, gid)
-        for gid in current:
-            if gid not in selected:
-                self.db.remove_admin_from_group(self.admin_id, gid)
+        self.result = self.db.set_admin_groups(self.admin_id, selected)
 
 class AddUserDialog(simpledialog.Dialog):
     """Диалог для добавления преподавателя"""
@@ -81,13 +77,15 @@ class AddUserDialog(simpledialog.Dialog):
 class ManageUsersForm(tk.Toplevel):
     def __init__(self, parent, current_user_id):
         super().__init__(parent)
-        self.db = Database()
+        self.db = Database.shared()
+        self.worker = DbWorker.get(self.db.db_path)
         self.current_user_id = current_user_id
         self.title("Управление пользователями")
         self.geometry("900x650")
         self.parent = parent
         self.center_window()
         self.is_main_admin = self._is_main_admin()
+        self.teachers, self.groups, self.students = [], [], []
         self.create_widgets()
         self.refresh_all()
 
@@ -151,7 +149,10 @@ class ManageUsersForm(tk.Toplevel):
         btns_s.pack(side=tk.RIGHT, padx=5)
         tk.Button(btns_s, text="Добавить", command=self.add_student).pack(fill=tk.X, pady=2)
         tk.Button(btns_s, text="Удалить", command=self.delete_student).pack(fill=tk.X, pady=2)
-        tk.Button(btns_s, text="Импорт", command=self.import_students).pack(fill=tk.X, pady=2)
+        self.btn_import = tk.Button(btns_s, text="Импорт", command=self.import_students)
+        self.btn_import.pack(fill=tk.X, pady=2)
+        self.import_status = tk.Label(btns_s, text="", fg="gray")
+        self.import_status.pack(fill=tk.X, pady=2)
 
         tk.Button(self, text="Назад", command=self.go_back).pack(pady=10)
 
@@ -159,34 +160,63 @@ class ManageUsersForm(tk.Toplevel):
 
     # --- Загрузка и обновление данных ---
     def refresh_all(self):
-        # Обновляет все списки на форме
-        self.load_teachers()
-        self.load_groups()
-        self.load_students()
+        # Обновляет все списки на форме (данные загружаются в фоновом потоке)
+        def fetch(db):
+            return self._fetch_teachers(db), db.get_groups()
+
+        def show(data):
+            teachers, groups = data
+            self._show_teachers(teachers)
+            self._show_groups(groups)
+            self.load_students()
+
+        self.worker.submit(self, fetch, callback=show, key=("users_refresh", id(self)))
+
+    @staticmethod
+    def _fetch_teachers(db):
+        # Запрос списка преподавателей (кроме главного администратора)
+        return db.fetch_all("SELECT id, last_name, first_name, username FROM USERS WHERE role='admin' AND username!='admin'")
 
     def load_teachers(self):
         # Загружает список преподавателей
+        self._show_teachers(self._fetch_teachers(self.db))
+
+    def _show_teachers(self, teachers):
+        # Отображает список преподавателей
         self.teachers_listbox.delete(0, tk.END)
-        self.teachers = self.db.fetch_all("SELECT id, last_name, first_name, username FROM USERS WHERE role='admin' AND username!='admin'")
+        self.teachers = teachers
         for idx, t in enumerate(self.teachers, 1):
             self.teachers_listbox.insert(tk.END, f"{idx}. {t['last_name']} {t['first_name']} ({t['username']})")
 
     def load_groups(self):
         # Загружает список групп
+        self._show_groups(self.db.get_groups())
+
+    def _show_groups(self, groups):
+        # Отображает список групп
         self.groups_listbox.delete(0, tk.END)
-        self.groups = self.db.get_groups()
+        self.groups = groups
         for i, group in enumerate(self.groups, 1):
             self.groups_listbox.insert(tk.END, f"{i}. {group['name']}")
 
     def load_students(self):
-        # Загружает список студентов выбранной группы
+        # Загружает список студентов выбранной группы (в фоновом потоке)
         self.students_listbox.delete(0, tk.END)
+        self.students = []
         idx = self.groups_listbox.curselection()
         if not idx or idx[0] >= len(self.groups):
-            self.students = []
+            self.worker.cancel_key(("users_students", id(self)))
             return
         group_id = self.groups[idx[0]]['id']
-        self.students = self.db.get_students_by_group(group_id)
+        self.worker.submit(
+            self, lambda db: db.get_students_by_group(group_id),
+            callback=self._show_students, key=("users_students", id(self))
+        )
+
+    def _show_students(self, students):
+        # Отображает список студентов группы
+        self.students_listbox.delete(0, tk.END)
+        self.students = students
         for i, s in enumerate(self.students, 1):
             self.students_listbox.insert(tk.END, f"{i}. {s['last_name']} {s['first_name']}")
 
@@ -312,32 +342,47 @@ class ManageUsersForm(tk.Toplevel):
             self.load_students()
 
     def import_students(self):
-        # Импортирует студентов из текстового файла в выбранную группу
+        # Импортирует студентов из файла (TXT/CSV/XLSX) в выбранную группу в фоновом потоке
         idx = self.groups_listbox.curselection()
         if not idx or idx[0] >= len(self.groups):
             messagebox.showerror("Ошибка", "Сначала выберите группу для импорта студентов.")
             return
         group_id = self.groups[idx[0]]['id']
-        file_path = filedialog.askopenfilename(title="Выберите файл для импорта", filetypes=[("Текстовые файлы", "*.txt")])
-        if file_path:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        # Поддержка запятой и пробела в качестве разделителя
-                        if "," in line:
-                            parts = [p.strip() for p in line.split(",")]
-                        else:
-                            parts = line.split()
-                        if len(parts) >= 2:
-                            first_name, last_name = parts[0], parts[1]
-                            self.db.add_student(first_name, last_name, group_id)
-                self.load_students()
-                messagebox.showinfo("Импорт завершён", "Студенты успешно импортированы.")
-            except Exception as e:
-                messagebox.showerror("Ошибка импорта", str(e))
+        file_path = filedialog.askopenfilename(
+            title="Выберите файл для импорта",
+            filetypes=[("Списки студентов", "*.txt *.csv *.xlsx"), ("Текстовые файлы", "*.txt"),
+                       ("CSV", "*.csv"), ("Excel", "*.xlsx")]
+        )
+        if not file_path:
+            return
+        self.btn_import.config(state="disabled")
+        self.import_status.config(text="Импорт...")
+        # Импорт в фоновом потоке базы данных, чтобы не блокировать интерфейс
+        self.worker.submit(
+            self, lambda db, progress: db.import_students(iter_student_rows(file_path), group_id, progress=progress),
+            callback=self._import_done, errback=self._import_failed,
+            progress=lambda n: self.import_status.config(text=f"Обработано: {n}")
+        )
+
+    def _import_done(self, result):
+        # Показывает итог импорта и обновляет список студентов
+        self._reset_import()
+        self.load_students()
+        messagebox.showinfo(
+            "Импорт завершён",
+            f"Добавлено: {result['added']}\nУже были в группе: {result['duplicates']}\n"
+            f"Пропущено некорректных строк: {result['invalid']}"
+        )
+
+    def _import_failed(self, error):
+        # Сообщает об ошибке импорта
+        self._reset_import()
+        messagebox.showerror("Ошибка импорта", str(error))
+
+    def _reset_import(self):
+        # Возвращает кнопку импорта и строку состояния в исходное состояние
+        self.btn_import.config(state="normal")
+        self.import_status.config(text="")
 
     # --- Навигация ---
     def go_back(self):
@@ -0,0 +1,547 @@
+import sqlite3
+
+# Миграции схемы базы данных.
+# Каждая миграция — функция (db, conn), выполняемая в одной транзакции;
+# номер версии хранится в PRAGMA user_version. Шаги должны быть идемпотентными,
+# чтобы корректно отрабатывать на базах, созданных до появления версионирования.
+
+MIGRATIONS = []
+
+# Минимальная версия SQLite: UPDATE ... FROM (3.33) используется в миграциях,
+# триггерах агрегатной статистики и перенумерации вопросов
+MIN_SQLITE_VERSION = (3, 33, 0)
+
+
+def migration(version):
+    # Регистрирует функцию как шаг миграции с заданным номером версии
+    def decorator(func):
+        MIGRATIONS.append((version, func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return decorator
+
+
+def _column_exists(conn, table, column):
+    # Проверить, существует ли столбец в таблице
+    return any(r[1] == column for r in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def check_sqlite_version(version_info=sqlite3.sqlite_version_info):
+    # Остановить запуск с понятным сообщением, если библиотека SQLite слишком старая
+    if tuple(version_info) < MIN_SQLITE_VERSION:
+        required = ".".join(map(str, MIN_SQLITE_VERSION))
+        installed = ".".join(map(str, version_info))
+        raise RuntimeError(
+            f"Для работы приложения нужна библиотека SQLite версии {required} или новее, "
+            f"установлена {installed}. Обновите Python (или библиотеку sqlite3)."
+        )
+
+
+def get_version(conn):
+    # Текущая версия схемы базы данных
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def latest_version():
+    # Версия схемы, которую ожидает приложение
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def migrate(db, conn):
+    # Применить все недостающие миграции по порядку; вернуть итоговую версию
+    current = get_version(conn)
+    # Внешние ключи отключаются на время миграций: пересоздание таблиц
+    # через DROP TABLE иначе вызвало бы каскадное удаление данных
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for version, func in MIGRATIONS:
+            if version <= current:
+                continue
+            conn.execute("BEGIN")
+            try:
+                func(db, conn)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            current = version
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+    return current
+
+
+def _rebuild_table(conn, table, ddl):
+    # Пересоздать таблицу по новому описанию (ddl с {name}), сохранив данные общих столбцов
+    old_columns = [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+    conn.execute(ddl.format(name=f"{table}_new"))
+    new_columns = [r[1] for r in conn.execute(f"PRAGMA table_info({table}_new)")]
+    columns = ", ".join(c for c in new_columns if c in old_columns)
+    conn.execute(f"INSERT INTO {table}_new ({columns}) SELECT {columns} FROM {table}")
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+
+# --- Шаги миграций ---
+@migration(1)
+def _base_schema(db, conn):
+    # Базовая схема: все таблицы, поздно добавленные столбцы и администратор по умолчанию
+    tables = [
+        # Таблица групп
+        """CREATE TABLE IF NOT EXISTS GROUPS (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            access_code TEXT NOT NULL
+        )""",
+        # Таблица пользователей
+        """CREATE TABLE IF NOT EXISTS USERS (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            password TEXT,
+            role TEXT NOT NULL,
+            first_name TEXT,
+            last_name TEXT,
+            middle_name TEXT,
+            group_id INTEGER,
+            FOREIGN KEY (group_id) REFERENCES GROUPS(id)
+        )""",
+        # Таблица связей преподавателей и групп
+        """CREATE TABLE IF NOT EXISTS ADMIN_GROUP (
+            admin_id INTEGER,
+            group_id INTEGER,
+            FOREIGN KEY(admin_id) REFERENCES USERS(id),
+            FOREIGN KEY(group_id) REFERENCES GROUPS(id),
+            PRIMARY KEY(admin_id, group_id)
+        )""",
+        # Таблица тестов (тем)
+        """CREATE TABLE IF NOT EXISTS THEME (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            timer_seconds INTEGER,
+            author_id INTEGER,
+            FOREIGN KEY (author_id) REFERENCES USERS(id)
+        )""",
+        # Таблица связей тестов и групп
+        """CREATE TABLE IF NOT EXISTS THEME_GROUP (
+            theme_id INTEGER,
+            group_id INTEGER,
+            FOREIGN KEY(theme_id) REFERENCES THEME(id),
+            FOREIGN KEY(group_id) REFERENCES GROUPS(id)
+        )""",
+        # Таблица вопросов
+        """CREATE TABLE IF NOT EXISTS QUESTION (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            theme_id INTEGER,
+            text TEXT NOT NULL,
+            correct_options TEXT NOT NULL,
+            theme_local_number INTEGER,
+            FOREIGN KEY (theme_id) REFERENCES THEME(id)
+        )""",
+        # Таблица вариантов ответов
+        """CREATE TABLE IF NOT EXISTS ANSWER (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question_id INTEGER,
+            text TEXT NOT NULL,
+            FOREIGN KEY (question_id) REFERENCES QUESTION(id)
+        )""",
+        # Таблица результатов тестирования
+        """CREATE TABLE IF NOT EXISTS TEST_SUMMARY (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            theme_id INTEGER,
+            score INTEGER,
+            date TEXT,
+            answers TEXT,
+            elapsed_seconds INTEGER,
+            FOREIGN KEY (user_id) REFERENCES USERS(id),
+            FOREIGN KEY (theme_id) REFERENCES THEME(id)
+        )"""
+    ]
+    for table in tables:
+        conn.execute(table)
+    # Столбцы, которых не было в старых версиях базы
+    if not _column_exists(conn, "THEME", "timer_seconds"):
+        conn.execute("ALTER TABLE THEME ADD COLUMN timer_seconds INTEGER")
+    if not _column_exists(conn, "TEST_SUMMARY", "answers"):
+        conn.execute("ALTER TABLE TEST_SUMMARY ADD COLUMN answers TEXT")
+    if not conn.execute("SELECT 1 FROM USERS WHERE username='admin'").fetchone():
+        conn.execute(
+            "INSERT INTO USERS (username, password, role, group_id, first_name, last_name) VALUES (?, ?, ?, NULL, ?, ?)",
+            ("admin", db.hash_password("admin123"), "admin", "Admin", "User")
+        )
+
+
+# Индексы частых запросов (используются миграциями 2 и 3)
+HOT_PATH_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_users_group_role ON USERS(group_id, role)",
+    "CREATE INDEX IF NOT EXISTS idx_admin_group_group ON ADMIN_GROUP(group_id)",
+    "CREATE INDEX IF NOT EXISTS idx_theme_author ON THEME(author_id)",
+    "CREATE INDEX IF NOT EXISTS idx_theme_group_group ON THEME_GROUP(group_id, theme_id)",
+    "CREATE INDEX IF NOT EXISTS idx_theme_group_theme ON THEME_GROUP(theme_id)",
+    "CREATE INDEX IF NOT EXISTS idx_question_theme ON QUESTION(theme_id, theme_local_number)",
+    "CREATE INDEX IF NOT EXISTS idx_answer_question ON ANSWER(question_id)",
+    "CREATE INDEX IF NOT EXISTS idx_summary_user_theme ON TEST_SUMMARY(user_id, theme_id)",
+    "CREATE INDEX IF NOT EXISTS idx_summary_user_date ON TEST_SUMMARY(user_id, date)",
+    "CREATE INDEX IF NOT EXISTS idx_summary_theme_user ON TEST_SUMMARY(theme_id, user_id)",
+]
+
+
+@migration(2)
+def _hot_path_indexes(db, conn):
+    # Вторичные индексы для частых запросов (тесты группы, результаты, журнал, вопросы)
+    for index in HOT_PATH_INDEXES:
+        conn.execute(index)
+
+
+@migration(3)
+def _foreign_key_cascades(db, conn):
+    # Каскадное удаление зависимых строк средствами SQLite (PRAGMA foreign_keys=ON)
+    # Сначала убираем «висячие» строки, оставшиеся от прежних удалений
+    conn.execute("UPDATE USERS SET group_id = NULL WHERE group_id IS NOT NULL AND group_id NOT IN (SELECT id FROM GROUPS)")
+    conn.execute("UPDATE THEME SET author_id = NULL WHERE author_id IS NOT NULL AND author_id NOT IN (SELECT id FROM USERS)")
+    conn.execute("DELETE FROM ADMIN_GROUP WHERE admin_id NOT IN (SELECT id FROM USERS) OR group_id NOT IN (SELECT id FROM GROUPS)")
+    conn.execute("DELETE FROM THEME_GROUP WHERE theme_id NOT IN (SELECT id FROM THEME) OR group_id NOT IN (SELECT id FROM GROUPS)")
+    conn.execute("DELETE FROM QUESTION WHERE theme_id NOT IN (SELECT id FROM THEME)")
+    conn.execute("DELETE FROM ANSWER WHERE question_id NOT IN (SELECT id FROM QUESTION)")
+    conn.execute("DELETE FROM TEST_SUMMARY WHERE user_id NOT IN (SELECT id FROM USERS) OR theme_id NOT IN (SELECT id FROM THEME)")
+
+    tables = {
+        # Студенты удалённой группы остаются без группы
+        "USERS": """CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            password TEXT,
+            role TEXT NOT NULL,
+            first_name TEXT,
+            last_name TEXT,
+            middle_name TEXT,
+            group_id INTEGER,
+            FOREIGN KEY (group_id) REFERENCES GROUPS(id) ON DELETE SET NULL
+        )""",
+        "ADMIN_GROUP": """CREATE TABLE {name} (
+            admin_id INTEGER,
+            group_id INTEGER,
+            FOREIGN KEY(admin_id) REFERENCES USERS(id) ON DELETE CASCADE,
+            FOREIGN KEY(group_id) REFERENCES GROUPS(id) ON DELETE CASCADE,
+            PRIMARY KEY(admin_id, group_id)
+        )""",
+        # Тесты удалённого преподавателя сохраняются без автора
+        "THEME": """CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            timer_seconds INTEGER,
+            author_id INTEGER,
+            FOREIGN KEY (author_id) REFERENCES USERS(id) ON DELETE SET NULL
+        )""",
+        "THEME_GROUP": """CREATE TABLE {name} (
+            theme_id INTEGER,
+            group_id INTEGER,
+            FOREIGN KEY(theme_id) REFERENCES THEME(id) ON DELETE CASCADE,
+            FOREIGN KEY(group_id) REFERENCES GROUPS(id) ON DELETE CASCADE
+        )""",
+        "QUESTION": """CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            theme_id INTEGER,
+            text TEXT NOT NULL,
+            correct_options TEXT NOT NULL,
+            theme_local_number INTEGER,
+            FOREIGN KEY (theme_id) REFERENCES THEME(id) ON DELETE CASCADE
+        )""",
+        "ANSWER": """CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question_id INTEGER,
+            text TEXT NOT NULL,
+            FOREIGN KEY (question_id) REFERENCES QUESTION(id) ON DELETE CASCADE
+        )""",
+        "TEST_SUMMARY": """CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            theme_id INTEGER,
+            score INTEGER,
+            date TEXT,
+            answers TEXT,
+            elapsed_seconds INTEGER,
+            FOREIGN KEY (user_id) REFERENCES USERS(id) ON DELETE CASCADE,
+            FOREIGN KEY (theme_id) REFERENCES THEME(id) ON DELETE CASCADE
+        )""",
+    }
+    for table, ddl in tables.items():
+        _rebuild_table(conn, table, ddl)
+    # Индексы удаляются вместе со старыми таблицами
+    for index in HOT_PATH_INDEXES:
+        conn.execute(index)
+    if conn.execute("PRAGMA foreign_key_check").fetchone():
+        raise sqlite3.IntegrityError("После миграции остались нарушения ссылочной целостности.")
+
+
+@migration(4)
+def _answer_key_columns(db, conn):
+    # Порядковый номер варианта и признак правильного ответа вместо разбора строк
+    if not _column_exists(conn, "ANSWER", "ordinal"):
+        conn.execute("ALTER TABLE ANSWER ADD COLUMN ordinal INTEGER")
+    if not _column_exists(conn, "ANSWER", "is_correct"):
+        conn.execute("ALTER TABLE ANSWER ADD COLUMN is_correct INTEGER NOT NULL DEFAULT 0")
+    # Порядок вариантов в существующих данных — порядок вставки (по id)
+    conn.execute("""
+        UPDATE ANSWER SET ordinal = (
+            SELECT COUNT(*) FROM ANSWER a2 WHERE a2.question_id = ANSWER.question_id AND a2.id < ANSWER.id
+        )
+    """)
+    conn.execute("""
+        UPDATE ANSWER SET is_correct = (
+            SELECT (',' || REPLACE(q.correct_options, ' ', '') || ',') LIKE ('%,' || ANSWER.ordinal || ',%')
+            FROM QUESTION q WHERE q.id = ANSWER.question_id
+        )
+    """)
+    conn.execute("DROP INDEX IF EXISTS idx_answer_question")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_answer_question_ordinal ON ANSWER(question_id, ordinal)")
+
+
+@migration(5)
+def _question_positions(db, conn):
+    # Позиция вопроса с промежутками (шаг 1024): порядок без перезаписи всей темы
+    if not _column_exists(conn, "QUESTION", "position"):
+        conn.execute("ALTER TABLE QUESTION ADD COLUMN position INTEGER")
+    conn.execute("""
+        UPDATE QUESTION SET position = ordered.rn * 1024
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY theme_id ORDER BY theme_local_number, id) AS rn FROM QUESTION
+        ) AS ordered
+        WHERE QUESTION.id = ordered.id
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_question_theme_position ON QUESTION(theme_id, position)")
+
+
+@migration(6)
+def _theme_group_unique(db, conn):
+    # Уникальность назначения теста группе: удаляем накопившиеся дубликаты и запрещаем новые
+    conn.execute("""
+        DELETE FROM THEME_GROUP WHERE rowid NOT IN (
+            SELECT MIN(rowid) FROM THEME_GROUP GROUP BY theme_id, group_id
+        )
+    """)
+    conn.execute("DROP INDEX IF EXISTS idx_theme_group_theme")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_theme_group_unique ON THEME_GROUP(theme_id, group_id)")
+
+
+# Перевод процента в оценку средствами SQL (та же шкала, что calc_mark в формах)
+MARK_SQL = "(CASE WHEN {0} >= 90 THEN 5 WHEN {0} >= 70 THEN 4 WHEN {0} >= 50 THEN 3 WHEN {0} >= 30 THEN 2 ELSE 1 END)"
+
+# Агрегаты результатов: количество, сумма, минимум, максимум, сумма квадратов и сумма оценок
+_STATS_COLUMNS = "cnt, score_sum, score_min, score_max, score_sq_sum, mark_sum"
+_STATS_AGGREGATE = (
+    "COUNT(ts.score) AS cnt, SUM(ts.score) AS score_sum, MIN(ts.score) AS score_min, "
+    "MAX(ts.score) AS score_max, SUM(ts.score * ts.score) AS score_sq_sum, "
+    "SUM(" + MARK_SQL.format("ts.score") + ") AS mark_sum"
+)
+_STATS_MERGE = """
+    cnt = cnt + excluded.cnt,
+    score_sum = score_sum + excluded.score_sum,
+    score_min = MIN(score_min, excluded.score_min),
+    score_max = MAX(score_max, excluded.score_max),
+    score_sq_sum = score_sq_sum + excluded.score_sq_sum,
+    mark_sum = mark_sum + excluded.mark_sum"""
+
+
+def _stats_add_sql(row):
+    # Учесть строку TEST_SUMMARY (NEW) в агрегатах студента и пары «тест — группа»
+    single = f"{row}.score, {row}.score, {row}.score, {row}.score * {row}.score, {MARK_SQL.format(row + '.score')}"
+    return f"""
+        INSERT INTO STATS_USER (user_id, {_STATS_COLUMNS})
+        SELECT {row}.user_id, 1, {single} WHERE {row}.score IS NOT NULL
+        ON CONFLICT (user_id) DO UPDATE SET {_STATS_MERGE};
+        INSERT INTO STATS_THEME_GROUP (theme_id, group_id, {_STATS_COLUMNS})
+        SELECT {row}.theme_id, u.group_id, 1, {single} FROM USERS u
+        WHERE u.id = {row}.user_id AND u.group_id IS NOT NULL AND {row}.score IS NOT NULL
+        ON CONFLICT (theme_id, group_id) DO UPDATE SET {_STATS_MERGE};"""
+
+
+# Минимум или максимум результатов теста в группе, вычисленный по TEST_SUMMARY
+_GROUP_EXTREME = (
+    "(SELECT {func}(ts.score) FROM TEST_SUMMARY ts JOIN USERS u ON u.id = ts.user_id "
+    "WHERE ts.theme_id = {table}.theme_id AND u.group_id = {table}.group_id)"
+)
+
+
+def _stats_remove_sql(row, lazy_group_extremes):
+    # Исключить строку TEST_SUMMARY (OLD) из агрегатов; минимум и максимум
+    # пересчитываются по индексу, только если удаляемое значение было крайним.
+    # lazy_group_extremes (с миграции 8): у пары «тест — группа» крайнее значение
+    # не пересчитывается, а помечается неизвестным (NULL) и досчитывается при чтении
+    score = f"{row}.score"
+    group = f"(SELECT group_id FROM USERS WHERE id = {row}.user_id)"
+    def decrement(source):
+        new_min = "NULL" if source is None else f"(SELECT MIN(ts.score) {source})"
+        new_max = "NULL" if source is None else f"(SELECT MAX(ts.score) {source})"
+        return f"""
+        cnt = cnt - 1,
+        score_sum = score_sum - {score},
+        score_sq_sum = score_sq_sum - {score} * {score},
+        mark_sum = mark_sum - {MARK_SQL.format(score)},
+        score_min = CASE WHEN {score} > score_min THEN score_min ELSE {new_min} END,
+        score_max = CASE WHEN {score} < score_max THEN score_max ELSE {new_max} END"""
+    user_source = f"FROM TEST_SUMMARY ts WHERE ts.user_id = {row}.user_id"
+    group_source = None if lazy_group_extremes else (
+        f"FROM TEST_SUMMARY ts JOIN USERS u ON u.id = ts.user_id "
+        f"WHERE ts.theme_id = {row}.theme_id AND u.group_id = STATS_THEME_GROUP.group_id"
+    )
+    return f"""
+        UPDATE STATS_USER SET {decrement(user_source)}
+        WHERE user_id = {row}.user_id AND {score} IS NOT NULL;
+        DELETE FROM STATS_USER WHERE user_id = {row}.user_id AND cnt <= 0;
+        UPDATE STATS_THEME_GROUP SET {decrement(group_source)}
+        WHERE theme_id = {row}.theme_id AND group_id = {group} AND {score} IS NOT NULL;
+        DELETE FROM STATS_THEME_GROUP WHERE theme_id = {row}.theme_id AND cnt <= 0;"""
+
+
+def rebuild_summary_stats(conn):
+    # Пересчитать агрегатные таблицы статистики по всем строкам TEST_SUMMARY
+    conn.execute("DELETE FROM STATS_USER")
+    conn.execute("DELETE FROM STATS_THEME_GROUP")
+    conn.execute(f"""
+        INSERT INTO STATS_USER (user_id, {_STATS_COLUMNS})
+        SELECT ts.user_id, {_STATS_AGGREGATE} FROM TEST_SUMMARY ts
+        WHERE ts.score IS NOT NULL GROUP BY ts.user_id
+    """)
+    conn.execute(f"""
+        INSERT INTO STATS_THEME_GROUP (theme_id, group_id, {_STATS_COLUMNS})
+        SELECT ts.theme_id, u.group_id, {_STATS_AGGREGATE}
+        FROM TEST_SUMMARY ts JOIN USERS u ON u.id = ts.user_id
+        WHERE u.group_id IS NOT NULL AND ts.score IS NOT NULL
+        GROUP BY ts.theme_id, u.group_id
+    """)
+
+
+def refresh_stats_extremes(conn):
+    # Досчитать минимумы и максимумы, помеченные триггерами как неизвестные
+    conn.execute(f"""
+        UPDATE STATS_THEME_GROUP SET
+            score_min = COALESCE(score_min, {_GROUP_EXTREME.format(func="MIN", table="STATS_THEME_GROUP")}),
+            score_max = COALESCE(score_max, {_GROUP_EXTREME.format(func="MAX", table="STATS_THEME_GROUP")})
+        WHERE score_min IS NULL OR score_max IS NULL
+    """)
+
+
+def _create_stats_triggers(conn, lazy_group_extremes):
+    # (Пере)создать триггеры, поддерживающие таблицы STATS_*. Текст триггеров миграции 7
+    # не меняется (lazy_group_extremes=False); ленивые крайние значения групп — с миграции 8
+    remove_sql = _stats_remove_sql("OLD", lazy_group_extremes)
+    if lazy_group_extremes:
+        moved_min = "CASE WHEN c.score_min > STATS_THEME_GROUP.score_min THEN STATS_THEME_GROUP.score_min END"
+        moved_max = "CASE WHEN c.score_max < STATS_THEME_GROUP.score_max THEN STATS_THEME_GROUP.score_max END"
+    else:
+        moved_min = """CASE WHEN c.score_min > STATS_THEME_GROUP.score_min THEN STATS_THEME_GROUP.score_min ELSE (
+                    SELECT MIN(ts.score) FROM TEST_SUMMARY ts JOIN USERS u ON u.id = ts.user_id
+                    WHERE ts.theme_id = STATS_THEME_GROUP.theme_id AND u.group_id = OLD.group_id) END"""
+        moved_max = """CASE WHEN c.score_max < STATS_THEME_GROUP.score_max THEN STATS_THEME_GROUP.score_max ELSE (
+                    SELECT MAX(ts.score) FROM TEST_SUMMARY ts JOIN USERS u ON u.id = ts.user_id
+                    WHERE ts.theme_id = STATS_THEME_GROUP.theme_id AND u.group_id = OLD.group_id) END"""
+    triggers = {
+        "trg_summary_stats_insert": f"AFTER INSERT ON TEST_SUMMARY BEGIN {_stats_add_sql('NEW')} END",
+        "trg_summary_stats_delete": f"AFTER DELETE ON TEST_SUMMARY BEGIN {remove_sql} END",
+        "trg_summary_stats_update": (
+            f"AFTER UPDATE OF user_id, theme_id, score ON TEST_SUMMARY "
+            f"BEGIN {remove_sql} {_stats_add_sql('NEW')} END"
+        ),
+        # Удаление студента: результаты удаляются до строки USERS, пока известна его группа
+        "trg_users_stats_delete": "BEFORE DELETE ON USERS BEGIN DELETE FROM TEST_SUMMARY WHERE user_id = OLD.id; END",
+        # Перевод студента в другую группу (в том числе при удалении группы) переносит его результаты
+        "trg_users_stats_group": f"""AFTER UPDATE OF group_id ON USERS WHEN OLD.group_id IS NOT NEW.group_id BEGIN
+            UPDATE STATS_THEME_GROUP SET
+                cnt = STATS_THEME_GROUP.cnt - c.cnt,
+                score_sum = STATS_THEME_GROUP.score_sum - c.score_sum,
+                score_sq_sum = STATS_THEME_GROUP.score_sq_sum - c.score_sq_sum,
+                mark_sum = STATS_THEME_GROUP.mark_sum - c.mark_sum,
+                score_min = {moved_min},
+                score_max = {moved_max}
+            FROM (
+                SELECT ts.theme_id, {_STATS_AGGREGATE}
+                FROM TEST_SUMMARY ts WHERE ts.user_id = NEW.id AND ts.score IS NOT NULL GROUP BY ts.theme_id
+            ) AS c
+            WHERE STATS_THEME_GROUP.theme_id = c.theme_id AND STATS_THEME_GROUP.group_id = OLD.group_id;
+            DELETE FROM STATS_THEME_GROUP WHERE group_id = OLD.group_id AND cnt <= 0;
+            INSERT INTO STATS_THEME_GROUP (theme_id, group_id, {_STATS_COLUMNS})
+            SELECT ts.theme_id, NEW.group_id, {_STATS_AGGREGATE} FROM TEST_SUMMARY ts
+            WHERE ts.user_id = NEW.id AND ts.score IS NOT NULL AND NEW.group_id IS NOT NULL
+            GROUP BY ts.theme_id
+            ON CONFLICT (theme_id, group_id) DO UPDATE SET {_STATS_MERGE};
+        END""",
+    }
+    for name, body in triggers.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"CREATE TRIGGER {name} {body}")
+
+
+@migration(7)
+def _summary_stats(db, conn):
+    # Агрегатные таблицы статистики по тестам групп и по студентам, поддерживаемые триггерами
+    stats_columns = """
+            cnt INTEGER NOT NULL,
+            score_sum INTEGER NOT NULL,
+            score_min INTEGER,
+            score_max INTEGER,
+            score_sq_sum INTEGER NOT NULL,
+            mark_sum INTEGER NOT NULL"""
+    conn.execute(f"""CREATE TABLE IF NOT EXISTS STATS_THEME_GROUP (
+            theme_id INTEGER NOT NULL,
+            group_id INTEGER NOT NULL,{stats_columns},
+            PRIMARY KEY (theme_id, group_id)
+        ) WITHOUT ROWID""")
+    conn.execute(f"""CREATE TABLE IF NOT EXISTS STATS_USER (
+            user_id INTEGER PRIMARY KEY,{stats_columns}
+        )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stats_theme_group_group ON STATS_THEME_GROUP(group_id)")
+    _create_stats_triggers(conn, lazy_group_extremes=False)
+    rebuild_summary_stats(conn)
+
+
+@migration(8)
+def _stats_lazy_extremes(db, conn):
+    # Триггеры больше не пересчитывают минимум и максимум группы при каждом удалении
+    # (массовая перепроверка баллов делала это по всей теме на каждую строку);
+    # неизвестные значения досчитывает представление STATS_THEME_GROUP_VIEW
+    _create_stats_triggers(conn, lazy_group_extremes=True)
+    conn.execute("DROP VIEW IF EXISTS STATS_THEME_GROUP_VIEW")
+    conn.execute(f"""CREATE VIEW STATS_THEME_GROUP_VIEW AS
+        SELECT s.theme_id, s.group_id, s.cnt, s.score_sum,
+               COALESCE(s.score_min, {_GROUP_EXTREME.format(func="MIN", table="s")}) AS score_min,
+               COALESCE(s.score_max, {_GROUP_EXTREME.format(func="MAX", table="s")}) AS score_max,
+               s.score_sq_sum, s.mark_sum
+        FROM STATS_THEME_GROUP s""")
+    refresh_stats_extremes(conn)
+
+
+@migration(9)
+def _question_pools(db, conn):
+    # Случайная выборка вопросов в попытке: сколько вопросов вытягивать из банка темы,
+    # перемешивать ли варианты и выбирать ли равномерно по тегам вопросов.
+    # С попыткой хранится зерно перестановки вариантов (набор и порядок вопросов — в answers)
+    for table, column, ddl in (
+        ("THEME", "draw_count", "INTEGER"),
+        ("THEME", "shuffle_options", "INTEGER NOT NULL DEFAULT 0"),
+        ("THEME", "stratify", "INTEGER NOT NULL DEFAULT 0"),
+        ("QUESTION", "tag", "TEXT"),
+        ("TEST_SUMMARY", "option_seed", "INTEGER"),
+    ):
+        if not _column_exists(conn, table, column):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_question_theme_tag ON QUESTION(theme_id, tag)")
+
+
+@migration(10)
+def _attempt_progress(db, conn):
+    # Журнал незавершённых попыток: ответы сохраняются по ходу теста (пакетами),
+    # чтобы после сбоя продолжить попытку с оставшимся временем
+    conn.execute("""CREATE TABLE IF NOT EXISTS ATTEMPT_PROGRESS (
+            user_id INTEGER NOT NULL,
+            theme_id INTEGER NOT NULL,
+            answers BLOB NOT NULL,
+            answered INTEGER NOT NULL,
+            option_seed INTEGER,
+            elapsed_seconds REAL NOT NULL,
+            updated TEXT NOT NULL,
+            PRIMARY KEY (user_id, theme_id),
+            FOREIGN KEY (user_id) REFERENCES USERS(id) ON DELETE CASCADE,
+            FOREIGN KEY (theme_id) REFERENCES THEME(id) ON DELETE CASCADE
+        ) WITHOUT ROWID""")
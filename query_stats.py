@@ -0,0 +1,68 @@
+import sys
+import time
+import atexit
+import logging
+
+logger = logging.getLogger("database.queries")
+
+
+class QueryStats:
+    """Сбор статистики запросов к базе данных и журнал медленных запросов"""
+
+    def __init__(self, slow_threshold_ms=200, explain_slow=False):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.explain_slow = explain_slow
+        self.started = time.time()
+        self.by_query = {}   # запрос -> {"calls", "total_ms", "max_ms", "rows", "sites"}
+        self.slow = []       # записи о медленных запросах
+
+    # --- Подключение к базе данных ---
+    def install(self, db, dump_on_exit=False):
+        # Подписаться на запросы базы данных; при необходимости вывести сводку при выходе
+        db.add_query_listener(self)
+        if dump_on_exit:
+            atexit.register(self.dump)
+        return self
+
+    # --- Обработка события запроса ---
+    def __call__(self, event):
+        query = " ".join(event["query"].split())
+        ms = event["duration"] * 1000
+        entry = self.by_query.setdefault(query, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "sites": set()})
+        entry["calls"] += 1
+        entry["total_ms"] += ms
+        entry["max_ms"] = max(entry["max_ms"], ms)
+        entry["rows"] += event["rows"] or 0
+        entry["sites"].add(event["call_site"])
+        if ms >= self.slow_threshold_ms:
+            record = {"query": query, "ms": ms, "rows": event["rows"], "call_site": event["call_site"], "plan": None}
+            if self.explain_slow and not event["many"] and query.upper().startswith(("SELECT", "WITH")):
+                try:
+                    record["plan"] = [r[3] for r in event["conn"].execute("EXPLAIN QUERY PLAN " + event["query"], event["params"])]
+                except Exception:
+                    pass
+            self.slow.append(record)
+            logger.warning("Медленный запрос %.1f мс (%s): %s%s", ms, event["call_site"], query,
+                           f" | план: {'; '.join(record['plan'])}" if record["plan"] else "")
+
+    # --- Сводка за сессию ---
+    def summary(self, top=20):
+        # Текстовая сводка: самые затратные запросы по суммарному времени
+        total_calls = sum(e["calls"] for e in self.by_query.values())
+        total_ms = sum(e["total_ms"] for e in self.by_query.values())
+        lines = [
+            f"Запросов: {total_calls}, суммарно {total_ms:.1f} мс, "
+            f"медленных (>= {self.slow_threshold_ms} мс): {len(self.slow)}, "
+            f"длительность сессии {time.time() - self.started:.0f} с"
+        ]
+        ranked = sorted(self.by_query.items(), key=lambda kv: kv[1]["total_ms"], reverse=True)[:top]
+        for query, e in ranked:
+            lines.append(
+                f"{e['total_ms']:9.1f} мс  {e['calls']:6} выз.  макс {e['max_ms']:7.1f} мс  "
+                f"строк {e['rows']:7}  {', '.join(sorted(e['sites']))}\n    {query[:200]}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, stream=None):
+        # Вывести сводку (по умолчанию в stderr)
+        print(self.summary(), file=stream or sys.stderr)
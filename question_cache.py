@@ -0,0 +1,63 @@
+from collections import OrderedDict
+
+
+class QuestionCache:
+    """LRU-кэш разобранных наборов вопросов, ключ — id темы"""
+
+    def __init__(self, max_themes=32):
+        self.max_themes = max_themes
+        self._themes = OrderedDict()   # theme_id -> список вопросов
+        self._question_theme = {}      # question_id -> theme_id для закэшированных тем
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, theme_id):
+        # Вернуть копию набора вопросов или None, если темы нет в кэше
+        questions = self._themes.get(theme_id)
+        if questions is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._themes.move_to_end(theme_id)
+        return self._copy(questions)
+
+    def put(self, theme_id, questions):
+        # Сохранить набор вопросов темы, вытеснив самую давнюю тему при переполнении
+        self.invalidate_theme(theme_id)
+        self._themes[theme_id] = self._copy(questions)
+        for q in questions:
+            self._question_theme[q["id"]] = theme_id
+        while len(self._themes) > self.max_themes:
+            _, old_questions = self._themes.popitem(last=False)
+            self._forget_questions(old_questions)
+            self.evictions += 1
+
+    def invalidate_theme(self, theme_id):
+        # Сбросить кэш темы
+        questions = self._themes.pop(theme_id, None)
+        if questions is not None:
+            self._forget_questions(questions)
+
+    def invalidate_question(self, question_id):
+        # Сбросить кэш темы, в которую входит вопрос (если она закэширована)
+        theme_id = self._question_theme.get(question_id)
+        if theme_id is not None:
+            self.invalidate_theme(theme_id)
+
+    def clear(self):
+        self._themes.clear()
+        self._question_theme.clear()
+
+    def stats(self):
+        # Счётчики попаданий и промахов
+        return {"themes": len(self._themes), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def _forget_questions(self, questions):
+        for q in questions:
+            self._question_theme.pop(q["id"], None)
+
+    @staticmethod
+    def _copy(questions):
+        # Копии словарей, чтобы изменения у вызывающего кода не портили кэш
+        return [dict(q, options=list(q["options"]), correct_options=list(q["correct_options"])) for q in questions]
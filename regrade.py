@@ -0,0 +1,144 @@
+from itertools import chain
+from response_codec import split_codes, options_mask
+
+# Перепроверка сохранённых ответов после исправления ключа вопроса.
+# Правила те же, что в TestForm.calculate_score: множественный выбор засчитывается
+# при точном совпадении набора вариантов, одиночный — если вариант входит в правильные.
+# Процент считается как int(правильных / вопросов в попытке * 100).
+
+# Число вариантов, маска которых помещается в int64 матричного подсчёта (индексы 0..62)
+MASK_BITS = 63
+
+def load_responses(db, theme_id, question_ids, group_id=None):
+    """
+    Загрузить ответы всех попыток теста (при group_id — только студентов группы);
+    question_ids — id текущих вопросов теста.
+    Возвращает (attempts, skipped): attempts — список (id, старый балл, кортеж id вопросов, коды ответов),
+    skipped — число попыток без сохранённых ответов или с ответами на удалённые вопросы.
+    """
+    attempts = []
+    skipped = 0
+    known_layouts = {}   # кортеж id вопросов -> все ли вопросы ещё существуют
+    if group_id is None:
+        rows = db.fetch_all("SELECT id, score, answers FROM TEST_SUMMARY WHERE theme_id = ? ORDER BY id", (theme_id,))
+    else:
+        rows = db.fetch_all(
+            "SELECT ts.id, ts.score, ts.answers FROM TEST_SUMMARY ts JOIN USERS u ON u.id = ts.user_id "
+            "WHERE ts.theme_id = ? AND u.group_id = ? ORDER BY ts.id",
+            (theme_id, group_id)
+        )
+    for row in rows:
+        layout, codes = split_codes(row["answers"])
+        known = known_layouts.get(layout)
+        if known is None:
+            known = known_layouts[layout] = bool(layout) and all(qid in question_ids for qid in layout)
+        if not known:
+            skipped += 1
+            continue
+        attempts.append((row["id"], row["score"], layout, codes))
+    return attempts, skipped
+
+
+def score_attempts(attempts, answer_keys):
+    """
+    Пересчитать процент для каждой попытки. answer_keys — {question_id: маска правильных вариантов}.
+    Возвращает (список новых процентов, "numpy" или "python").
+    Если установлен NumPy, все попытки оцениваются одним проходом по массивам ответов.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return _score_python(attempts, answer_keys), "python"
+    try:
+        return _score_numpy(np, attempts, answer_keys), "numpy"
+    except OverflowError:
+        # Маски вариантов не помещаются в int64
+        return _score_python(attempts, answer_keys), "python"
+
+
+def _score_python(attempts, answer_keys):
+    # Построчный подсчёт по тем же правилам, что и матричный
+    scores = []
+    for _, _, layout, codes in attempts:
+        correct = 0
+        for qid, code in zip(layout, codes):
+            key = answer_keys[qid]
+            if code & 1:
+                correct += (code >> 1) == key
+            elif code:
+                correct += (key >> ((code >> 1) - 1)) & 1
+        scores.append(int(correct / len(codes) * 100))
+    return scores
+
+
+def response_entries(np, attempts, columns):
+    """
+    Ответы всех попыток плоскими массивами — по элементу на каждый заданный вопрос:
+    коды ответов, номер попытки, номер столбца вопроса; и число вопросов в каждой попытке.
+    columns — {question_id: номер столбца}. Память пропорциональна числу ответов, а не
+    «попытки × вопросы банка»: при выборке из большого банка почти все такие ячейки пусты.
+    """
+    layout_columns = {}
+    for _, _, layout, _ in attempts:
+        if layout not in layout_columns:
+            layout_columns[layout] = [columns[qid] for qid in layout]
+    asked = np.fromiter((len(codes) for _, _, _, codes in attempts), dtype=np.int64, count=len(attempts))
+    total = int(asked.sum())
+    codes = np.fromiter(chain.from_iterable(c for _, _, _, c in attempts), dtype=np.int64, count=total)
+    cols = np.fromiter(chain.from_iterable(layout_columns[layout] for _, _, layout, _ in attempts), dtype=np.int64, count=total)
+    rows = np.repeat(np.arange(len(attempts)), asked)
+    return codes, rows, cols, asked
+
+
+def correct_codes(np, codes, keys):
+    # Верность каждого ответа по правилам TestForm.calculate_score (keys — маски правильных вариантов тех же вопросов)
+    multiple = (codes & 1) == 1
+    single = (codes > 0) & ~multiple
+    index = (codes >> 1) - 1
+    # Ключ, уместившийся в int64, не содержит битов 63 и выше: такой вариант неверен
+    # (сдвиг ограничивается только чтобы не выйти за разрядность)
+    in_mask = index < MASK_BITS
+    shift = np.clip(index, 0, MASK_BITS - 1)
+    return (multiple & ((codes >> 1) == keys)) | (single & in_mask & (((keys >> shift) & 1) == 1))
+
+
+def _score_numpy(np, attempts, answer_keys):
+    # Подсчёт по ответам всех попыток сразу
+    columns = {qid: col for col, qid in enumerate(answer_keys)}
+    codes, rows, cols, asked = response_entries(np, attempts, columns)
+    keys = np.array(list(answer_keys.values()), dtype=np.int64)
+    correct = np.bincount(rows, weights=correct_codes(np, codes, keys[cols]), minlength=len(attempts))
+    return np.trunc(correct / asked * 100).astype(np.int64).tolist()
+
+
+def regrade_test(db, theme_id, dry_run=False):
+    """
+    Перепроверить все попытки теста по текущим правильным ответам.
+    Возвращает {"changes": [{"id", "old_score", "new_score"}], "checked", "skipped", "engine"};
+    при dry_run=False изменённые баллы записываются одним пакетом в одной транзакции.
+    """
+    if dry_run:
+        return _regrade(db, theme_id, apply=False)
+    # Чтение ответов и запись баллов в одной транзакции: результаты, сохранённые
+    # во время перепроверки, не будут перезаписаны устаревшими значениями
+    with db.transaction():
+        return _regrade(db, theme_id, apply=True)
+
+
+def _regrade(db, theme_id, apply):
+    # Пересчёт баллов по текущему ключу и (при apply) запись изменившихся
+    answer_keys = {q["id"]: options_mask(q["correct_options"]) for q in db.get_questions(theme_id)}
+    attempts, skipped = load_responses(db, theme_id, answer_keys.keys())
+    new_scores, engine = score_attempts(attempts, answer_keys) if attempts else ([], "python")
+    changes = [
+        {"id": attempt_id, "old_score": old_score, "new_score": new_score}
+        for (attempt_id, old_score, _, _), new_score in zip(attempts, new_scores)
+        if old_score != new_score
+    ]
+    if changes and apply:
+        db._execute(
+            "UPDATE TEST_SUMMARY SET score = ? WHERE id = ?",
+            [(c["new_score"], c["id"]) for c in changes], many=True
+        )
+        db.refresh_summary_stats()
+    return {"changes": changes, "checked": len(attempts), "skipped": skipped, "engine": engine}
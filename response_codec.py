@@ -0,0 +1,123 @@
+# Компактное двоичное хранение ответов студента (столбец TEST_SUMMARY.answers).
+#
+# Формат версии 1:
+#   байт версии, varint — число вопросов, далее для каждого вопроса:
+#   varint(zigzag(question_id - предыдущий question_id)) и varint кода ответа.
+# Код ответа: одиночный выбор — (индекс + 1) << 1 (0 — нет ответа),
+# множественный выбор — (битовая маска вариантов << 1) | 1.
+# Индекс варианта совпадает с ANSWER.ordinal вопроса.
+
+from functools import lru_cache
+from itertools import accumulate
+
+FORMAT_VERSION = 1
+
+
+def encode_responses(question_ids, answers):
+    """
+    Упаковать ответы в bytes. answers[i] — индекс варианта (-1 — нет ответа)
+    для одиночного выбора или список индексов для множественного.
+    """
+    if len(question_ids) != len(answers):
+        raise ValueError("Количество ответов не совпадает с количеством вопросов.")
+    out = bytearray([FORMAT_VERSION])
+    _write_varint(out, len(answers))
+    previous = 0
+    for question_id, answer in zip(question_ids, answers):
+        delta = question_id - previous
+        _write_varint(out, (delta << 1) ^ (delta >> 63))
+        previous = question_id
+        if isinstance(answer, (list, tuple, set)):
+            _write_varint(out, (options_mask(answer) << 1) | 1)
+        else:
+            _write_varint(out, (answer + 1) << 1 if answer is not None and answer >= 0 else 0)
+    return bytes(out)
+
+
+def decode_responses(data):
+    """
+    Распаковать ответы в список пар (question_id, ответ) в порядке прохождения.
+    Для старых записей без ответов ("" или NULL) возвращается пустой список.
+    """
+    return [(question_id, decode_answer(code)) for question_id, code in decode_codes(data)]
+
+
+def decode_codes(data):
+    # Распаковать ответы без преобразования кодов: список пар (question_id, код ответа)
+    question_ids, codes = split_codes(data)
+    return list(zip(question_ids, codes))
+
+
+def split_codes(data):
+    """
+    Распаковать ответы в два столбца: кортеж id вопросов и список кодов ответов.
+    Попытки одного теста обычно имеют одинаковый порядок вопросов, поэтому
+    кортеж id для таких попыток берётся из кэша.
+    """
+    if not data:
+        return (), []
+    if isinstance(data, str):
+        raise ValueError("Ответы сохранены в неподдерживаемом текстовом формате.")
+    if data[0] != FORMAT_VERSION:
+        raise ValueError(f"Неизвестная версия формата ответов: {data[0]}.")
+    count, pos = _read_varint(data, 1)
+    question_ids = []
+    codes = []
+    question_id = 0
+    for _ in range(count):
+        delta, pos = _read_varint(data, pos)
+        question_id += (delta >> 1) ^ -(delta & 1)
+        code, pos = _read_varint(data, pos)
+        if not codes and len(data) - pos == 2 * (count - 1) and data[pos:].isascii():
+            # Частый случай: после первого id все числа занимают по одному байту
+            rest = data[pos:]
+            codes.append(code)
+            codes.extend(rest[1::2])
+            return _question_ids(question_id, rest[::2]), codes
+        question_ids.append(question_id)
+        codes.append(code)
+    return tuple(question_ids), codes
+
+
+@lru_cache(maxsize=256)
+def _question_ids(first, deltas):
+    # Кортеж id вопросов по первому id и однобайтовым zigzag-разностям
+    return (first,) + tuple(first + offset for offset in accumulate((d >> 1) ^ -(d & 1) for d in deltas))
+
+
+def options_mask(indices):
+    # Битовая маска набора вариантов (так же кодируются правильные ответы при перепроверке)
+    mask = 0
+    for idx in indices:
+        mask |= 1 << idx
+    return mask
+
+
+def decode_answer(code):
+    # Код ответа -> индекс варианта (-1 — нет ответа) или список индексов
+    if code & 1:
+        mask = code >> 1
+        return [i for i in range(mask.bit_length()) if mask >> i & 1]
+    return (code >> 1) - 1
+
+
+def _write_varint(out, value):
+    # Беззнаковое число переменной длины: по 7 бит в байте, старший бит — продолжение
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Повреждённая запись ответов.")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
@@ -1,29 +1,18 @@
+import os
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from database import Database
-
-# === Вспомогательные функции ===
-def calc_mark(score):
-    # Перевод процента в оценку по шкале
-    if score is None:
-        return ""
-    if score >= 90:
-        return 5
-    elif score >= 70:
-        return 4
-    elif score >= 50:
-        return 3
-    elif score >= 30:
-        return 2
-    else:
-        return 1
+from db_worker import DbWorker
+from stats_export import calc_mark, single_test_rows, summary_rows, export_table, export_all
 
 # === Класс формы статистики ===
 class StatisticsForm(tk.Toplevel):
+    SUMMARY_PAGE_SIZE = 200   # студентов на страницу сводной таблицы
     # --- Инициализация и построение интерфейса ---
     def __init__(self, parent, admin_id):
         super().__init__(parent)
-        self.db = Database()
+        self.db = Database.shared()
+        self.worker = DbWorker.get(self.db.db_path)
         self.admin_id = admin_id
         self.title("Статистика")
         self.geometry("1000x600")
@@ -106,7 +95,12 @@ class StatisticsForm(tk.Toplevel):
         btns = tk.Frame(self)
         btns.pack(fill=tk.X, pady=8)
         tk.Button(btns, text="Обновить", command=self.load_results).pack(side=tk.LEFT, padx=10)
-        tk.Button(btns, text="Экспорт в Excel", command=self.export_excel).pack(side=tk.LEFT, padx=10)
+        self.btn_export = tk.Button(btns, text="Экспорт", command=self.export_current)
+        self.btn_export.pack(side=tk.LEFT, padx=10)
+        self.btn_export_all = tk.Button(btns, text="Экспорт всех групп", command=self.export_all_groups)
+        self.btn_export_all.pack(side=tk.LEFT, padx=10)
+        self.export_status = tk.Label(btns, text="")
+        self.export_status.pack(side=tk.LEFT, padx=10)
         tk.Button(btns, text="Назад", command=self.go_back).pack(side=tk.RIGHT, padx=10)
 
     # --- Загрузка и обработка данных ---
@@ -125,11 +119,24 @@ class StatisticsForm(tk.Toplevel):
             self.test_cb["values"] = []
             return
         group_id = self.groups[idx]["id"]
-        self.tests = self.db.get_teacher_tests_for_group(self.admin_id, group_id)
+        admin_id = self.admin_id
+        self.worker.submit(
+            self, lambda db: db.get_teacher_tests_for_group(admin_id, group_id),
+            callback=self._show_tests, key=("statistics_tests", id(self))
+        )
+
+    def _show_tests(self, tests):
+        # Заполняет список тестов выбранной группы и обновляет таблицу
+        self.tests = tests
         self.test_cb["values"] = [t["name"] for t in self.tests]
         if self.tests:
             self.test_cb.current(0)
-        self.load_results()
+        else:
+            self.test_cb.set("")
+        if self.mode_var.get() == "all":
+            self.build_summary_table()
+        else:
+            self.load_results()
 
     def on_test_selected(self, event=None):
         # Обработка выбора теста
@@ -141,11 +148,24 @@ class StatisticsForm(tk.Toplevel):
         group_idx = self.group_cb.current()
         test_idx = self.test_cb.current()
         if group_idx < 0 or test_idx < 0:
+            self.worker.cancel_key(("statistics_table", id(self)))
             return
         group_id = self.groups[group_idx]["id"]
         test_id = self.tests[test_idx]["id"]
         search = self.search_entry.get().strip()
-        rows = self.db.get_test_results_for_group(group_id, test_id, search_student=search)
+
+        def fetch(db):
+            rows = db.get_test_results_for_group(group_id, test_id, search_student=search)
+            # Без фильтров средние берутся из агрегатной таблицы, а не пересчитываются по строкам
+            stats = None if search else db.get_test_group_stats(test_id, group_id)
+            return rows, stats
+
+        self.worker.submit(self, fetch, callback=self._show_results, key=("statistics_table", id(self)))
+
+    def _show_results(self, data):
+        # Отображает результаты тестирования, полученные из фонового потока
+        rows, group_stats = data
+        self.tree.delete(*self.tree.get_children())
         stats = []
         for r in rows:
             name = f"{r['last_name']} {r['first_name']}"
@@ -167,92 +187,148 @@ class StatisticsForm(tk.Toplevel):
                 self.tree.item(iid, tags=("fail",))
             stats.append((percent, mark, status))
         self.tree.tag_configure("fail", background="#ffcccc")
-        self.update_summary(stats, len(rows))
+        if self.failed_only_var.get():
+            group_stats = None
+        self.update_summary(stats, len(rows), group_stats)
 
     def build_summary_table(self):
-        # Формирует сводную таблицу по всем тестам для группы
+        # Формирует сводную таблицу по всем тестам для группы (постранично)
         self.tree.delete(*self.tree.get_children())
         group_idx = self.group_cb.current()
         if group_idx < 0:
+            self.worker.cancel_key(("statistics_table", id(self)))
             return
-        group_id = self.groups[group_idx]["id"]
-        students = self.db.get_students_by_group(group_id)
-        tests = self.db.get_teacher_tests_for_group(self.admin_id, group_id)
-        test_ids = [t["id"] for t in tests]
-        test_names = [t["name"] for t in tests]
-        results = self.db.fetch_all(
-            "SELECT user_id, theme_id, score FROM TEST_SUMMARY WHERE theme_id IN ({})".format(
-                ",".join("?" * len(test_ids))
-            ), tuple(test_ids)
-        ) if test_ids else []
-        res_map = {(r["user_id"], r["theme_id"]): r["score"] for r in results}
-        columns = ["student"] + test_names + ["avg_percent", "avg_mark"]
-        self.tree["columns"] = columns
-        for col in columns:
-            if col == "student":
-                self.tree.heading(col, text="Студент")
-                self.tree.column(col, anchor="center", width=140)
-            elif col == "avg_percent":
-                self.tree.heading(col, text="Средний %")
-                self.tree.column(col, anchor="center", width=100)
-            elif col == "avg_mark":
-                self.tree.heading(col, text="Ср. оценка")
-                self.tree.column(col, anchor="center", width=100)
-            else:
-                self.tree.heading(col, text=col)
-                self.tree.column(col, anchor="center", width=100)
-        for s in students:
-            row = [f"{s['last_name']} {s['first_name'][0]}"]
-            scores = []
-            marks = []
-            for t in tests:
-                score = res_map.get((s["id"], t["id"]))
-                if score is not None:
-                    row.append(f"{score}%")
-                    scores.append(score)
-                    marks.append(calc_mark(score))
+        self._load_summary_page(self.groups[group_idx]["id"], 0)
+
+    def _load_summary_page(self, group_id, offset):
+        # Запрашивает очередную страницу сводной таблицы в фоновом потоке
+        admin_id = self.admin_id
+        limit = self.SUMMARY_PAGE_SIZE
+        self.worker.submit(
+            self, lambda db: db.get_group_summary(group_id, admin_id, offset=offset, limit=limit),
+            callback=lambda data: self._show_summary_table(data, group_id, offset),
+            key=("statistics_table", id(self))
+        )
+
+    def _show_summary_table(self, data, group_id, offset):
+        # Отображает страницу сводной таблицы и запрашивает следующую
+        tests = data["tests"]
+        if offset == 0:
+            self.tree.delete(*self.tree.get_children())
+            test_names = [t["name"] for t in tests]
+            columns = ["student"] + test_names + ["avg_percent", "avg_mark"]
+            self.tree["columns"] = columns
+            for col in columns:
+                if col == "student":
+                    self.tree.heading(col, text="Студент")
+                    self.tree.column(col, anchor="center", width=140)
+                elif col == "avg_percent":
+                    self.tree.heading(col, text="Средний %")
+                    self.tree.column(col, anchor="center", width=100)
+                elif col == "avg_mark":
+                    self.tree.heading(col, text="Ср. оценка")
+                    self.tree.column(col, anchor="center", width=100)
                 else:
-                    row.append("—")
-            avg_percent = round(sum(scores)/len(scores), 1) if scores else "—"
-            avg_mark = round(sum(marks)/len(marks), 1) if marks else "—"
-            row += [avg_percent, avg_mark]
+                    self.tree.heading(col, text=col)
+                    self.tree.column(col, anchor="center", width=100)
+        for s in data["rows"]:
+            row = [f"{s['last_name']} {s['first_name'][0]}"]
+            row += [f"{score}%" if score is not None else "—" for score in s["scores"]]
+            row.append(s["avg_percent"] if s["avg_percent"] is not None else "—")
+            row.append(s["avg_mark"] if s["avg_mark"] is not None else "—")
             self.tree.insert("", tk.END, values=row)
-        self.summary_label.config(text=f"Сводная таблица: {len(students)} студентов, {len(tests)} тестов")
+        loaded = offset + len(data["rows"])
+        text = f"Сводная таблица: {data['total']} студентов, {len(tests)} тестов"
+        if data["stats"] is not None:
+            text += f" | Средний %: {round(data['stats']['mean'], 1)} | Ср. оценка: {round(data['stats']['avg_mark'], 2)}"
+        self.summary_label.config(text=text)
+        if data["rows"] and loaded < data["total"]:
+            self._load_summary_page(group_id, loaded)
 
     # --- Обновление и экспорт данных ---
-    def update_summary(self, stats, total):
+    def update_summary(self, stats, total, group_stats=None):
         # Обновляет сводную строку статистики под таблицей
         if not stats:
             self.summary_label.config(text="Нет данных")
             return
-        marks = [m for _, m, s in stats if m != ""]
-        percents = [p for p, _, s in stats if p is not None]
         passed = sum(1 for _, _, s in stats if s == "Пройден")
-        failed = total - passed
-        avg = round(sum(marks) / len(marks), 2) if marks else 0
-        min_p = min(percents) if percents else 0
-        max_p = max(percents) if percents else 0
+        if group_stats is not None:
+            # Готовые агрегаты по тесту в группе
+            avg = round(group_stats["avg_mark"], 2)
+            min_p = group_stats["min"]
+            max_p = group_stats["max"]
+        else:
+            marks = [m for _, m, s in stats if m != ""]
+            percents = [p for p, _, s in stats if p is not None]
+            avg = round(sum(marks) / len(marks), 2) if marks else 0
+            min_p = min(percents) if percents else 0
+            max_p = max(percents) if percents else 0
         self.summary_label.config(
             text=f"Средний балл: {avg} | Прошли: {passed} из {total} | Мин. результат: {min_p}% | Макс.: {max_p}%"
         )
 
-    def export_excel(self):
-        # Экспортирует данные таблицы в Excel-файл
-        try:
-            import pandas as pd
-        except ImportError:
-            messagebox.showerror("Ошибка", "Для экспорта нужен пакет pandas.")
-            return
-        rows = [self.tree.item(i)["values"] for i in self.tree.get_children()]
-        if not rows:
+    def export_current(self):
+        # Экспортирует текущую таблицу (выбранный тест или сводную) в XLSX или CSV
+        group_idx = self.group_cb.current()
+        if group_idx < 0:
             messagebox.showinfo("Нет данных", "Нет данных для экспорта.")
             return
+        group_id = self.groups[group_idx]["id"]
+        admin_id = self.admin_id
+        if self.mode_var.get() == "all":
+            source = lambda db: summary_rows(db, group_id, admin_id, self.SUMMARY_PAGE_SIZE)
+        else:
+            test_idx = self.test_cb.current()
+            if test_idx < 0:
+                messagebox.showinfo("Нет данных", "Нет данных для экспорта.")
+                return
+            test_id = self.tests[test_idx]["id"]
+            search = self.search_entry.get().strip()
+            failed_only = self.failed_only_var.get()
+            source = lambda db: single_test_rows(db, group_id, test_id, search, failed_only)
+        file = filedialog.asksaveasfilename(
+            defaultextension=".xlsx", filetypes=[("Excel", "*.xlsx"), ("CSV", "*.csv")]
+        )
+        if not file:
+            return
+        self._run_export(
+            lambda db, progress: export_table(file, *source(db), progress=lambda n: progress(f"Выгружено строк: {n}")),
+            lambda count: f"Экспортировано строк: {count}\nФайл: {os.path.basename(file)}"
+        )
+
+    def export_all_groups(self):
+        # Экспортирует все группы преподавателя в одну книгу: сводная таблица и лист на каждый тест
         file = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel", "*.xlsx")])
         if not file:
             return
-        df = pd.DataFrame(rows, columns=["Студент", "Дата", "Время (мин)", "Процент", "Оценка", "Статус"])
-        df.to_excel(file, index=False)
-        messagebox.showinfo("Успех", "Данные экспортированы в Excel.")
+        admin_id = self.admin_id
+        self._run_export(
+            lambda db, progress: export_all(
+                db, admin_id, file, progress=lambda done, total: progress(f"Листов: {done} из {total}")
+            ),
+            lambda count: f"Экспортировано листов: {count}\nФайл: {os.path.basename(file)}"
+        )
+
+    def _run_export(self, job, message):
+        # Выполняет экспорт в фоновом потоке базы данных
+        self.btn_export.config(state="disabled")
+        self.btn_export_all.config(state="disabled")
+        self.export_status.config(text="Экспорт...")
+        self.worker.submit(
+            self, job,
+            callback=lambda result: self._export_finished(lambda: messagebox.showinfo("Успех", message(result), parent=self)),
+            errback=lambda error: self._export_finished(
+                lambda: messagebox.showerror("Ошибка экспорта", str(error), parent=self)
+            ),
+            progress=lambda text: self.export_status.config(text=text)
+        )
+
+    def _export_finished(self, notify):
+        # Возвращает кнопки экспорта в исходное состояние и показывает итог
+        self.btn_export.config(state="normal")
+        self.btn_export_all.config(state="normal")
+        self.export_status.config(text="")
+        notify()
 
     # --- Обработка событий интерфейса ---
     def go_back(self):
@@ -261,13 +337,24 @@ class StatisticsForm(tk.Toplevel):
         self.parent.deiconify()
 
     def on_row_double_click(self, event):
-        # Показывает подробности по студенту при двойном клике
-        item = self.tree.selection()
-        if not item:
+        # Открывает анализ вопросов теста по группе: выбранного теста или столбца сводной таблицы
+        group_idx = self.group_cb.current()
+        if group_idx < 0 or not getattr(self, "tests", None):
+            return
+        test = None
+        if self.mode_var.get() == "all":
+            column = self.tree.identify_column(event.x)
+            columns = self.tree["columns"]
+            index = int(column[1:]) - 1 if column else -1
+            if 0 <= index < len(columns):
+                test = next((t for t in self.tests if t["name"] == columns[index]), None)
+        else:
+            test_idx = self.test_cb.current()
+            test = self.tests[test_idx] if test_idx >= 0 else None
+        if test is None:
             return
-        values = self.tree.item(item[0])["values"]
-        student_name = values[0]
-        messagebox.showinfo("Подробности", f"Подробности по студенту: {student_name}")
+        from item_analysis_window import ItemAnalysisWindow
+        ItemAnalysisWindow(self, self.db, test["id"], self.groups[group_idx]["id"], test["name"])
 
     def on_mode_change(self):
         # Переключает режим отображения (по одному тесту или по всем)
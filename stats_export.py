@@ -0,0 +1,246 @@
+import os
+import re
+import csv
+import zipfile
+from functools import lru_cache
+
+# Потоковый экспорт статистики в CSV и XLSX без pandas.
+# Строки читаются из курсора базы данных и сразу записываются в файл,
+# поэтому расход памяти не зависит от числа студентов и результатов.
+
+SINGLE_HEADER = ["Студент", "Дата", "Время (мин)", "Процент", "Оценка", "Статус"]
+PROGRESS_EVERY = 500   # строк между вызовами progress
+# Экранирование текста для XML (xml.sax.saxutils при импорте тянет urllib)
+_XML_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
+
+def calc_mark(score):
+    # Перевод процента в оценку по шкале
+    if score is None:
+        return ""
+    if score >= 90:
+        return 5
+    elif score >= 70:
+        return 4
+    elif score >= 50:
+        return 3
+    elif score >= 30:
+        return 2
+    else:
+        return 1
+
+
+# === Источники строк ===
+def single_test_rows(db, group_id, test_id, search="", failed_only=False):
+    """
+    Результаты группы по одному тесту в том же виде, что таблица StatisticsForm
+    в режиме «По одному тесту». Возвращает (заголовок, генератор строк).
+    """
+    def rows():
+        for r in db.iter_test_results_for_group(group_id, test_id, search, failed_only):
+            elapsed = r["elapsed_seconds"]
+            time_str = f"{int(elapsed) // 60}:{int(elapsed) % 60:02d}" if elapsed else ""
+            passed = r["score"] is not None
+            yield [
+                f"{r['last_name']} {r['first_name']}",
+                r["date"][:10] if r["date"] else "",
+                time_str,
+                r["score"] if passed else 0,
+                calc_mark(r["score"]),
+                "Пройден" if passed else "Не пройден",
+            ]
+    return SINGLE_HEADER, rows()
+
+
+def summary_rows(db, group_id, admin_id, page_size=200):
+    """
+    Сводная таблица группы по всем тестам (режим «По всем тестам»), постранично из базы.
+    Возвращает (заголовок, генератор строк).
+    """
+    first_page = db.get_group_summary(group_id, admin_id, offset=0, limit=page_size)
+    header = ["Студент"] + [t["name"] for t in first_page["tests"]] + ["Средний %", "Ср. оценка"]
+
+    def rows():
+        page = first_page
+        offset = 0
+        while page["rows"]:
+            for s in page["rows"]:
+                yield (
+                    [f"{s['last_name']} {s['first_name']}"]
+                    + ["" if score is None else score for score in s["scores"]]
+                    + ["" if s["avg_percent"] is None else s["avg_percent"],
+                       "" if s["avg_mark"] is None else s["avg_mark"]]
+                )
+            offset += len(page["rows"])
+            if offset >= page["total"]:
+                break
+            page = db.get_group_summary(group_id, admin_id, offset=offset, limit=page_size)
+    return header, rows()
+
+
+# === Запись файлов ===
+def export_table(path, header, rows, progress=None):
+    # Записать одну таблицу в CSV или XLSX (по расширению файла); вернуть число строк
+    if os.path.splitext(path)[1].lower() == ".csv":
+        return write_csv(path, header, rows, progress)
+    with XlsxWriter(path) as book:
+        return book.add_sheet("Статистика", header, rows, progress)
+
+
+def write_csv(path, header, rows, progress=None):
+    # CSV с разделителем «;» и BOM — так его без настройки открывает русская версия Excel
+    count = 0
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+            if progress and count % PROGRESS_EVERY == 0:
+                progress(count)
+    return count
+
+
+def export_all(db, admin_id, path, progress=None):
+    """
+    Книга XLSX со всеми группами преподавателя: для каждой группы лист сводной
+    таблицы и по листу на каждый тест. progress(готово листов, всего листов).
+    """
+    plan = []
+    for group in db.get_teacher_groups(admin_id):
+        tests = db.get_teacher_tests_for_group(admin_id, group["id"])
+        plan.append((f"{group['name']} — сводная", lambda g=group["id"]: summary_rows(db, g, admin_id)))
+        for test in tests:
+            plan.append((f"{group['name']} — {test['name']}",
+                         lambda g=group["id"], t=test["id"]: single_test_rows(db, g, t)))
+    if not plan:
+        raise ValueError("Нет групп для экспорта.")
+    with XlsxWriter(path) as book:
+        for done, (name, source) in enumerate(plan):
+            if progress:
+                progress(done, len(plan))
+            header, rows = source()
+            book.add_sheet(name, header, rows)
+    if progress:
+        progress(len(plan), len(plan))
+    return len(plan)
+
+
+class XlsxWriter:
+    """
+    Минимальная потоковая запись книги Excel (Office Open XML).
+    Каждый лист пишется в архив построчно; служебные части книги — при закрытии.
+    """
+    _INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+    _INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+    def __init__(self, path):
+        self.path = path
+        self.sheets = []
+        self._zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._zip.close()
+            os.remove(self.path)
+        return False
+
+    def add_sheet(self, name, header, rows, progress=None):
+        # Записать лист: заголовок и строки из итератора; вернуть число строк данных
+        name = self._sheet_name(name)
+        self.sheets.append(name)
+        count = 0
+        with self._zip.open(f"xl/worksheets/sheet{len(self.sheets)}.xml", "w") as f:
+            f.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                    b'<sheetData>')
+            f.write(self._row_xml(1, header))
+            for count, row in enumerate(rows, 1):
+                f.write(self._row_xml(count + 1, row))
+                if progress and count % PROGRESS_EVERY == 0:
+                    progress(count)
+            f.write(b"</sheetData></worksheet>")
+        return count
+
+    def close(self):
+        # Дописать описание книги и закрыть архив
+        sheets = "".join(
+            f'<sheet name="{name.translate(_XML_ESCAPES)}" sheetId="{i}" r:id="rId{i}"/>'
+            for i, name in enumerate(self.sheets, 1)
+        )
+        rels = "".join(
+            f'<Relationship Id="rId{i}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            f'Target="worksheets/sheet{i}.xml"/>'
+            for i in range(1, len(self.sheets) + 1)
+        )
+        overrides = "".join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, len(self.sheets) + 1)
+        )
+        self._zip.writestr("[Content_Types].xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            f'{overrides}</Types>')
+        self._zip.writestr("_rels/.rels",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>')
+        self._zip.writestr("xl/workbook.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets>{sheets}</sheets></workbook>')
+        self._zip.writestr("xl/_rels/workbook.xml.rels",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'{rels}</Relationships>')
+        self._zip.close()
+
+    def _sheet_name(self, name):
+        # Имя листа Excel: без запрещённых символов, не длиннее 31 символа, уникальное
+        base = self._INVALID_SHEET_CHARS.sub("_", str(name)).strip("'") or "Лист"
+        candidate = base[:31]
+        n = 2
+        while candidate.lower() in (s.lower() for s in self.sheets):
+            suffix = f" ({n})"
+            candidate = base[:31 - len(suffix)] + suffix
+            n += 1
+        return candidate
+
+    def _row_xml(self, index, values):
+        # Строка листа: числа — числовыми ячейками, остальное — строками
+        cells = []
+        for col, value in enumerate(values):
+            ref = f"{self._column_letter(col)}{index}"
+            if isinstance(value, bool) or value is None or value == "":
+                if value is None or value == "":
+                    continue
+                value = str(value)
+            if isinstance(value, (int, float)):
+                cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+            else:
+                text = self._INVALID_XML_CHARS.sub("", str(value)).translate(_XML_ESCAPES)
+                cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+        return f'<row r="{index}">{"".join(cells)}</row>'.encode("utf-8")
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _column_letter(col):
+        # Номер столбца (с нуля) -> буквенное обозначение Excel: 0 -> A, 26 -> AA
+        letters = ""
+        col += 1
+        while col:
+            col, rem = divmod(col - 1, 26)
+            letters = chr(65 + rem) + letters
+        return letters
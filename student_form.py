@@ -3,13 +3,12 @@ from tkinter import ttk
 from tkinter import messagebox
 from database import Database
 # from result_form import ResultForm
-from journal_window import JournalWindow
 
 class StudentForm(tk.Toplevel):
     # === Инициализация и конфигурация окна ===
     def __init__(self, user_id):
         super().__init__()
-        self.db = Database()
+        self.db = Database.shared()
         self.user_id = user_id
         user = self.db.get_user_by_id(self.user_id)
         if user:
@@ -42,6 +41,8 @@ class StudentForm(tk.Toplevel):
         tk.Button(btn_frame, text="Назад", width=20, command=self.go_back).pack(pady=5)
         tk.Button(btn_frame, text="Выход", width=20, command=self.exit_program).pack(pady=5)
 
+        self.after(200, self.offer_unfinished_attempt)
+
     # === Вспомогательные методы интерфейса ===
     def center_window(self):
         """Центрирует окно на экране."""
@@ -62,9 +63,37 @@ class StudentForm(tk.Toplevel):
         from test_selection_form import TestSelectionForm
         TestSelectionForm(self, self.user_id, student_form=self).mainloop()
 
+    def offer_unfinished_attempt(self):
+        """Предлагает продолжить тест, прерванный сбоем или закрытием окна."""
+        attempts = self.db.get_attempts_in_progress(self.user_id)
+        if not attempts:
+            return
+        if len(attempts) > 1:
+            # Несколько прерванных тестов: каждый продолжается при открытии из списка тестов
+            names = "\n".join(f"• {a['name']}" for a in attempts)
+            if messagebox.askyesno(
+                "Незавершённые тесты",
+                f"Не были завершены тесты:\n{names}\n\n"
+                "Открыть список тестов? Каждый из них продолжится с момента прерывания.",
+                parent=self
+            ):
+                self.open_tests()
+            return
+        attempt = attempts[0]
+        if messagebox.askyesno(
+            "Незавершённый тест",
+            f"Тест «{attempt['name']}» не был завершён. Продолжить его сейчас?\n"
+            "Время таймера продолжит отсчитываться с момента прерывания.",
+            parent=self
+        ):
+            self.withdraw()
+            from test_form import TestForm
+            TestForm(self, self.user_id, attempt["theme_id"], self).mainloop()
+
     def open_journal(self):
         """Открывает окно с журналом студента."""
         try:
+            from journal_window import JournalWindow
             JournalWindow(self, self.db, self.user_id)
         except Exception as e:
             messagebox.showerror("Ошибка", str(e))
@@ -0,0 +1,65 @@
+import os
+import csv
+
+# Заголовки столбцов, по которым распознаётся строка-заголовок в CSV/XLSX
+_HEADER_WORDS = {"имя", "фамилия", "first_name", "last_name", "first name", "last name", "name"}
+
+
+def iter_student_rows(file_path):
+    """
+    Потоково читает файл со списком студентов и возвращает пары (имя, фамилия).
+    Поддерживаются .txt (разделитель — запятая или пробел), .csv и .xlsx.
+    Пустые строки пропускаются; строка без фамилии возвращается с пустой
+    фамилией, чтобы импорт учёл её как некорректную.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".xlsx":
+        rows = _iter_xlsx(file_path)
+    elif ext == ".csv":
+        rows = _iter_csv(file_path)
+    else:
+        rows = _iter_txt(file_path)
+    first = True
+    for parts in rows:
+        parts = [str(p).strip() for p in parts if p is not None and str(p).strip()]
+        if first:
+            first = False
+            if parts and parts[0].lower() in _HEADER_WORDS:
+                continue
+        if parts:
+            yield parts[0], parts[1] if len(parts) > 1 else ""
+
+
+def _iter_txt(file_path):
+    # Текстовый файл: «Имя Фамилия» или «Имя, Фамилия» в каждой строке
+    with open(file_path, "r", encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            yield [p.strip() for p in line.split(",")] if "," in line else line.split()
+
+
+def _iter_csv(file_path):
+    # CSV с разделителем «,» или «;» (определяется по началу файла)
+    with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(f, dialect)
+
+
+def _iter_xlsx(file_path):
+    # Первый лист книги Excel в потоковом режиме (read_only)
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Для импорта из Excel нужен пакет openpyxl.")
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    finally:
+        wb.close()
@@ -1,44 +1,57 @@
 import tkinter as tk
 from tkinter import messagebox
-import time
 from database import Database
+from test_session import TestSession, AttemptJournal
 from test_result_window import TestResultWindow
+from wrap_layout import WrapLayout
 
 class TestForm(tk.Toplevel):
+    AUTOSAVE_HEARTBEAT = 15   # секунд между записями оставшегося времени в журнал, если ответов нет
+
     # === Инициализация и построение интерфейса ===
     def __init__(self, parent, user_id, test_id, student_form):
         super().__init__(parent)
-        self.db = Database()
+        self.db = Database.shared()
         self.user_id = user_id
         self.test_id = test_id
-        self.questions = self.db.get_questions(test_id)
-        self.answers = []
-        self.current_question_index = 0
+        # Ход теста (ответы, таймер, подсчёт) ведёт сессия; форма только отображает её
+        # (незавершённая попытка продолжается из журнала с оставшимся временем)
+        self.session = TestSession.start(self.db, user_id, test_id)
+        self.journal = AttemptJournal(self.session)
+        self._autosave_id = None
         self.selected_option = tk.IntVar(value=-1)
         self.selected_options_vars = None
-        self.all_dynamic_labels = []
+        self.option_rows = []      # пул строк вариантов, переиспользуется между вопросами
+        self.visible_options = 0
         self.parent = parent
-        self.start_time = time.time()
         self.student_form = student_form
 
-        self.theme = self.db.get_theme(test_id)
-        self.timer_seconds = self.theme["timer_seconds"] if self.theme and self.theme["timer_seconds"] else None
-        self.time_left = self.timer_seconds
-
         self.title(f"Тест - {self.db.get_test_name(test_id)}")
         self.geometry("500x400")
         self.center_window()
 
-        if not self.questions:
+        if not self.session.questions:
             messagebox.showinfo("Нет вопросов", "В этом тесте нет вопросов.")
             self.destroy()
             return
 
         self._build_ui()
+        self.bind("<Destroy>", self._on_destroy)
+        if self.session.current_question is None:
+            # Сбой случился после ответа на последний вопрос: остаётся только подвести итог
+            self.show_result_window(self.session.finish())
+            return
         self.load_question()
-
-        if self.timer_seconds:
-            self.timer_label = tk.Label(self, text=self.format_time(self.time_left), font=("Arial", 14), bg="#f0f0f0")
+        if self.session.resumed:
+            messagebox.showinfo(
+                "Продолжение теста",
+                f"Тест продолжен с вопроса {self.session.current_index + 1} из {len(self.session.questions)}.",
+                parent=self
+            )
+        self._autosave()
+
+        if self.session.timer_seconds:
+            self.timer_label = tk.Label(self, text=self.format_time(self.session.time_left()), font=("Arial", 14), bg="#f0f0f0")
             self.timer_label.place(x=10, y=10)
             self.update_timer()
 
@@ -58,9 +71,16 @@ class TestForm(tk.Toplevel):
         self.outer_frame.bind("<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
         self.canvas.bind("<Configure>", lambda e: self.canvas.itemconfig("inner", width=e.width))
         self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+        # Перенос текста вопроса и вариантов по ширине области прокрутки
+        self.wrap_layout = WrapLayout(self.canvas, margin=120)
+        self.question_label = tk.Label(self.scrollable_frame, font=("Arial", 14), background="#f0f0f0",
+                                       justify="left", anchor="w", wraplength=420)
+        self.question_label.pack(pady=(10, 10), padx=10, anchor="w")
+        self.wrap_layout.add(self.question_label)
+        self.answers_frame = tk.Frame(self.scrollable_frame, background="#f0f0f0")
+        self.answers_frame.pack(fill="x", padx=(20, 0), anchor="w")
         self.next_button = tk.Button(self, text="Следующий", command=self._on_next)
         self.next_button.pack(pady=10, side="bottom")
-        self.bind("<Configure>", lambda e: self.after(100, self._update_wraplength))
 
     def center_window(self):
         # Центрирование окна на экране
@@ -72,94 +92,109 @@ class TestForm(tk.Toplevel):
 
     # === Работа с вопросами и вариантами ответов ===
     def load_question(self):
-        # Загрузка и отображение текущего вопроса и вариантов ответов
-        for w in self.scrollable_frame.winfo_children():
-            w.destroy()
-        self.all_dynamic_labels.clear()
-        q = self.questions[self.current_question_index]
-        q_label = tk.Label(self.scrollable_frame, text=q['text'], font=("Arial", 14),
-                           background="#f0f0f0", justify="left", anchor="w", wraplength=420)
-        q_label.pack(pady=(10, 10), padx=10, anchor="w")
-        self.all_dynamic_labels.append(q_label)
-
-        is_multiple = len(q["correct_options"]) > 1
-        answers_frame = tk.Frame(self.scrollable_frame, background="#f0f0f0")
-        answers_frame.pack(fill="x", padx=(20, 0), anchor="w")
-
-        if is_multiple:
-            self.selected_options_vars = []
-            for idx, option in enumerate(q["options"]):
-                var = tk.IntVar(value=0)
-                cb = tk.Checkbutton(answers_frame, variable=var, background="#f0f0f0")
-                cb.grid(row=idx, column=0, sticky="w", padx=(0, 5), pady=2)
-                lbl = tk.Label(answers_frame, text=option, font=("Arial", 12),
-                               background="#f0f0f0", justify="left", anchor="w", wraplength=360)
-                lbl.grid(row=idx, column=1, sticky="w", pady=2)
-                self.selected_options_vars.append(var)
-                self.all_dynamic_labels.append(lbl)
-        else:
-            self.selected_option.set(-1)
-            self.selected_options_vars = None
-            for idx, option in enumerate(q["options"]):
-                rb = tk.Radiobutton(answers_frame, variable=self.selected_option, value=idx,
-                                    background="#f0f0f0", highlightthickness=0)
-                rb.grid(row=idx, column=0, sticky="w", padx=(0, 5), pady=2)
-                lbl = tk.Label(answers_frame, text=option, font=("Arial", 12),
-                               background="#f0f0f0", justify="left", anchor="w", wraplength=360)
-                lbl.grid(row=idx, column=1, sticky="w", pady=2)
-                self.all_dynamic_labels.append(lbl)
-
-        is_last = self.current_question_index == len(self.questions) - 1
+        # Отображение текущего вопроса: строки вариантов берутся из пула и только перенастраиваются
+        q = self.session.current_question
+        self.question_label.config(text=q['text'])
+
+        is_multiple = self.session.is_multiple(q)
+        self.selected_option.set(-1)
+        self.selected_options_vars = [] if is_multiple else None
+        options = self.session.shown_options(q)
+        for idx, option in enumerate(options):
+            row = self._option_row(idx)
+            row["label"].config(text=option)
+            if row["multiple"] is not is_multiple:
+                if row["multiple"] is None:
+                    row["label"].grid()
+                else:
+                    (row["radio"] if is_multiple else row["check"]).grid_remove()
+                (row["check"] if is_multiple else row["radio"]).grid()
+                row["multiple"] = is_multiple
+            if is_multiple:
+                row["var"].set(0)
+                self.selected_options_vars.append(row["var"])
+        # Лишние строки от предыдущего вопроса скрываются, но не уничтожаются
+        for row in self.option_rows[len(options):self.visible_options]:
+            row["check"].grid_remove()
+            row["radio"].grid_remove()
+            row["label"].grid_remove()
+            row["multiple"] = None
+        self.visible_options = len(options)
+
+        is_last = self.session.is_last
         self.next_button.config(
             text="Завершить тест" if is_last else "Следующий",
             command=self._on_finish if is_last else self._on_next
         )
-        self.after(100, self._update_wraplength)
         self.canvas.yview_moveto(0)
 
+    def _option_row(self, idx):
+        # Строка варианта из пула; при нехватке создаётся новая (флажок, переключатель и текст)
+        while len(self.option_rows) <= idx:
+            n = len(self.option_rows)
+            var = tk.IntVar(value=0)
+            row = {
+                "var": var,
+                "check": tk.Checkbutton(self.answers_frame, variable=var, background="#f0f0f0"),
+                "radio": tk.Radiobutton(self.answers_frame, variable=self.selected_option, value=n,
+                                        background="#f0f0f0", highlightthickness=0),
+                "label": tk.Label(self.answers_frame, font=("Arial", 12), background="#f0f0f0",
+                                  justify="left", anchor="w", wraplength=360),
+                "multiple": None,   # тип показанной строки; None — строка скрыта
+            }
+            # Параметры размещения запоминаются, дальше строка только показывается и скрывается
+            row["check"].grid(row=n, column=0, sticky="w", padx=(0, 5), pady=2)
+            row["radio"].grid(row=n, column=0, sticky="w", padx=(0, 5), pady=2)
+            row["label"].grid(row=n, column=1, sticky="w", pady=2)
+            for widget in (row["check"], row["radio"], row["label"]):
+                widget.grid_remove()
+            self.option_rows.append(row)
+            self.wrap_layout.add(row["label"])
+        return self.option_rows[idx]
+
     # === Обработка событий пользователя ===
     def _on_next(self):
         # Обработка перехода к следующему вопросу
-        q = self.questions[self.current_question_index]
-        is_multiple = len(q["correct_options"]) > 1
-        if is_multiple:
-            selected = [i for i, var in enumerate(self.selected_options_vars) if var.get()]
-            if not selected:
-                messagebox.showwarning("Нет ответа", "Пожалуйста, выберите хотя бы один вариант.", parent=self)
-                return
-            self.answers.append(selected)
-        else:
-            sel = self.selected_option.get()
-            if sel == -1:
-                messagebox.showwarning("Нет ответа", "Пожалуйста, выберите вариант ответа.", parent=self)
-                return
-            self.answers.append(sel)
-        self.current_question_index += 1
-        self.load_question()
+        if self._submit_answer():
+            self.load_question()
 
     def _on_finish(self):
         # Завершение теста и подсчет результата
-        q = self.questions[self.current_question_index]
-        is_multiple = len(q["correct_options"]) > 1
-        if is_multiple:
-            selected = [i for i, var in enumerate(self.selected_options_vars) if var.get()]
-            if not selected:
-                messagebox.showwarning("Нет ответа", "Пожалуйста, выберите хотя бы один вариант.", parent=self)
-                return
-            self.answers.append(selected)
-        else:
-            sel = self.selected_option.get()
-            if sel == -1:
-                messagebox.showwarning("Нет ответа", "Пожалуйста, выберите вариант ответа.", parent=self)
-                return
-            self.answers.append(sel)
-        score = self.calculate_score()
-        percent = (score / len(self.questions)) * 100 if self.questions else 0
-        if self.timer_seconds:
-            total_time = self.timer_seconds - self.time_left
+        if self._submit_answer():
+            self.show_result_window(self.session.finish())
+
+    def _submit_answer(self):
+        # Передача выбранного ответа в сессию; при пустом ответе — предупреждение
+        if self.selected_options_vars is not None:
+            value = [i for i, var in enumerate(self.selected_options_vars) if var.get()]
         else:
-            total_time = int(time.time() - self.start_time)
-        self.show_result_window(total_time if self.timer_seconds else None, percent)
+            value = self.selected_option.get()
+        try:
+            self.session.answer(value)
+        except ValueError as e:
+            messagebox.showwarning("Нет ответа", str(e), parent=self)
+            return False
+        self._autosave()
+        return True
+
+    # === Журнал незавершённой попытки ===
+    def _autosave(self):
+        # Запись попытки в журнал; частые ответы подряд объединяются в одну отложенную запись
+        if not self.journal.record() and self._autosave_id is None:
+            self._autosave_id = self.after(int(self.journal.min_interval * 1000), self._flush_journal)
+
+    def _flush_journal(self):
+        # Отложенная запись накопленных ответов
+        self._autosave_id = None
+        self.journal.flush()
+
+    def _on_destroy(self, event):
+        # При закрытии окна недописанные ответы сохраняются в журнал
+        if event.widget is self:
+            if self._autosave_id is not None:
+                self.after_cancel(self._autosave_id)
+                self._autosave_id = None
+            self.journal.flush()
 
     # === Таймер и обработка времени ===
     def format_time(self, seconds):
@@ -169,64 +204,32 @@ class TestForm(tk.Toplevel):
         return f"Осталось: {minutes:02}:{secs:02}"
 
     def update_timer(self):
-        # Обновление таймера на экране
-        if self.time_left > 0:
-            self.timer_label.config(text=self.format_time(self.time_left))
-            self.time_left -= 1
+        # Обновление таймера на экране (оставшееся время считается от срока сессии)
+        if self.session.finished:
+            return
+        time_left = self.session.time_left()
+        if time_left > 0:
+            self.timer_label.config(text=self.format_time(time_left))
+            if time_left % self.AUTOSAVE_HEARTBEAT == 0:
+                self._autosave()
             self.after(1000, self.update_timer)
         else:
             self.timer_label.config(text="Время вышло!")
             self.finish_test_due_to_timeout()
 
     def finish_test_due_to_timeout(self):
-        # Завершение теста по истечении времени
-        while len(self.answers) < len(self.questions):
-            q = self.questions[len(self.answers)]
-            if len(q["correct_options"]) > 1:
-                self.answers.append([])
-            else:
-                self.answers.append(-1)
-        score = self.calculate_score()
-        percent = (score / len(self.questions)) * 100 if self.questions else 0
-        total_time = self.timer_seconds
-        self.show_result_window(total_time, percent)
-
-    # === Подсчет результатов ===
-    def calculate_score(self):
-        # Подсчет количества правильных ответов
-        score = 0
-        for ans, q in zip(self.answers, self.questions):
-            if isinstance(ans, list):
-                if set(ans) == set(q["correct_options"]):
-                    score += 1
-            else:
-                if ans in q["correct_options"]:
-                    score += 1
-        return score
-
-    def show_result_window(self, time_seconds, percent):
+        # Завершение теста по истечении времени (неотвеченные вопросы считаются пропущенными)
+        self.show_result_window(self.session.finish(timed_out=True))
+
+    def show_result_window(self, result):
         # Отображение окна с результатами теста
         def back_to_student():
             self.destroy()
             self.student_form.deiconify()
-        TestResultWindow(
-            self,
-            db=self.db,
-            user_id=self.user_id,
-            theme_id=self.test_id,
-            time_seconds=time_seconds,
-            percent=percent,
-            back_callback=back_to_student
-        )
+        TestResultWindow(self, session=self.session, back_callback=back_to_student)
         self.withdraw()
 
     # === Вспомогательные методы интерфейса ===
     def _on_mousewheel(self, event):
         # Прокрутка содержимого с помощью колесика мыши
         self.canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
-
-    def _update_wraplength(self):
-        # Адаптация ширины текста под размер окна
-        width = self.canvas.winfo_width() - 120
-        for lbl in self.all_dynamic_labels:
-            lbl.config(wraplength=width if width > 0 else 360)
\ No newline at end of file
@@ -1,9 +1,8 @@
 import tkinter as tk
-import datetime
 
 class TestResultWindow(tk.Toplevel):
     # ---------- Инициализация и конфигурация окна ----------
-    def __init__(self, parent, db, user_id, theme_id, time_seconds=None, percent=0, back_callback=None):
+    def __init__(self, parent, session, back_callback=None):
         super().__init__(parent)
         self.title("Результаты теста")
         self.geometry("350x220")
@@ -16,11 +15,9 @@ class TestResultWindow(tk.Toplevel):
         self.center_window()  # Центрирует окно на экране
 
         self.back_callback = back_callback
-        self.db = db
-        self.user_id = user_id
-        self.theme_id = theme_id
-        self.percent = percent
-        self.time_seconds = time_seconds
+        self.session = session
+        time_seconds = session.result["time_seconds"]
+        percent = session.result["percent"]
 
         # ---------- Отображение информации о результате теста ----------
         label_title = tk.Label(self, text="Тест завершён!", font=("Arial", 16, "bold"),
@@ -46,18 +43,8 @@ class TestResultWindow(tk.Toplevel):
 
     # ---------- Методы работы с базой данных ----------
     def save_result(self):
-        """Сохраняет результат теста в базу данных."""
-        date_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        params = [self.user_id, self.theme_id, int(self.percent), date_str, ""]
-        query = "INSERT INTO TEST_SUMMARY (user_id, theme_id, score, date, answers"
-        if self.time_seconds is not None:
-            query += ", elapsed_seconds"
-            params.append(int(self.time_seconds))
-        query += ") VALUES (?, ?, ?, ?, ?"
-        if self.time_seconds is not None:
-            query += ", ?"
-        query += ")"
-        self.db._execute(query, tuple(params))
+        """Сохраняет результат теста и ответы на вопросы в базу данных."""
+        self.session.save()
 
     # ---------- Обработка событий ----------
     def _on_back(self):
@@ -1,13 +1,12 @@
 import tkinter as tk
 from tkinter import messagebox
 from database import Database
-from test_form import TestForm
 
 class TestSelectionForm(tk.Toplevel):
     # === Инициализация и конфигурация окна ===
     def __init__(self, parent, user_id, student_form):
         super().__init__(parent)
-        self.db = Database()
+        self.db = Database.shared()
         self.user_id = user_id
         self.student_form = student_form
         self.title("Выбор теста")
@@ -43,13 +42,16 @@ class TestSelectionForm(tk.Toplevel):
         user = self.db.get_user_by_id(self.user_id)
         group_id = user["group_id"] if user else None
         self.tests = self.db.get_unpassed_tests_for_user(self.user_id, group_id)
+        in_progress = {a["theme_id"] for a in self.db.get_attempts_in_progress(self.user_id)}
         self.tests_listbox.delete(0, tk.END)
         if self.tests:
             for test in self.tests:
                 test_name = test["name"]
                 timer = test.get("timer_seconds")
                 timer_str = f" (Время выполнения: {timer//60} мин)" if timer and timer > 0 else ""
-                self.tests_listbox.insert(tk.END, f"{test_name}{timer_str}")
+                # Прерванный тест продолжается с места остановки при открытии
+                resume_str = " — не завершён" if test["id"] in in_progress else ""
+                self.tests_listbox.insert(tk.END, f"{test_name}{timer_str}{resume_str}")
             self.tests_listbox.config(state=tk.NORMAL)
         else:
             self.tests_listbox.insert(tk.END, "Нет доступных тестов")
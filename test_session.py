@@ -0,0 +1,226 @@
+import time
+import random
+
+# Прохождение теста без интерфейса: список вопросов, ответы, срок по таймеру,
+# подсчёт результата и сохранение попытки. TestForm только отображает сессию,
+# поэтому сессию можно вести из скриптов и нагрузочных прогонов без Tk.
+#
+# Ответы хранятся в исходных индексах вариантов (ANSWER.ordinal), даже если варианты
+# показаны в перемешанном порядке, поэтому подсчёт и перепроверка не зависят от перестановки.
+
+
+class TestSession:
+    def __init__(self, db, user_id, theme_id, questions=None, timer_seconds=None, option_seed=None,
+                 elapsed=0, clock=time.monotonic):
+        # questions — вопросы в порядке показа (по умолчанию все вопросы темы);
+        # option_seed — зерно перестановки вариантов (None — варианты в исходном порядке);
+        # elapsed — уже затраченное время (при продолжении попытки);
+        # clock — источник времени в секундах (подменяется при моделировании)
+        self.db = db
+        self.user_id = user_id
+        self.theme_id = theme_id
+        self.questions = db.get_questions(theme_id) if questions is None else questions
+        self.timer_seconds = timer_seconds or None
+        self.option_seed = option_seed
+        self._option_orders = {}
+        self.clock = clock
+        self.started = clock() - elapsed
+        self.deadline = self.started + self.timer_seconds if self.timer_seconds else None
+        self.answers = []
+        self.result = None
+        self.resumed = False   # True — попытка продолжена из журнала
+
+    @classmethod
+    def start(cls, db, user_id, theme_id, clock=time.monotonic):
+        # Незавершённая попытка из журнала или новая сессия по теме с таймером и выборкой вопросов из её настроек
+        session = cls.resume(db, user_id, theme_id, clock)
+        if session is not None:
+            return session
+        theme = db.get_theme(theme_id) or {}
+        questions = None
+        if theme.get("draw_count"):
+            # Из банка темы в попытку вытягивается заданное число вопросов (выборка — в SQLite)
+            ids = db.draw_question_ids(theme_id, theme["draw_count"], theme["stratify"])
+            questions = db.get_questions_by_ids(ids)
+        option_seed = random.getrandbits(31) if theme.get("shuffle_options") else None
+        return cls(db, user_id, theme_id, questions=questions, timer_seconds=theme.get("timer_seconds"),
+                   option_seed=option_seed, clock=clock)
+
+    @classmethod
+    def resume(cls, db, user_id, theme_id, clock=time.monotonic):
+        # Восстановить попытку из журнала; None, если её нет или вопросы попытки с тех пор удалены
+        progress = db.get_attempt_progress(user_id, theme_id)
+        if progress is None:
+            return None
+        questions = db.get_questions_by_ids(progress["question_ids"])
+        if [q["id"] for q in questions] != progress["question_ids"]:
+            db.delete_attempt_progress(user_id, theme_id)
+            return None
+        theme = db.get_theme(theme_id) or {}
+        session = cls(db, user_id, theme_id, questions=questions, timer_seconds=theme.get("timer_seconds"),
+                      option_seed=progress["option_seed"], elapsed=progress["elapsed_seconds"], clock=clock)
+        session.answers = progress["answers"]
+        session.resumed = True
+        return session
+
+    # --- Состояние ---
+    @property
+    def current_index(self):
+        return len(self.answers)
+
+    @property
+    def current_question(self):
+        return self.questions[self.current_index] if self.current_index < len(self.questions) else None
+
+    @property
+    def is_last(self):
+        return self.current_index == len(self.questions) - 1
+
+    @property
+    def finished(self):
+        return self.result is not None
+
+    @staticmethod
+    def is_multiple(question):
+        # Вопрос с несколькими правильными вариантами отвечается набором вариантов
+        return len(question["correct_options"]) > 1
+
+    def option_order(self, question):
+        # Исходные индексы вариантов в порядке показа (перестановка определяется зерном попытки и id вопроса)
+        order = self._option_orders.get(question["id"])
+        if order is None:
+            order = list(range(len(question["options"])))
+            if self.option_seed is not None:
+                random.Random(f"{self.option_seed}:{question['id']}").shuffle(order)
+            self._option_orders[question["id"]] = order
+        return order
+
+    def shown_options(self, question):
+        # Тексты вариантов в порядке показа
+        return [question["options"][i] for i in self.option_order(question)]
+
+    def time_left(self):
+        # Оставшееся время в целых секундах (None — тест без таймера)
+        if self.deadline is None:
+            return None
+        return max(0, int(self.deadline - self.clock() + 0.999))
+
+    def elapsed_seconds(self, exact=False):
+        # Затраченное время в секундах (для теста с таймером — не больше лимита)
+        elapsed = self.clock() - self.started
+        if not exact:
+            elapsed = int(elapsed)
+        return min(elapsed, self.timer_seconds) if self.timer_seconds else elapsed
+
+    # --- Ответы и завершение ---
+    def answer(self, value):
+        """
+        Принять ответ на текущий вопрос: индекс варианта в порядке показа для одиночного выбора
+        или список таких индексов для множественного. Пустой ответ — ValueError.
+        """
+        question = self.current_question
+        if question is None or self.finished:
+            raise ValueError("Тест уже завершён.")
+        order = self.option_order(question)
+        if self.is_multiple(question):
+            selected = sorted({order[i] for i in value or []})
+            if not selected:
+                raise ValueError("Пожалуйста, выберите хотя бы один вариант.")
+            self.answers.append(selected)
+        else:
+            if value is None or value < 0:
+                raise ValueError("Пожалуйста, выберите вариант ответа.")
+            self.answers.append(order[value])
+
+    def fill_unanswered(self):
+        # Оставшиеся вопросы считаются пропущенными (завершение по таймеру)
+        while len(self.answers) < len(self.questions):
+            self.answers.append([] if self.is_multiple(self.questions[len(self.answers)]) else -1)
+
+    def calculate_score(self):
+        # Количество правильных ответов
+        score = 0
+        for ans, q in zip(self.answers, self.questions):
+            if isinstance(ans, list):
+                if set(ans) == set(q["correct_options"]):
+                    score += 1
+            elif ans in q["correct_options"]:
+                score += 1
+        return score
+
+    def finish(self, timed_out=False):
+        """
+        Завершить попытку и посчитать результат.
+        Возвращает {"score", "percent", "time_seconds"}; время указывается только для теста с таймером.
+        Журнал попытки удаляется сразу: завершённая попытка не предлагается к продолжению,
+        даже если результат так и не был сохранён.
+        """
+        if self.finished:
+            return self.result
+        if timed_out:
+            self.fill_unanswered()
+        elif len(self.answers) < len(self.questions):
+            raise ValueError("Даны ответы не на все вопросы.")
+        score = self.calculate_score()
+        self.result = {
+            "score": score,
+            "percent": (score / len(self.questions)) * 100 if self.questions else 0,
+            "time_seconds": (self.timer_seconds if timed_out else self.elapsed_seconds()) if self.timer_seconds else None,
+        }
+        self.db.delete_attempt_progress(self.user_id, self.theme_id)
+        return self.result
+
+    def save(self):
+        # Сохранить завершённую попытку с ответами и удалить её журнал; вернуть id записи результата
+        if not self.finished:
+            raise ValueError("Тест ещё не завершён.")
+        time_seconds = self.result["time_seconds"]
+        with self.db.transaction():
+            summary_id = self.db.save_test_result(
+                self.user_id, self.theme_id, int(self.result["percent"]),
+                [q["id"] for q in self.questions], self.answers,
+                int(time_seconds) if time_seconds is not None else None, self.option_seed
+            )
+            self.db.delete_attempt_progress(self.user_id, self.theme_id)
+        return summary_id
+
+
+class AttemptJournal:
+    """
+    Журнал незавершённой попытки в таблице ATTEMPT_PROGRESS.
+    Записи объединяются: не чаще одной за min_interval секунд, поэтому
+    быстрые ответы подряд дают одну запись (и одну синхронизацию с диском).
+    """
+
+    def __init__(self, session, min_interval=2.0):
+        self.session = session
+        self.min_interval = min_interval
+        self.dirty = False
+        self.last_flush = None
+        self.writes = 0
+
+    def record(self):
+        """
+        Отметить изменение попытки. Пишет сразу, если с прошлой записи прошло
+        не меньше min_interval; иначе возвращает False — тогда вызывающий
+        должен вызвать flush() позже (через min_interval секунд).
+        """
+        self.dirty = True
+        now = self.session.clock()
+        if self.last_flush is None or now - self.last_flush >= self.min_interval:
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        # Записать накопленное состояние попытки (если оно изменилось и попытка не завершена)
+        if not self.dirty or self.session.finished:
+            return
+        session = self.session
+        session.db.save_attempt_progress(
+            session.user_id, session.theme_id, [q["id"] for q in session.questions], session.answers,
+            session.option_seed, session.elapsed_seconds(exact=True)
+        )
+        self.dirty = False
+        self.last_flush = session.clock()
+        self.writes += 1
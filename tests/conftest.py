@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+# Модули приложения лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    # Путь к файлу базы во временном каталоге теста
+    return str(tmp_path / "test.db")
+
+
+@pytest.fixture
+def db(db_path):
+    # База на отдельном соединении (без общего менеджера соединений)
+    database = Database(db_path)
+    yield database
+    database.close()
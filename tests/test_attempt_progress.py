@@ -0,0 +1,46 @@
+import test_session
+
+
+def make_tests(db, count):
+    # Группа со студентом и count тестами по два вопроса
+    with db.transaction():
+        db.add_group("g1", "1")
+        db.add_student("Иван", "Иванов", 1)
+        student = db.fetch_one("SELECT id FROM USERS WHERE role='student'")["id"]
+        themes = []
+        for t in range(count):
+            theme_id = db.add_test_with_groups(f"Тест {t}", 1, [1])
+            for q in range(2):
+                db.add_question(theme_id, f"Вопрос {q}", ["a", "b"], [0])
+            themes.append(theme_id)
+    return student, themes
+
+
+def interrupted(db, student, theme_id):
+    # Попытка с одним ответом, записанная в журнал и брошенная
+    session = test_session.TestSession.start(db, student, theme_id)
+    session.answer(0)
+    test_session.AttemptJournal(session).record()
+    return session
+
+
+def test_every_interrupted_attempt_is_listed_and_resumed(db):
+    # Все прерванные тесты доступны для продолжения, а не только последний
+    student, themes = make_tests(db, 3)
+    for theme_id in themes:
+        interrupted(db, student, theme_id)
+    assert sorted(a["theme_id"] for a in db.get_attempts_in_progress(student)) == themes
+    for theme_id in themes:
+        session = test_session.TestSession.start(db, student, theme_id)
+        assert session.resumed and session.answers == [0]
+
+
+def test_finish_drops_progress_without_save(db):
+    # Завершённая попытка не предлагается к продолжению, даже если окно результата закрыли без сохранения
+    student, (theme_id,) = make_tests(db, 1)
+    session = interrupted(db, student, theme_id)
+    session.answer(1)
+    session.finish()
+    assert db.get_attempt_progress(student, theme_id) is None
+    assert db.get_attempts_in_progress(student) == []
+    assert not test_session.TestSession.start(db, student, theme_id).resumed
@@ -0,0 +1,43 @@
+import sqlite3
+
+import pytest
+
+import connection_manager
+from connection_manager import ConnectionManager, configure_connection, is_network_path
+from database import Database
+
+
+def test_local_file_uses_wal(db):
+    assert db.fetch_one("PRAGMA journal_mode")[0] == "wal"
+
+
+def test_network_share_defaults_to_rollback_journal(db_path, monkeypatch):
+    # На сетевом диске WAL не используется
+    monkeypatch.setattr(connection_manager, "is_network_path", lambda path: True)
+    db = Database(db_path)
+    assert db.fetch_one("PRAGMA journal_mode")[0] == "delete"
+    db.close()
+
+
+def test_unc_paths_are_network():
+    assert is_network_path("//server/share/database.db")
+    assert is_network_path("\\\\server\\share\\database.db")
+    assert not is_network_path(":memory:")
+
+
+def test_shared_passes_settings_to_manager(db_path):
+    # Настройки из app.py доходят до соединения общего экземпляра
+    try:
+        db = Database.shared(db_path, journal_mode="TRUNCATE", busy_timeout_ms=1234)
+        assert db.fetch_one("PRAGMA journal_mode")[0] == "truncate"
+        assert db.fetch_one("PRAGMA busy_timeout")[0] == 1234
+        manager = ConnectionManager.get(db_path)
+        with manager.borrow() as conn:
+            assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 1234
+    finally:
+        ConnectionManager.close_all()
+
+
+def test_unknown_journal_mode_is_rejected(db_path):
+    with pytest.raises(ValueError):
+        configure_connection(sqlite3.connect(db_path), journal_mode="WAL; DROP TABLE USERS")
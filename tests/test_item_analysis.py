@@ -0,0 +1,63 @@
+import pytest
+
+import item_analysis
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    # Кэш анализа общий для процесса, а id тем в разных тестах совпадают
+    with item_analysis._cache_lock:
+        item_analysis._cache.clear()
+
+
+def make_test(db):
+    # Тест из двух вопросов и одна попытка студента
+    db.add_group("g1", "1")
+    db.add_student("Иван", "Иванов", 1)
+    student = db.fetch_one("SELECT id FROM USERS WHERE role='student'")["id"]
+    theme_id = db.add_test_with_groups("Тест", 1, [1])
+    db.add_question(theme_id, "Столица Франции?", ["Париж", "Лион"], [0])
+    db.add_question(theme_id, "2 + 2?", ["3", "4", "5"], [1])
+    questions = db.get_questions(theme_id)
+    db.save_test_result(student, theme_id, 100, [q["id"] for q in questions], [0, 1])
+    return theme_id, questions
+
+
+def test_cache_is_reused_while_nothing_changes(db):
+    theme_id, _ = make_test(db)
+    assert item_analysis.analyze_test(db, theme_id) is item_analysis.analyze_test(db, theme_id)
+
+
+def test_option_text_edit_invalidates_cache(db):
+    # Правка текста варианта без изменения ключа даёт новый результат
+    theme_id, questions = make_test(db)
+    before = item_analysis.analyze_test(db, theme_id)
+    db.update_question(questions[0]["id"], "Столица Франции?", ["Париж", "Марсель"], [0])
+    after = item_analysis.analyze_test(db, theme_id)
+    assert after is not before
+    assert [o["text"] for o in after["questions"][0]["options"]] == ["Париж", "Марсель"]
+
+
+def test_question_text_edit_invalidates_cache(db):
+    theme_id, questions = make_test(db)
+    item_analysis.analyze_test(db, theme_id)
+    db.update_question(questions[1]["id"], "Сколько будет 2 + 2?", ["3", "4", "5"], [1])
+    assert item_analysis.analyze_test(db, theme_id)["questions"][1]["text"] == "Сколько будет 2 + 2?"
+
+
+def test_wide_questions_count_every_option(db):
+    # Вопрос больше чем на 63 варианта: выбор 64-го варианта и дальше учитывается в своём столбце
+    db.add_group("g1", "1")
+    db.import_students(((f"Имя{i}", "Фамилия") for i in range(3)), 1)
+    students = [r["id"] for r in db.fetch_all("SELECT id FROM USERS WHERE role='student'")]
+    theme_id = db.add_test_with_groups("Широкий", 1, [1])
+    db.add_question(theme_id, "70 вариантов", [f"Вариант {i}" for i in range(70)], [65])
+    question_id = db.get_questions(theme_id)[0]["id"]
+    for student, answer in zip(students, (65, 62, 65)):
+        db.save_test_result(student, theme_id, 0, [question_id], [answer])
+    result = item_analysis.analyze_test(db, theme_id)
+    stats = result["questions"][0]
+    assert stats["p_value"] == pytest.approx(2 / 3)
+    rates = [o["rate"] for o in stats["options"]]
+    assert rates[65] == pytest.approx(2 / 3) and rates[62] == pytest.approx(1 / 3)
+    assert sum(rates) == pytest.approx(1)
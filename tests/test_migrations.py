@@ -0,0 +1,14 @@
+import pytest
+
+import migrations
+
+
+def test_new_database_is_at_latest_version(db):
+    assert migrations.get_version(db.conn) == migrations.latest_version()
+
+
+def test_old_sqlite_is_rejected_with_clear_message():
+    # UPDATE ... FROM появился в SQLite 3.33
+    with pytest.raises(RuntimeError, match="3.33.0"):
+        migrations.check_sqlite_version((3, 31, 1))
+    migrations.check_sqlite_version((3, 33, 0))
@@ -0,0 +1,156 @@
+import re
+import random
+
+import pytest
+
+from database import Database
+
+# Таблицы, которые растут с числом студентов, вопросов и попыток: полный просмотр любой из них
+# на горячем пути — регрессия индексов (справочники GROUPS и THEME остаются маленькими)
+LARGE_TABLES = {"USERS", "QUESTION", "ANSWER", "TEST_SUMMARY", "THEME_GROUP", "ADMIN_GROUP",
+                "ATTEMPT_PROGRESS", "STATS_THEME_GROUP", "STATS_USER"}
+GROUPS, STUDENTS, TESTS, QUESTIONS = 10, 30, 20, 15
+
+_ALIAS = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|INNER\b|GROUP\b|ORDER\b)(\w+))?",
+                    re.IGNORECASE)
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["no-stats", "analyzed"])
+def seeded(request, tmp_path_factory):
+    # База с группами, студентами, тестами с вопросами и результатами попыток;
+    # планы проверяются и без статистики (как в приложении), и после ANALYZE
+    rng = random.Random(1)
+    db = Database(str(tmp_path_factory.mktemp("plans") / "plans.db"))
+    with db.transaction():
+        for t in range(GROUPS // 2):
+            db.add_admin(f"teacher{t}", "Анна", "Петрова", "1")
+        teachers = [r["id"] for r in db.fetch_all("SELECT id FROM USERS WHERE username LIKE 'teacher%'")]
+        teacher = teachers[0]
+        for g in range(GROUPS):
+            db.add_group(f"Группа {g}", str(g))
+        groups = [r["id"] for r in db.fetch_all("SELECT id FROM GROUPS")]
+        for g, group_id in enumerate(groups):
+            db.add_admin_to_group(teachers[g % len(teachers)], group_id)
+            for s in range(STUDENTS):
+                db.add_student(f"Имя{s}", f"Фамилия{s}", group_id)
+        tests = []
+        for t in range(TESTS):
+            theme_id = db.add_test_with_groups(f"Тест {t}", teacher, groups[::len(teachers)])
+            for q in range(QUESTIONS):
+                db.add_question(theme_id, f"Вопрос {q}", ["a", "b", "c", "d"], [q % 4])
+            tests.append(theme_id)
+        students = db.fetch_all("SELECT id, group_id FROM USERS WHERE role='student'")
+        for s in students:
+            for theme_id in rng.sample(tests, TESTS // 2):
+                question_ids = [q["id"] for q in db.get_questions(theme_id)]
+                db.save_test_result(s["id"], theme_id, rng.randint(0, 100), question_ids,
+                                    [rng.randrange(4) for _ in question_ids], rng.randint(60, 900))
+        db.save_attempt_progress(students[0]["id"], tests[-1], [1, 2], [0], None, 10)
+    if request.param:
+        db.conn.execute("ANALYZE")
+    question_ids = [q["id"] for q in db.get_questions(tests[0])][:5]
+    db.question_cache.clear()
+    student = students[0]
+    yield db, {"teacher": teacher, "group": student["group_id"], "student": student["id"], "test": tests[0],
+               "summary": db.fetch_one("SELECT MAX(id) AS id FROM TEST_SUMMARY")["id"],
+               "questions": question_ids}
+    db.close()
+
+
+# Публичные методы Database, которые не являются запросами чтения и не проверяются
+SKIP = {
+    # общие помощники: текст запроса задаёт вызывающий код
+    "fetch_one", "fetch_all", "iter_rows",
+    # подключение, транзакции, схема и инструментирование
+    "shared", "close", "transaction", "initialize", "hash_password",
+    "add_query_listener", "remove_query_listener",
+    # записи: пользователи и группы
+    "add_student", "import_students", "add_admin", "update_admin_password", "update_user", "delete_user",
+    "add_admin_to_group", "remove_admin_from_group", "set_admin_groups",
+    "add_group", "edit_group", "delete_group",
+    # записи: тесты и вопросы
+    "add_test", "update_test", "update_test_pool", "delete_test", "add_test_with_groups", "update_test_groups",
+    "remove_test_from_group", "add_question", "update_question", "delete_question", "set_question_tag",
+    "update_theme_local_number", "move_question",
+    # записи: результаты, попытки и пересчёт агрегатов
+    "save_test_result", "save_attempt_progress", "delete_attempt_progress",
+    "rebuild_summary_stats", "refresh_summary_stats",
+}
+
+# Аргументы каждого метода чтения по id из заполненной базы
+CALL_ARGS = {
+    "validate_user": lambda ids: ("teacher0", "1"),
+    "check_admin_password": lambda ids: (ids["teacher"], "1"),
+    "get_user_by_id": lambda ids: (ids["student"],),
+    "get_students_by_group": lambda ids: (ids["group"],),
+    "get_admins_by_group": lambda ids: (ids["group"],),
+    "get_groups_for_admin": lambda ids: (ids["teacher"],),
+    "get_teacher_groups": lambda ids: (ids["teacher"],),
+    "get_available_groups_for_admin": lambda ids: (ids["teacher"],),
+    "get_user_by_fullname_and_group": lambda ids: ("Имя1", "Фамилия1", ids["group"]),
+    "get_groups": lambda ids: (),
+    "get_group_by_name": lambda ids: ("Группа 1",),
+    "get_group_by_id": lambda ids: (ids["group"],),
+    "get_test_name": lambda ids: (ids["test"],),
+    "get_theme": lambda ids: (ids["test"],),
+    "get_unpassed_tests_for_user": lambda ids: (ids["student"], ids["group"]),
+    "get_journal_for_user": lambda ids: (ids["student"],),
+    "get_tests_for_group": lambda ids: (ids["group"],),
+    "get_teacher_tests_for_group": lambda ids: (ids["teacher"], ids["group"]),
+    "get_questions": lambda ids: (ids["test"],),
+    "get_questions_by_ids": lambda ids: (ids["questions"],),
+    "draw_question_ids": lambda ids: (ids["test"], 5),
+    "get_test_results_for_group": lambda ids: (ids["group"], ids["test"]),
+    "iter_test_results_for_group": lambda ids: (ids["group"], ids["test"], None, True),
+    "get_group_summary": lambda ids: (ids["group"], ids["teacher"]),
+    "get_test_group_stats": lambda ids: (ids["test"], ids["group"]),
+    "get_group_stats": lambda ids: (ids["group"], [ids["test"]]),
+    "get_user_stats": lambda ids: (ids["student"],),
+    "get_attempt_progress": lambda ids: (ids["student"], ids["test"]),
+    "get_attempts_in_progress": lambda ids: (ids["student"],),
+    "get_attempt_responses": lambda ids: (ids["summary"],),
+}
+
+# Методы чтения перечисляются автоматически: новый публичный метод без аргументов здесь и не в SKIP
+# даёт падающий тест, а не молча остаётся без проверки плана
+READ_METHODS = sorted(name for name in dir(Database)
+                      if not name.startswith("_") and callable(getattr(Database, name)) and name not in SKIP)
+
+
+def full_scans(db, query, params):
+    # Полные просмотры больших таблиц в плане запроса
+    aliases = {}
+    for table, alias in _ALIAS.findall(query):
+        aliases[table.upper()] = table.upper()
+        if alias:
+            aliases[alias.upper()] = table.upper()
+    scans = []
+    for row in db.conn.execute("EXPLAIN QUERY PLAN " + query, params):
+        match = re.match(r"SCAN (\w+)", row["detail"])
+        if match and aliases.get(match.group(1).upper(), match.group(1).upper()) in LARGE_TABLES:
+            scans.append(row["detail"])
+    return scans
+
+
+def test_skip_list_names_existing_methods():
+    # Устаревшие имена в SKIP скрывали бы переименованные методы
+    assert not SKIP - set(dir(Database))
+
+
+@pytest.mark.parametrize("name", READ_METHODS)
+def test_hot_query_uses_indexes(seeded, name):
+    db, ids = seeded
+    assert name in CALL_ARGS, f"{name}: добавьте аргументы в CALL_ARGS или метод в SKIP"
+    args = CALL_ARGS[name]
+    queries = []
+    listener = lambda event: queries.append((event["query"], event["params"]))
+    db.add_query_listener(listener)
+    try:
+        result = getattr(db, name)(*args(ids))
+        if hasattr(result, "__next__"):
+            list(result)
+    finally:
+        db.remove_query_listener(listener)
+    assert queries, f"{name}: не выполнено ни одного запроса"
+    problems = [(query, scans) for query, params in queries if (scans := full_scans(db, query, params))]
+    assert not problems, f"{name}: полный просмотр таблицы {problems}"
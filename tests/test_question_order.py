@@ -0,0 +1,48 @@
+QUESTIONS = 500
+
+
+def numbered(db, theme_id):
+    # Тексты вопросов темы по их номерам для показа
+    return {q["theme_local_number"]: q["text"] for q in db.get_questions(theme_id)}
+
+
+def make_test(db):
+    # Тест с QUESTIONS вопросами «Вопрос 0» … «Вопрос N-1»
+    with db.transaction():
+        theme_id = db.add_test("Порядок", 1)
+        ids = [db.add_question(theme_id, f"Вопрос {i}", ["a", "b"], [0]) for i in range(QUESTIONS)]
+    return theme_id, ids
+
+
+def test_move_changes_one_row(db):
+    # Перемещение первого вопроса в конец меняет одну строку, а номера остальных сдвигаются при чтении
+    theme_id, ids = make_test(db)
+    before = db.conn.total_changes
+    db.move_question(ids[0])
+    assert db.conn.total_changes - before == 1
+    numbers = numbered(db, theme_id)
+    assert numbers[1] == "Вопрос 1"
+    assert numbers[QUESTIONS] == "Вопрос 0"
+    assert sorted(numbers) == list(range(1, QUESTIONS + 1))
+
+
+def test_insert_before_does_not_renumber(db):
+    # Вставка в начало пишет только новый вопрос и его варианты
+    theme_id, ids = make_test(db)
+    before = db.conn.total_changes
+    new_id = db.add_question(theme_id, "Новый", ["a", "b"], [1], before_question_id=ids[0])
+    assert db.conn.total_changes - before == 1 + 2
+    numbers = numbered(db, theme_id)
+    assert numbers[1] == "Новый"
+    assert numbers[QUESTIONS + 1] == f"Вопрос {QUESTIONS - 1}"
+    drawn = db.get_questions_by_ids([ids[10], new_id])
+    assert [q["theme_local_number"] for q in drawn] == [12, 1]
+
+
+def test_delete_closes_numbering_gap(db):
+    # После удаления вопроса номера для показа идут без пропуска
+    theme_id, ids = make_test(db)
+    db.delete_question(ids[5])
+    numbers = numbered(db, theme_id)
+    assert sorted(numbers) == list(range(1, QUESTIONS))
+    assert numbers[6] == "Вопрос 6"
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+import regrade
+import item_analysis
+from response_codec import options_mask, decode_responses
+import test_session
+
+BANK, DRAW, STUDENTS = 1200, 25, 60
+
+
+@pytest.fixture
+def pooled(db):
+    # Тест с банком из BANK вопросов, из которого в попытку вытягивается DRAW, и завершённые попытки
+    rng = random.Random(24)
+    with db.transaction():
+        db.add_group("g1", "1")
+        db.import_students(((f"Имя{i}", "Фамилия") for i in range(STUDENTS)), 1)
+        theme_id = db.add_test_with_groups("Банк", 1, [1])
+        for i in range(BANK):
+            correct = [0, 2] if i % 5 == 0 else [i % 4]
+            db.add_question(theme_id, f"Вопрос {i}", ["a", "b", "c", "d"], correct)
+    db.update_test_pool(theme_id, draw_count=DRAW, shuffle_options=True)
+    for student in [r["id"] for r in db.fetch_all("SELECT id FROM USERS WHERE role='student'")]:
+        session = test_session.TestSession.start(db, student, theme_id)
+        while session.current_question is not None:
+            q = session.current_question
+            session.answer(rng.sample(range(4), 2) if session.is_multiple(q) else rng.randrange(4))
+        session.finish()
+        session.save()
+    with item_analysis._cache_lock:
+        item_analysis._cache.clear()
+    return theme_id
+
+
+def expected_scores(db, theme_id):
+    # Баллы по текущему ключу, посчитанные заново по сохранённым ответам
+    questions = {q["id"]: q for q in db.get_questions(theme_id)}
+    scores = {}
+    for row in db.fetch_all("SELECT id, answers FROM TEST_SUMMARY WHERE theme_id = ?", (theme_id,)):
+        responses = decode_responses(row["answers"])
+        correct = sum(
+            set(a) == set(questions[qid]["correct_options"]) if isinstance(a, list) else a in questions[qid]["correct_options"]
+            for qid, a in responses
+        )
+        scores[row["id"]] = int(correct / len(responses) * 100)
+    return scores
+
+
+def test_attempts_draw_from_the_bank(db, pooled):
+    layouts = [[qid for qid, _ in decode_responses(r["answers"])]
+               for r in db.fetch_all("SELECT answers FROM TEST_SUMMARY WHERE theme_id = ?", (pooled,))]
+    assert all(len(layout) == DRAW for layout in layouts)
+    assert len({qid for layout in layouts for qid in layout}) > DRAW * 10
+
+
+def test_regrade_after_key_fix_in_a_large_bank(db, pooled):
+    # Меняется ключ у всех вопросов, попавшихся в первую попытку
+    first = decode_responses(db.fetch_one("SELECT answers FROM TEST_SUMMARY WHERE theme_id = ? ORDER BY id", (pooled,))["answers"])
+    questions = {q["id"]: q for q in db.get_questions(pooled)}
+    for qid, _ in first:
+        q = questions[qid]
+        db.update_question(qid, q["text"], q["options"], [(q["correct_options"][0] + 1) % 4])
+    expected = expected_scores(db, pooled)
+    result = regrade.regrade_test(db, pooled)
+    assert result["checked"] == STUDENTS and result["skipped"] == 0 and result["changes"]
+    stored = {r["id"]: r["score"] for r in db.fetch_all("SELECT id, score FROM TEST_SUMMARY WHERE theme_id = ?", (pooled,))}
+    assert stored == expected
+
+
+def test_engines_agree_on_pooled_layouts(db, pooled):
+    np = pytest.importorskip("numpy")
+    answer_keys = {q["id"]: options_mask(q["correct_options"]) for q in db.get_questions(pooled)}
+    attempts, _ = regrade.load_responses(db, pooled, answer_keys.keys())
+    assert regrade._score_numpy(np, attempts, answer_keys) == regrade._score_python(attempts, answer_keys)
+    numpy_sums = item_analysis._sums_numpy(np, attempts, answer_keys, [4] * len(answer_keys))
+    python_sums = item_analysis._sums_python(attempts, answer_keys, [4] * len(answer_keys))
+    for a, b in zip(numpy_sums, python_sums):
+        assert a["chosen"] == b["chosen"]
+        assert {k: round(v, 9) for k, v in a.items() if k != "chosen"} == \
+               {k: round(v, 9) for k, v in b.items() if k != "chosen"}
+
+
+def test_item_analysis_counts_only_asked_questions(db, pooled):
+    result = item_analysis.analyze_test(db, pooled)
+    assert result["attempts"] == STUDENTS
+    assert len(result["questions"]) == BANK
+    assert sum(q["asked"] for q in result["questions"]) == STUDENTS * DRAW
@@ -0,0 +1,44 @@
+import pytest
+
+import regrade
+from response_codec import options_mask
+
+
+def make_wide_test(db, correct):
+    # Тест из двух вопросов: на 70 вариантов (правильные — correct) и на 4 варианта
+    db.add_group("g1", "1")
+    db.import_students(((f"Имя{i}", "Фамилия") for i in range(4)), 1)
+    students = [r["id"] for r in db.fetch_all("SELECT id FROM USERS WHERE role='student'")]
+    theme_id = db.add_test_with_groups("Широкий", 1, [1])
+    db.add_question(theme_id, "70 вариантов", [f"Вариант {i}" for i in range(70)], correct)
+    db.add_question(theme_id, "4 варианта", ["a", "b", "c", "d"], [1])
+    question_ids = [q["id"] for q in db.get_questions(theme_id)]
+    # Ответы за пределами маски int64 (63 и выше), на её границе и внутри
+    for student, first in zip(students, (65, 64, 62, 1)):
+        db.save_test_result(student, theme_id, 0, question_ids, [first, 1])
+    return theme_id
+
+
+@pytest.mark.parametrize("correct", [[1], [62], [65], [1, 65]], ids=["key-1", "key-62", "key-65", "multi-1-65"])
+def test_numpy_and_python_engines_agree_on_70_options(db, correct):
+    np = pytest.importorskip("numpy")
+    theme_id = make_wide_test(db, correct)
+    answer_keys = {q["id"]: options_mask(q["correct_options"]) for q in db.get_questions(theme_id)}
+    attempts, _ = regrade.load_responses(db, theme_id, answer_keys.keys())
+    expected = regrade._score_python(attempts, answer_keys)
+    try:
+        assert regrade._score_numpy(np, attempts, answer_keys) == expected
+    except OverflowError:
+        # Ключ не помещается в int64 — score_attempts переходит на Python
+        assert regrade.score_attempts(attempts, answer_keys) == (expected, "python")
+
+
+@pytest.mark.parametrize("correct", [[1], [65]], ids=["key-1", "key-65"])
+def test_regrade_scores_wide_questions_like_the_session(db, correct):
+    # Попытка верна по вопросу на 70 вариантов, только если выбран правильный вариант
+    theme_id = make_wide_test(db, correct)
+    result = regrade.regrade_test(db, theme_id)
+    scores = {c["id"]: c["new_score"] for c in result["changes"]}
+    rows = db.fetch_all("SELECT id, score FROM TEST_SUMMARY WHERE theme_id = ? ORDER BY id", (theme_id,))
+    expected = [100 if first in correct else 50 for first in (65, 64, 62, 1)]
+    assert [scores.get(r["id"], r["score"]) for r in rows] == expected
@@ -0,0 +1,62 @@
+import sqlite3
+
+import pytest
+
+
+def test_failed_standalone_write_is_rolled_back(db, db_path):
+    # IntegrityError вне transaction() не оставляет открытую транзакцию и блокировку записи
+    db.add_admin("ivanov", "Иван", "Иванов", "1")
+    db.add_admin("petrov", "Пётр", "Петров", "1")
+    petrov = db.fetch_one("SELECT id FROM USERS WHERE username='petrov'")["id"]
+    with pytest.raises(ValueError):
+        db.update_user(petrov, "ivanov", None, "admin")
+    assert not db.conn.in_transaction
+
+    # Другое соединение может писать без ожидания блокировки
+    other = sqlite3.connect(db_path, timeout=0)
+    other.execute("UPDATE USERS SET first_name='Пётр' WHERE id=?", (petrov,))
+    other.commit()
+    other.close()
+
+    with db.transaction():
+        db.add_group("g1", "1")
+    assert [g["name"] for g in db.get_groups()] == ["g1"]
+
+
+def test_duplicate_names_do_not_break_later_transactions(db):
+    # Повторные названия группы и теста — ошибка, после которой transaction() работает
+    db.add_group("g1", "1")
+    with pytest.raises(sqlite3.IntegrityError):
+        db.add_group("g1", "2")
+    db.add_test("Тест", 1)
+    with pytest.raises(ValueError):
+        db.add_test("Тест", 1)
+    with db.transaction():
+        db.add_group("g2", "2")
+    assert [g["name"] for g in db.get_groups()] == ["g1", "g2"]
+
+
+def test_transaction_refuses_leftover_implicit_transaction(db):
+    # Незафиксированный запрос, выполненный напрямую через соединение, не откатывается молча
+    db.conn.execute("INSERT INTO GROUPS (name, access_code) VALUES ('kept', '0')")
+    assert db.conn.in_transaction
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.add_group("g1", "1")
+    assert db.conn.in_transaction
+    db.conn.commit()
+    assert [g["name"] for g in db.get_groups()] == ["kept"]
+    with db.transaction():
+        db.add_group("g1", "1")
+    assert [g["name"] for g in db.get_groups()] == ["kept", "g1"]
+
+
+def test_nested_transaction_rolls_back_savepoint_only(db):
+    # Исключение во вложенном блоке откатывает только его точку сохранения
+    with db.transaction():
+        db.add_group("g1", "1")
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                db.add_group("g2", "2")
+                raise RuntimeError
+    assert [g["name"] for g in db.get_groups()] == ["g1"]
@@ -6,7 +6,7 @@ class UserForm(tk.Toplevel):
     # === Инициализация и конфигурация окна ===
     def __init__(self, parent, title, user_id=None, group_id=None, role="student"):
         super().__init__(parent)
-        self.db = Database()
+        self.db = Database.shared()
         self.user_id = user_id
         self.forced_group_id = group_id
         self.role = role
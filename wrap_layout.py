@@ -0,0 +1,43 @@
+# Общий перенос текста меток по ширине области прокрутки (TestForm и просмотр вопроса в EditTestForm).
+# События <Configure> объединяются: пересчёт выполняется один раз после паузы в изменении размера
+# и только если ширина действительно изменилась.
+
+
+class WrapLayout:
+    def __init__(self, widget, margin, default=360, delay_ms=100):
+        # widget — виджет, по ширине которого переносится текст (обычно Canvas);
+        # margin — отступ от его ширины; default — перенос, пока ширина неизвестна
+        self.widget = widget
+        self.margin = margin
+        self.default = default
+        self.delay_ms = delay_ms
+        self.labels = []
+        self.width = None        # последняя применённая ширина переноса
+        self._after_id = None
+        widget.bind("<Configure>", self._on_configure, add="+")
+
+    def add(self, label):
+        # Подключить метку; если ширина уже известна, она применяется сразу
+        if self.width is not None:
+            label.config(wraplength=self.width)
+        self.labels.append(label)
+        return label
+
+    def _on_configure(self, event=None):
+        # Отложить пересчёт: серия событий изменения размера даёт один проход по меткам
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+        self._after_id = self.widget.after(self.delay_ms, self.update)
+
+    def update(self):
+        # Применить ширину переноса ко всем меткам, если она изменилась
+        self._after_id = None
+        if not self.widget.winfo_exists():
+            return
+        width = self.widget.winfo_width() - self.margin
+        width = width if width > 0 else self.default
+        if width == self.width:
+            return
+        self.width = width
+        for label in self.labels:
+            label.config(wraplength=width)